@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "core",
     "rest_framework",
     'rest_framework.authtoken',
@@ -46,11 +47,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.TimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ReplicaPinningMiddleware",
+    "core.middleware.RateLimitHeadersMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -78,17 +83,109 @@ WSGI_APPLICATION = "app.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+#
+# core.db.backends.postgresql is Django's backend plus connection health
+# checks and an optional in-process pool. By default each thread keeps
+# its connection for DB_CONN_MAX_AGE seconds and checks it is alive at
+# the start of every request. Setting DB_POOL_MAX_SIZE instead shares up
+# to that many connections between the threads of a process, checked out
+# per request (see core.db.pool).
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 0))
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.db.backends.postgresql",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        "CONN_MAX_AGE": (
+            0 if DB_POOL_MAX_SIZE
+            else int(os.environ.get("DB_CONN_MAX_AGE", 60))
+        ),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
     }
 }
 
+if DB_POOL_MAX_SIZE:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 0)),
+        "max_size": DB_POOL_MAX_SIZE,
+        # Seconds a request waits for a free connection before failing.
+        "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+        # Idle connections older than this are pinged before reuse.
+        "check_after": float(os.environ.get("DB_POOL_CHECK_AFTER", 5)),
+    }
+
+# Read replicas (see core.db.routers). DB_REPLICA_HOSTS is a comma
+# separated list of hosts streaming from the primary; each becomes a
+# "replicaN" alias. Safe requests read from a random replica, except
+# that a client that wrote in the last REPLICA_PIN_SECONDS is pinned to
+# the primary so it always reads its own writes.
+DATABASE_REPLICAS = []
+for _index, _host in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), 1
+):
+    DATABASES[f"replica{_index}"] = {
+        **DATABASES["default"],
+        "HOST": _host.strip(),
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{_index}")
+
+DATABASE_ROUTERS = ["core.db.routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 10))
+REPLICA_PIN_COOKIE = "db_pin"
+# Always read from the primary, so tokens work as soon as they're issued.
+REPLICA_PRIMARY_MODELS = ["authtoken.token", "core.user"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+#
+# The local-memory backend is an LRU with a per-entry TTL, but it is
+# private to each process; deployments running more than one worker
+# should set REDIS_URL so every worker shares cached responses and the
+# per-user versions that invalidate them.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "recipe-app",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
+if os.environ.get("REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+        "TIMEOUT": 300,
+    }
+
+# Unfiltered admin changelists above this many rows show Postgres' row
+# estimate instead of running an exact COUNT(*); filtered ones count at
+# most this many rows and show "N+" past it (see core.paginators).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# In-process token -> user cache used by CachedTokenAuthentication.
+# Set TOKEN_AUTH_CACHE_ALIAS to a shared cache (e.g. Redis) to also share
+# lookups between processes.
+TOKEN_AUTH_CACHE_SIZE = int(os.environ.get("TOKEN_AUTH_CACHE_SIZE", 10000))
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get("TOKEN_AUTH_CACHE_TTL", 60))
+TOKEN_AUTH_CACHE_ALIAS = os.environ.get("TOKEN_AUTH_CACHE_ALIAS") or None
+
+# Cache alias and TTL (seconds) for recipe list/detail responses.
+RECIPE_CACHE_ALIAS = "default"
+RECIPE_CACHE_TIMEOUT = int(os.environ.get("RECIPE_CACHE_TIMEOUT", 300))
+# Whether RECIPE_CACHE_ALIAS is shared by every worker. Recipe ETags
+# follow the per-user versions kept in that cache, so they are only sent
+# when a write's bump is seen by all workers.
+RECIPE_CACHE_SHARED = bool(os.environ.get("REDIS_URL"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -108,6 +205,19 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Size of the thread pool the async signup and token views await password
+# hashes in (see core.hashing); 0 uses the event loop's default executor,
+# which never refuses a hash. Callers of the pool wait up to
+# PASSWORD_HASHING_WAIT seconds for one of PASSWORD_HASHING_MAX_PENDING
+# slots before getting a 503.
+PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", 0))
+PASSWORD_HASHING_MAX_PENDING = int(
+    os.environ.get(
+        "PASSWORD_HASHING_MAX_PENDING", max(PASSWORD_HASHING_WORKERS, 1) * 4
+    )
+)
+PASSWORD_HASHING_WAIT = float(os.environ.get("PASSWORD_HASHING_WAIT", 5))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -137,8 +247,112 @@ AUTH_USER_MODEL = "core.User"
 
 REST_FRAMEWORK = {
     "COERCE_DECIMAL_TO_STRING": False,
+    # orjson-backed JSON, byte-compatible with DRF's stdlib renderer and
+    # parser (see core.renderers and core.parsers).
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # Token buckets per user, or per IP when anonymous (core.throttling).
+    # Views pick a scope with `throttle_scope`; "<scope>.<action>" rates
+    # override the scope's rate for one action.
+    "DEFAULT_THROTTLE_CLASSES": ["core.throttling.TokenBucketThrottle"],
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "120/min",
+        "user": "1200/min",
+        "token": "30/min",
+        "recipes": "600/min",
+        "recipes.bulk_create": "60/min",
+        "recipes.bulk_update": "60/min",
+        "recipes.bulk_destroy": "60/min",
+        "recipes.export": "30/hour",
+        "recipes.import_recipes": "10/hour",
+    },
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
+
+# Response compression (see core.middleware.CompressionMiddleware).
+# Encodings in server preference order; br and zstd are only offered
+# when the brotli / zstandard packages are installed.
+COMPRESSION_ENCODINGS = ["br", "zstd", "gzip"]
+# Responses smaller than this many bytes are sent uncompressed.
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 500))
+# Streaming responses flush compressed output after this many input bytes.
+COMPRESSION_STREAM_FLUSH_SIZE = 16384
+# Compressed content types and their level per encoding. API responses
+# are compressed cheaply on every request; the schema rarely changes and
+# is fetched by tooling, so it gets the densest settings. Content types
+# not listed here (images, archives, ...) are left alone.
+_API_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+COMPRESSION_LEVELS = {
+    "application/json": _API_LEVELS,
+    "application/x-ndjson": _API_LEVELS,
+    "text/csv": _API_LEVELS,
+    "application/vnd.oai.openapi": {"br": 11, "zstd": 19, "gzip": 9},
+    "application/vnd.oai.openapi+json": {"br": 11, "zstd": 19, "gzip": 9},
+    "text/*": {"br": 5, "zstd": 3, "gzip": 6},
+    "application/javascript": {"br": 5, "zstd": 3, "gzip": 6},
+}
+
+# Where throttle buckets live: "local" (per process, microseconds per
+# check) or "cache" (THROTTLE_CACHE_ALIAS, shared between hosts; atomic
+# with django-redis).
+THROTTLE_STORE = os.environ.get(
+    "THROTTLE_STORE", "cache" if os.environ.get("REDIS_URL") else "local"
+)
+THROTTLE_CACHE_ALIAS = "default"
+
+# Request timing (core.middleware.TimingMiddleware): send the breakdown
+# to clients as a Server-Timing header, and log one line per request on
+# "core.timing" at INFO. The per-request lines are off by default, so
+# tests and dev servers stay quiet; set REQUEST_LOG_LEVEL=INFO to log them.
+SERVER_TIMING_HEADER = bool(int(os.environ.get("SERVER_TIMING_HEADER", 1)))
+
+# Bearer token Prometheus sends to scrape /_/metrics/; unset, the
+# endpoint is off. Not an IP allowlist: behind the local reverse proxy
+# every client would look like 127.0.0.1.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.timing": {
+            "handlers": ["console"],
+            "level": os.environ.get("REQUEST_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
+# Default and maximum number of recipes returned per page by the
+# recipe list endpoint (see recipe.pagination).
+RECIPE_PAGE_SIZE = int(os.environ.get("RECIPE_PAGE_SIZE", 25))
+RECIPE_MAX_PAGE_SIZE = int(os.environ.get("RECIPE_MAX_PAGE_SIZE", 100))
+
+# Build recipe list pages from values_list() rows instead of serializing
+# model instances (see recipe.serializers.row_serializer). The output is
+# identical; set RECIPE_FAST_LIST=0 to fall back to the serializer.
+RECIPE_FAST_LIST = bool(int(os.environ.get("RECIPE_FAST_LIST", 1)))
+
+# Largest batch accepted by the recipe bulk create/update/delete endpoint.
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get("RECIPE_BULK_MAX_ITEMS", 500))
+
+# Rows fetched per round trip by the streaming recipe export.
+RECIPE_EXPORT_CHUNK_SIZE = int(os.environ.get("RECIPE_EXPORT_CHUNK_SIZE", 2000))
+
+# Rows validated and loaded per COPY by the recipe import, and how many
+# rejected rows the upload endpoint echoes back.
+RECIPE_IMPORT_CHUNK_SIZE = int(os.environ.get("RECIPE_IMPORT_CHUNK_SIZE", 5000))
+RECIPE_IMPORT_MAX_ERRORS = 100
 # REST_FRAMEWORK = {
 #     "DEFAULT_AUTHENTICATION_CLASSES": (
 #         "rest_framework_simplejwt.authentication.JWTAuthentication",
@@ -20,6 +20,8 @@ from drf_spectacular.views import (
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import metrics_view
+
 
 # Text to put at the end of each page's <title>.
 site_title = "Recipe Api"
@@ -39,4 +41,5 @@ urlpatterns = [
     ),
     path("_/auth/user/", include("core.urls")),
     path('_/recipe/', include('recipe.urls')),
+    path("_/metrics/", metrics_view, name="metrics"),
 ]
@@ -5,6 +5,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 from . import models
+from .paginators import EstimatedCountPaginator
 
 
 @admin.register(models.User)
@@ -68,3 +69,9 @@ class UserAdmin(BaseUserAdmin):
         ),
     )
     list_per_page: int = 10
+    paginator = EstimatedCountPaginator
+    # Each of these is served by a trigram index on UPPER(column), see
+    # migration 0003. BaseUserAdmin's default includes `username`, which
+    # this model does not have.
+    search_fields = ["email", "first_name", "last_name"]
+    show_full_result_count = False
@@ -0,0 +1,140 @@
+"""
+Authentication classes for the API
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenUserCache:
+    """Bounded, thread-safe LRU of token key -> user with a TTL.
+
+    Entries are also written to an optional shared Django cache
+    (TOKEN_AUTH_CACHE_ALIAS) so other processes can skip the database
+    too. Invalidation is explicit, see core.signals; the TTL bounds how
+    long another process's local copy can outlive a change.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 10000)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TOKEN_AUTH_CACHE_TTL', 60)
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'TOKEN_AUTH_CACHE_ALIAS', None)
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def _shared_key(key):
+        # Never put raw tokens into a cache other services can read.
+        return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached user for a token key, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                user, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    return user
+                self._discard(key)
+
+        shared = self.shared
+        if shared is not None:
+            user = shared.get(self._shared_key(key))
+            if user is not None:
+                self._store(key, user, now)
+                return user
+        return None
+
+    def set(self, key, user):
+        """Cache the user a token key belongs to"""
+        self._store(key, user, time.monotonic())
+        shared = self.shared
+        if shared is not None:
+            shared.set(self._shared_key(key), user, self.ttl)
+
+    def delete(self, *keys):
+        """Forget the given token keys"""
+        with self._lock:
+            for key in keys:
+                self._discard(key)
+        shared = self.shared
+        if shared is not None and keys:
+            shared.delete_many([self._shared_key(key) for key in keys])
+
+    def delete_user(self, user_id, keys=()):
+        """Forget every token cached for a user.
+
+        `keys` lists the user's tokens known to the database, so entries
+        cached by other processes in the shared cache are dropped too.
+        """
+        with self._lock:
+            local_keys = set(self._keys_by_user.get(user_id, ()))
+        self.delete(*(local_keys | set(keys)))
+
+    def clear(self):
+        """Forget every cached token in this process"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _store(self, key, user, now):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (user, now + self.ttl)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        """Remove a key; the caller must hold the lock"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[0].pk
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+token_user_cache = TokenUserCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token -> user lookup.
+
+    A drop-in replacement for TokenAuthentication that skips the
+    Token/User join for recently seen tokens.
+    """
+
+    def authenticate_credentials(self, key):
+        # The cache keeps an instance of its own and every request gets a
+        # copy, so per-request changes to the user never leak into it.
+        user = token_user_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_user_cache.set(key, copy.copy(user))
+            return (user, token)
+
+        user = copy.copy(user)
+        return (user, self.get_model()(key=key, user=user))
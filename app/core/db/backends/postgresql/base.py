@@ -0,0 +1,88 @@
+"""
+PostgreSQL backend with connection health checks and pooling
+
+Use "core.db.backends.postgresql" as the ENGINE. On top of Django's
+backend it adds:
+
+- CONN_HEALTH_CHECKS: a persistent connection (CONN_MAX_AGE > 0) is
+  checked with is_usable() before its first query of each request and
+  reopened if the server went away, as Django 4.1 does.
+- OPTIONS["pool"]: a dict of core.db.pool.ConnectionPool options. With
+  it, opening a connection checks one out of the process's pool and
+  closing it returns it there. Pair it with CONN_MAX_AGE = 0 so every
+  request gives its connection back.
+"""
+from django.db.backends.postgresql import base
+
+from core.db import pool as pooling
+
+from .creation import DatabaseCreation
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Postgres connection with health checks and optional pooling"""
+
+    creation_class = DatabaseCreation
+    health_check_done = False
+    _pool = None
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict['OPTIONS']
+        if options.get('pool') is None:
+            return super().get_new_connection(conn_params)
+
+        # Keyed on the parameters too, so switching NAME (as the test
+        # runner does) never hands out a connection to the old database.
+        key = (self.alias, repr(sorted(conn_params.items())))
+        pool = pooling.get_pool(key, **options['pool'])
+        connection = pool.getconn(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params,
+            )
+        )
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level,
+        )
+        self._pool = pool
+        return connection
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        pool, self._pool = self._pool, None
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        """Also schedule a health check for the next request"""
+        if self.connection is not None:
+            self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        """Close the connection if it no longer answers"""
+        if (self.connection is None
+                or not self.health_check_enabled
+                or self.health_check_done
+                or self.in_atomic_block):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,15 @@
+"""
+Test database creation for the pooling PostgreSQL backend
+"""
+from django.db.backends.postgresql import creation
+
+from core.db import pool as pooling
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Close pooled connections before dropping a test database"""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the database "in use".
+        pooling.close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,267 @@
+"""
+In-process pool of Postgres connections
+
+Django opens a connection per thread and, with CONN_MAX_AGE = 0, closes
+it after every request, so each request pays for a TCP and auth
+handshake. The pool keeps up to `max_size` connections open per process
+and hands them to whichever thread asks next: a request checks one out
+on its first query and returns it when Django closes the connection at
+the end of the request. When every connection is in use, callers wait up
+to `timeout` seconds and then fail with PoolTimeout.
+
+Connections idle for longer than `check_after` seconds are pinged before
+being handed out, and ones older than `max_lifetime` are replaced, so a
+restarted server or a dropped socket costs a reconnect rather than a
+failed request.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+_lock = threading.Lock()
+_pools = {}
+_orphans = []
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection frees up within the pool's timeout"""
+
+
+class _Entry:
+    """A pooled connection and its bookkeeping"""
+
+    __slots__ = ('connection', 'created_at', 'returned_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = self.returned_at = time.monotonic()
+
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of psycopg2 connections.
+
+    Connections are opened lazily: the pool never holds more than
+    `max_size`, and keeps at least `min_size` open once they have been
+    created, closing idle ones above that after `max_idle` seconds.
+    """
+
+    def __init__(self, min_size=0, max_size=10, timeout=5.0,
+                 check_after=5.0, max_idle=300.0, max_lifetime=3600.0):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError('Expected 0 <= min_size <= max_size >= 1.')
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.pid = os.getpid()
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()
+        self._in_use = {}
+        self._opening = 0
+        self._stats = dict.fromkeys([
+            'connections_opened',
+            'connections_closed',
+            'checkouts',
+            'waits',
+            'timeouts',
+            'failed_checks',
+        ], 0)
+        self._stats['wait_seconds'] = 0.0
+
+    @property
+    def size(self):
+        """Open connections, idle or in use, plus ones being opened"""
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def stats(self):
+        """Return counters and current gauges for monitoring"""
+        with self._cond:
+            return {
+                **self._stats,
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            }
+
+    def getconn(self, connect):
+        """Check out a healthy connection.
+
+        Reuses an idle connection if there is one, else opens one with
+        `connect()` if the pool has room, else waits for a return.
+        """
+        deadline = None
+        while True:
+            with self._cond:
+                entry = self._pop_idle()
+                if entry is not None:
+                    self._in_use[id(entry.connection)] = entry
+                elif self.size < self.max_size:
+                    self._opening += 1
+                else:
+                    now = time.monotonic()
+                    if deadline is None:
+                        deadline = now + self.timeout
+                        self._stats['waits'] += 1
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'No connection available within {self.timeout}s '
+                            f'({self.max_size} in use).'
+                        )
+                    self._cond.wait(remaining)
+                    self._stats['wait_seconds'] += time.monotonic() - now
+                    continue
+
+            if entry is None:
+                entry = self._open(connect)
+            elif not self._check(entry):
+                continue
+
+            with self._cond:
+                self._stats['checkouts'] += 1
+            return entry.connection
+
+    def putconn(self, connection):
+        """Return a connection, discarding it if it is not reusable"""
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            connection.close()
+            return
+
+        keep = not connection.closed
+        if keep:
+            status = connection.get_transaction_status()
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    connection.rollback()
+                except psycopg2.Error:
+                    keep = False
+        now = time.monotonic()
+        if now - entry.created_at >= self.max_lifetime:
+            keep = False
+
+        with self._cond:
+            if keep:
+                entry.returned_at = now
+                self._idle.append(entry)
+                expired = self._expire_idle(now)
+            else:
+                expired = [entry]
+            self._cond.notify()
+        for old in expired:
+            self._close(old)
+
+    def close(self):
+        """Close every idle connection; in-use ones close on return"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self.max_lifetime = 0
+        for entry in idle:
+            self._close(entry)
+
+    def _pop_idle(self):
+        """Return the most recently used idle entry; caller holds lock"""
+        if self._idle:
+            return self._idle.pop()
+        return None
+
+    def _expire_idle(self, now):
+        """Remove entries idle past max_idle above min_size; holds lock"""
+        expired = []
+        while (self._idle and self.size > self.min_size
+               and now - self._idle[0].returned_at >= self.max_idle):
+            expired.append(self._idle.popleft())
+        return expired
+
+    def _open(self, connect):
+        """Open a connection for a slot already reserved in `_opening`"""
+        try:
+            entry = _Entry(connect())
+        except BaseException:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opening -= 1
+            self._in_use[id(entry.connection)] = entry
+            self._stats['connections_opened'] += 1
+        return entry
+
+    def _check(self, entry):
+        """Return True if `entry` is fit to hand out, else close it"""
+        connection = entry.connection
+        now = time.monotonic()
+        healthy = (
+            not connection.closed
+            and now - entry.created_at < self.max_lifetime
+        )
+        if healthy and now - entry.returned_at >= self.check_after:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                if not connection.autocommit:
+                    connection.rollback()
+            except psycopg2.Error:
+                healthy = False
+                with self._cond:
+                    self._stats['failed_checks'] += 1
+        if not healthy:
+            self._close(entry)
+        return healthy
+
+    def _close(self, entry):
+        """Close `entry` and free its slot"""
+        try:
+            entry.connection.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._in_use.pop(id(entry.connection), None)
+            self._stats['connections_closed'] += 1
+            self._cond.notify()
+
+
+def get_pool(key, **options):
+    """Return this process's pool for `key`, creating it on first use.
+
+    A forked worker gets a fresh pool. The parent's connections are kept
+    referenced rather than closed, since closing a socket inherited from
+    the parent would end the parent's session too.
+    """
+    pool = _pools.get(key)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            if pool is not None:
+                _orphans.append(pool)
+            pool = _pools[key] = ConnectionPool(**options)
+        return pool
+
+
+def close_pools(alias):
+    """Close the idle connections of every pool for `alias`"""
+    for key, pool in list(_pools.items()):
+        if key[0] == alias:
+            pool.close()
+
+
+def all_stats():
+    """Return {alias: stats} for every pool in this process"""
+    return {
+        key[0]: pool.stats() for key, pool in list(_pools.items())
+        if pool.pid == os.getpid()
+    }
@@ -0,0 +1,130 @@
+"""
+Read-replica routing with read-your-writes stickiness
+
+Reads made while serving a safe (GET/HEAD/OPTIONS) request go to one of
+the DATABASE_REPLICAS aliases; everything else goes to the primary. A
+replica may lag, so a client that just wrote is pinned to the primary
+for REPLICA_PIN_SECONDS. The pin is carried two ways, so both browsers
+and token clients that ignore cookies are covered:
+
+- a signed cookie set on the response to the write, and
+- a per-user marker in the default cache, checked once the request is
+  authenticated.
+
+Outside a request (management commands, shells) and inside transactions
+on the primary, reads stay on the primary.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+COOKIE_SALT = 'core.db.routers.pin'
+
+_current = contextvars.ContextVar('replica_request', default=None)
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+def cookie_name():
+    return getattr(settings, 'REPLICA_PIN_COOKIE', 'db_pin')
+
+
+def user_pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+
+class RequestRouting:
+    """Where the reads of one request go, decided lazily and once"""
+
+    def __init__(self, request):
+        self.request = request
+        self.pinned = (
+            request.method not in SAFE_METHODS
+            or request.get_signed_cookie(
+                cookie_name(),
+                default=None,
+                salt=COOKIE_SALT,
+                max_age=pin_seconds(),
+            ) is not None
+        )
+        self.user_checked = False
+        self.replica = None
+
+    def is_pinned(self):
+        """Return True if reads must see this client's latest writes"""
+        if self.pinned or self.user_checked:
+            return self.pinned
+        user = getattr(self.request, 'user', None)
+        if user is not None and user.is_authenticated:
+            self.user_checked = True
+            self.pinned = bool(cache.get(user_pin_key(user.pk)))
+        return self.pinned
+
+    def read_alias(self):
+        """Return the replica this request reads from"""
+        if self.replica is None:
+            self.replica = random.choice(settings.DATABASE_REPLICAS)
+        return self.replica
+
+
+def start_request(request):
+    """Route the current context's reads for `request`; returns a token"""
+    return _current.set(RequestRouting(request))
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def pin_primary(request, response):
+    """Pin the client that made `request` to the primary for a while"""
+    seconds = pin_seconds()
+    response.set_signed_cookie(
+        cookie_name(),
+        '1',
+        salt=COOKIE_SALT,
+        max_age=seconds,
+        httponly=True,
+        samesite='Lax',
+    )
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        cache.set(user_pin_key(user.pk), 1, seconds)
+
+
+class ReplicaRouter:
+    """Send safe-request reads to a replica and the rest to the primary.
+
+    Models in REPLICA_PRIMARY_MODELS (auth lookups by default, so a
+    token is usable the moment it is issued) are always read from the
+    primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        routing = _current.get()
+        if not replicas or routing is None:
+            return None
+        primary_models = getattr(settings, 'REPLICA_PRIMARY_MODELS', [])
+        if (model._meta.label_lower in primary_models
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block
+                or routing.is_pinned()):
+            return DEFAULT_DB_ALIAS
+        return routing.read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Replicas hold the same data, so relations may cross them"""
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        aliases = {DEFAULT_DB_ALIAS, *replicas}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
@@ -0,0 +1,147 @@
+"""
+Awaitable password hashing in a bounded thread pool
+
+PBKDF2 and friends are deliberately slow. The signup and token views are
+async (see core.views) and await their hashes here, so a login holds
+neither the event loop nor a request thread while the hash runs. With
+PASSWORD_HASHING_WORKERS set, the hash runs in a pool of that many
+threads through `loop.run_in_executor`; the hashers release the GIL, so
+the pool spreads over every core. At most PASSWORD_HASHING_MAX_PENDING
+hashes may be queued or running; past that, callers wait up to
+PASSWORD_HASHING_WAIT seconds for a slot and then get PasswordHashingBusy,
+which the views answer with a 503 rather than piling up behind the pool.
+
+With PASSWORD_HASHING_WORKERS = 0 (the default) the hash runs in the
+event loop's default executor instead: still off the loop, but without
+a bound on queued hashes, so never refused. Synchronous callers (the
+admin login, create_user, set_password) keep using django's hashers
+directly and are never refused either.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    get_hasher,
+    identify_hasher,
+    is_password_usable,
+    make_password as django_make_password,
+)
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+SETTINGS = {
+    'PASSWORD_HASHING_WORKERS',
+    'PASSWORD_HASHING_MAX_PENDING',
+    'PASSWORD_HASHERS',
+}
+
+# How often a caller waiting for a free slot checks again.
+SLOT_POLL_INTERVAL = 0.01
+
+_lock = threading.Lock()
+_pool = None
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing pool has no free slot in time"""
+
+
+class _Pool:
+    """A thread pool plus the semaphore that bounds its queue"""
+
+    def __init__(self, workers, max_pending):
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='password-hashing',
+        )
+        # A threading semaphore rather than an asyncio one: callers come
+        # from more than one event loop (one per request under WSGI).
+        self.slots = threading.BoundedSemaphore(max_pending)
+
+    async def run(self, fn, *args):
+        wait = getattr(settings, 'PASSWORD_HASHING_WAIT', 5)
+        deadline = time.monotonic() + wait
+        while not self.slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise PasswordHashingBusy()
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self.slots.release()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+def get_pool():
+    """Return this process's hashing pool, or None to hash inline"""
+    global _pool
+    workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', 0)
+    if not workers:
+        return None
+    with _lock:
+        if _pool is None:
+            max_pending = getattr(
+                settings, 'PASSWORD_HASHING_MAX_PENDING', workers * 4,
+            )
+            _pool = _Pool(workers, max_pending)
+        return _pool
+
+
+@receiver(setting_changed)
+def reset_pool(setting, **kwargs):
+    """Rebuild the pool when its settings change (tests)"""
+    global _pool
+    if setting in SETTINGS:
+        with _lock:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = None
+
+
+async def _run(fn, *args):
+    pool = get_pool()
+    if pool is None:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+    return await pool.run(fn, *args)
+
+
+async def make_password(password):
+    """Hash a password like django's make_password(), off-thread"""
+    if password is None or not isinstance(password, (bytes, str)):
+        return django_make_password(password)
+    hasher = get_hasher()
+    return await _run(hasher.encode, password, hasher.salt())
+
+
+async def check_password(password, encoded, setter=None):
+    """Verify a password like django's check_password(), off-thread.
+
+    `setter`, if given, is a coroutine function called with the raw
+    password when the hash needs upgrading.
+    """
+    if password is None or not is_password_usable(encoded):
+        return False
+
+    preferred = get_hasher()
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    is_correct = await _run(hasher.verify, password, encoded)
+
+    # Same timing-gap hardening as django.contrib.auth.hashers.
+    if not is_correct and not hasher_changed and must_update:
+        await _run(hasher.harden_runtime, password, encoded)
+
+    if setter and is_correct and must_update:
+        await setter(password)
+    return is_correct
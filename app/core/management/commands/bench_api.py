@@ -0,0 +1,465 @@
+"""
+Django Command to load test the API end to end
+"""
+
+import http.client
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer,
+    WSGIRequestHandler,
+    get_internal_wsgi_application,
+)
+from django.db import connection, connections
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from recipe.models import Recipe
+
+PASSWORD = "benchmark-password"
+
+OPERATIONS = {
+    "list": 40,
+    "detail": 25,
+    "create": 10,
+    "update": 10,
+    "delete": 5,
+    "token": 5,
+    "signup": 5,
+}
+
+# Lower is better for latencies, higher for throughput.
+COMPARED = [
+    ("p50_ms", 1), ("p95_ms", 1), ("p99_ms", 1), ("throughput_rps", -1),
+]
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of sorted `values`"""
+    if not values:
+        return None
+    rank = math.ceil(pct / 100 * len(values))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def summarize(samples, errors, elapsed):
+    """Return latency percentiles and throughput for one operation.
+
+    `samples` are latencies in seconds; `errors` counts failed requests.
+    """
+    values = sorted(samples)
+    count = len(values)
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "count": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": ms(sum(values) / count) if count else None,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if count else None,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Return (rows, regressions) comparing two results documents.
+
+    Each row is (operation, metric, baseline, current, change %). A
+    regression is a change worse than `threshold` percent.
+    """
+    rows, regressions = [], []
+    for name, now in current["operations"].items():
+        before = baseline["operations"].get(name)
+        if before is None:
+            continue
+        for metric, direction in COMPARED:
+            old, new = before.get(metric), now.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            row = (name, metric, old, new, change)
+            rows.append(row)
+            if change * direction > threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class QuietHandler(WSGIRequestHandler):
+    """Request handler that doesn't log every request"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port_queue):
+    """Serve the project's WSGI app on a free port until terminated"""
+    # Measure what production runs: no query log, no per-request log
+    # lines, no throttling (every client would soon get 429s).
+    with override_settings(
+        DEBUG=False,
+        ALLOWED_HOSTS=["127.0.0.1"],
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {},
+        },
+    ):
+        server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler)
+        server.set_app(get_internal_wsgi_application())
+        # After loading the app, which configures logging again.
+        logging.getLogger("core.timing").setLevel(logging.WARNING)
+        port_queue.put(server.server_port)
+        server.serve_forever()
+
+
+class Client:
+    """One simulated API client with a keep-alive connection"""
+
+    def __init__(self, port, account, rng):
+        self.port = port
+        self.email, self.key, self.recipe_ids = account
+        self.rng = rng
+        self.created = []
+        self.conn = http.client.HTTPConnection("127.0.0.1", port)
+
+    def request(self, method, path, body=None, auth=True):
+        """Make a request; return (status, decoded JSON or None)"""
+        headers = {"Accept": "application/json"}
+        if auth:
+            headers["Authorization"] = f"Token {self.key}"
+        data = None
+        if body is not None:
+            data = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            try:
+                self.conn.request(method, path, data, headers)
+                response = self.conn.getresponse()
+                content = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # The server closed the keep-alive connection; reconnect.
+                self.conn.close()
+                if attempt:
+                    raise
+        if content and response.getheader("Content-Type", "").startswith(
+            "application/json"
+        ):
+            return response.status, json.loads(content)
+        return response.status, None
+
+    def recipe_body(self):
+        number = self.rng.randrange(10 ** 6)
+        return {
+            "title": f"Bench recipe {number}",
+            "times_minutes": self.rng.randint(1, 240),
+            "price": f"{self.rng.randint(100, 5000) / 100:.2f}",
+            "description": "Mix, rest and bake until golden.",
+        }
+
+    def list(self):
+        return self.request("GET", "/_/recipe/")[0] == 200
+
+    def detail(self):
+        recipe_id = self.rng.choice(self.recipe_ids)
+        return self.request("GET", f"/_/recipe/{recipe_id}/")[0] == 200
+
+    def create(self):
+        status, data = self.request("POST", "/_/recipe/", self.recipe_body())
+        if status == 201:
+            self.created.append(data["id"])
+        return status == 201
+
+    def update(self):
+        recipe_id = self.rng.choice(self.created or self.recipe_ids)
+        status, _ = self.request(
+            "PATCH", f"/_/recipe/{recipe_id}/",
+            {"title": f"Renamed {self.rng.randrange(10 ** 6)}"},
+        )
+        return status == 200
+
+    def delete(self):
+        if not self.created:
+            return None
+        recipe_id = self.created.pop()
+        return self.request("DELETE", f"/_/recipe/{recipe_id}/")[0] == 204
+
+    def token(self):
+        status, _ = self.request(
+            "POST", "/_/auth/user/token/",
+            {"email": self.email, "password": PASSWORD}, auth=False,
+        )
+        return status == 200
+
+    def signup(self):
+        status, _ = self.request(
+            "POST", "/_/auth/user/create/",
+            {
+                "email": f"signup-{uuid.uuid4().hex}@example.com",
+                "password": PASSWORD,
+                "first_name": "Bench",
+                "last_name": "User",
+            },
+            auth=False,
+        )
+        return status == 201
+
+
+class Command(BaseCommand):
+    """Drive signup, token, recipe CRUD and list against the WSGI app.
+
+    A separate `<NAME>_bench` database is created and seeded with
+    `--users` users owning `--recipes` recipes (skewed, so a few users
+    own many). The project's WSGI application is served by a threaded
+    server in a child process, with DEBUG, throttles and request logs
+    off, and `--concurrency` keep-alive clients run a weighted mix of
+    operations for `--duration` seconds after a warm-up. Latency
+    percentiles and throughput per operation are written to `--output`
+    as JSON; `--compare` checks them against an earlier run and fails
+    on regressions above `--threshold` percent.
+    """
+
+    help = "Load test the API and record latency percentiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--recipes", type=int, default=20000)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=20.0)
+        parser.add_argument("--warmup", type=float, default=3.0)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{k}={v}" for k, v in OPERATIONS.items()),
+            help="Weighted operations, e.g. list=80,detail=20.",
+        )
+        parser.add_argument("--output", default="bench_api.json")
+        parser.add_argument("--compare", help="Earlier results file.")
+        parser.add_argument("--threshold", type=float, default=10.0)
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the seeded database for the next run.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry Point for command"""
+        mix = self.parse_mix(options["mix"])
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+
+        old_name = settings.DATABASES["default"]["NAME"]
+        connection.settings_dict["TEST"] = {
+            **connection.settings_dict.get("TEST", {}),
+            "NAME": f"{old_name}_bench",
+        }
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+            keepdb=options["keepdb"],
+        )
+        try:
+            accounts = self.seed(
+                options["users"], options["recipes"], options["seed"],
+            )
+            results = self.run(accounts, mix, options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"],
+            )
+
+        with open(options["output"], "w") as f:
+            json.dump(results, f, indent=2)
+        self.report(results)
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            self.compare(baseline, results, options["threshold"])
+
+    def parse_mix(self, text):
+        mix = {}
+        for item in text.split(","):
+            name, _, weight = item.partition("=")
+            if name not in OPERATIONS:
+                raise CommandError(
+                    f"Unknown operation {name!r}; expected some of "
+                    f"{', '.join(OPERATIONS)}."
+                )
+            mix[name] = int(weight or 1)
+        return mix
+
+    def seed(self, users, recipes, seed):
+        """Create the users, tokens and recipes; return client accounts.
+
+        Reuses the data already there (with --keepdb). Recipe ownership
+        follows a Zipf curve, like real libraries; see generate_data.
+        """
+        User = get_user_model()
+        if not User.objects.filter(email__startswith="bench-").exists():
+            call_command(
+                "generate_data", users=users, recipes=recipes, seed=seed,
+                email_prefix="bench", password=PASSWORD, stdout=self.stdout,
+            )
+            Token.objects.bulk_create([
+                Token(key=Token.generate_key(), user_id=user_id)
+                for user_id in User.objects
+                .filter(email__startswith="bench-")
+                .values_list("id", flat=True)
+            ], batch_size=1000)
+
+        recipe_ids = {}
+        for user_id, recipe_id in Recipe.objects.values_list("user", "id"):
+            recipe_ids.setdefault(user_id, []).append(recipe_id)
+        return [
+            (token.user.email, token.key, recipe_ids[token.user_id])
+            for token in Token.objects.select_related("user")
+            .filter(user__email__startswith="bench-", user_id__in=recipe_ids)
+            .order_by("user_id")
+        ]
+
+    def run(self, accounts, mix, options):
+        """Serve the app, drive the clients and return the results"""
+        context = multiprocessing.get_context("fork")
+        port_queue = context.Queue()
+        connections.close_all()
+        server = context.Process(target=serve, args=(port_queue,))
+        server.start()
+        try:
+            port = port_queue.get(timeout=30)
+            samples, errors, elapsed = self.drive(
+                port, accounts, mix, options,
+            )
+        finally:
+            server.terminate()
+            server.join()
+
+        operations = {
+            name: summarize(samples[name], errors[name], elapsed)
+            for name in mix
+        }
+        all_samples = [value for values in samples.values()
+                       for value in values]
+        return {
+            "meta": {
+                "started": datetime.now(timezone.utc).isoformat(),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+                "users": options["users"],
+                "recipes": options["recipes"],
+                "concurrency": options["concurrency"],
+                "duration": options["duration"],
+                "mix": mix,
+                "seed": options["seed"],
+            },
+            "total": summarize(all_samples, sum(errors.values()), elapsed),
+            "operations": operations,
+        }
+
+    def drive(self, port, accounts, mix, options):
+        """Run the clients; return samples and errors per operation"""
+        names, weights = list(mix), list(mix.values())
+        samples = {name: [] for name in names}
+        errors = dict.fromkeys(names, 0)
+        lock = threading.Lock()
+        start = time.monotonic()
+        measure_from = start + options["warmup"]
+        deadline = measure_from + options["duration"]
+
+        def work(index):
+            rng = random.Random(options["seed"] * 1000 + index)
+            client = Client(port, accounts[index % len(accounts)], rng)
+            local = {name: [] for name in names}
+            failed = dict.fromkeys(names, 0)
+            while True:
+                name = rng.choices(names, weights)[0]
+                began = time.monotonic()
+                if began >= deadline:
+                    break
+                try:
+                    ok = getattr(client, name)()
+                except (OSError, http.client.HTTPException, ValueError):
+                    ok = False
+                if ok is None:
+                    continue  # nothing to do yet, e.g. no recipe to delete
+                if began >= measure_from:
+                    local[name].append(time.monotonic() - began)
+                    failed[name] += not ok
+            with lock:
+                for name in names:
+                    samples[name].extend(local[name])
+                    errors[name] += failed[name]
+
+        threads = [
+            threading.Thread(target=work, args=(i,))
+            for i in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, errors, options["duration"]
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'operation':>10} {'count':>7} {'errors':>6} {'rps':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        rows = [*results["operations"].items(), ("total", results["total"])]
+        for name, stats in rows:
+            self.stdout.write(
+                f"{name:>10} {stats['count']:>7} {stats['errors']:>6} "
+                f"{stats['throughput_rps']:>8.1f} "
+                + " ".join(
+                    f"{stats[key]:>8.2f}" if stats[key] is not None
+                    else f"{'-':>8}"
+                    for key in ("p50_ms", "p95_ms", "p99_ms")
+                )
+            )
+
+    def compare(self, baseline, results, threshold):
+        rows, regressions = compare(baseline, results, threshold)
+        revision = baseline["meta"].get("revision") or "baseline"
+        self.stdout.write(f"Compared with {revision}:")
+        for name, metric, old, new, change in rows:
+            line = (
+                f"{name:>10} {metric:>14} {old:>10.2f} -> {new:>10.2f} "
+                f"({change:+.1f}%)"
+            )
+            if (name, metric, old, new, change) in regressions:
+                line = self.style.ERROR(line + "  REGRESSION")
+            self.stdout.write(line)
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} metric(s) regressed by more than "
+                f"{threshold:g}%."
+            )
@@ -0,0 +1,96 @@
+"""
+Django Command to benchmark the API's JSON renderers and parsers
+"""
+
+import io
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+def recipe(index, description=False):
+    """Return a recipe shaped like the API emits it"""
+    data = {
+        "id": index,
+        "title": f"Benchmark recipe {index} — crème brûlée",
+        "slug": f"benchmark-recipe-{index}",
+        "times_minutes": index % 240,
+        "price": Decimal(index % 100000) / 100,
+        "link": f"https://example.com/recipes/{index}",
+    }
+    if description:
+        data["description"] = "Whisk, bake and rest overnight. " * 20
+    return data
+
+
+def payloads(page_size):
+    """Return representative (name, data) pairs"""
+    return [
+        ("list page", {
+            "next": "https://example.com/api/recipe/recipes/?cursor=cD0x",
+            "previous": None,
+            "results": [recipe(i) for i in range(page_size)],
+        }),
+        ("detail", recipe(1, description=True)),
+        ("user", {
+            "email": "user@example.com",
+            "name": "Benchmark User",
+            "date_joined": datetime.now(timezone.utc),
+        }),
+    ]
+
+
+class Command(BaseCommand):
+    """Compare DRF's stdlib JSON with the orjson renderer and parser.
+
+    Encodes each payload with both renderers, then decodes the encoded
+    bytes with both parsers, reporting the best of `--repeat` timed
+    batches of `--number` calls.
+    """
+
+    help = "Benchmark JSON encode and decode throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--page-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        """Entry Point for command"""
+        number, repeat = options["number"], options["repeat"]
+        for name, data in payloads(options["page_size"]):
+            body = JSONRenderer().render(data)
+            self.stdout.write(f"{name} ({len(body)} bytes)")
+            runs = [
+                ("encode", "json", lambda: JSONRenderer().render(data)),
+                ("encode", "orjson", lambda: ORJSONRenderer().render(data)),
+                ("decode", "json", lambda: self.parse(JSONParser, body)),
+                ("decode", "orjson", lambda: self.parse(ORJSONParser, body)),
+            ]
+            for op, label, func in runs:
+                best = min(self.time(func, number) for _ in range(repeat))
+                rate = number / best
+                self.stdout.write(self.style.SUCCESS(
+                    f"  {op} {label:>6}: {rate:10.0f} ops/s  "
+                    f"{rate * len(body) / 2 ** 20:8.1f} MiB/s"
+                ))
+
+    def parse(self, parser_class, body):
+        """Parse `body` with a fresh `parser_class`"""
+        return parser_class().parse(
+            io.BytesIO(body), "application/json", {"encoding": "utf-8"},
+        )
+
+    def time(self, func, number):
+        """Return how long `number` calls of `func` take"""
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - start
@@ -0,0 +1,81 @@
+"""
+Django Command to benchmark login password verification
+"""
+
+import asyncio
+import os
+import time
+
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from core import hashing
+
+
+class Command(BaseCommand):
+    """Measure check_password throughput with and without the hashing pool.
+
+    Each run drives `--concurrency` logins on one event loop, each
+    verifying a password for `--seconds` seconds, the same await
+    CreateTokenView does per login.
+    """
+
+    help = "Benchmark login password verification throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=os.cpu_count(),
+        )
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Hashing pool size for the pooled run.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry Point for command"""
+        password = "benchmark-password"
+        hasher = get_hasher()
+        encoded = hasher.encode(password, hasher.salt())
+        cores = os.cpu_count() or 1
+
+        self.stdout.write(
+            f"{hasher.algorithm}, {options['concurrency']} concurrent logins, "
+            f"{cores} cores, {options['seconds']}s per run"
+        )
+        runs = [("default", 0), ("pooled", options["workers"])]
+        for label, workers in runs:
+            with override_settings(
+                PASSWORD_HASHING_WORKERS=workers,
+                # Room for every login, so none is refused as busy.
+                PASSWORD_HASHING_MAX_PENDING=max(options["concurrency"], 1),
+            ):
+                logins = asyncio.run(self.run(
+                    password, encoded,
+                    options["concurrency"], options["seconds"],
+                ))
+            rate = logins / options["seconds"]
+            self.stdout.write(self.style.SUCCESS(
+                f"{label:>7}: {rate:9.1f} logins/s  "
+                f"{rate / cores:8.1f} logins/s/core"
+            ))
+
+    async def run(self, password, encoded, concurrency, seconds):
+        """Return how many checks `concurrency` logins finish in `seconds`"""
+        # Warm up so pool start-up is not part of the measurement.
+        await hashing.check_password(password, encoded)
+        deadline = time.monotonic() + seconds
+
+        async def login():
+            count = 0
+            while time.monotonic() < deadline:
+                await hashing.check_password(password, encoded)
+                count += 1
+            return count
+
+        return sum(await asyncio.gather(
+            *(login() for _ in range(concurrency))
+        ))
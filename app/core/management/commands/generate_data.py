@@ -0,0 +1,257 @@
+"""
+Django Command to generate large synthetic users and recipes
+"""
+
+import csv
+import io
+import math
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from recipe import stats
+from recipe.models import Recipe, RecipeStats
+
+ADJECTIVES = [
+    "Smoky", "Crispy", "Creamy", "Spicy", "Zesty", "Rustic", "Golden",
+    "Tangy", "Hearty", "Sticky", "Herby", "Charred", "Silky", "Sweet",
+]
+DISHES = [
+    "lentil soup", "chicken curry", "mushroom risotto", "fish tacos",
+    "banana bread", "beef stew", "pad thai", "shakshuka", "gnocchi",
+    "ramen", "apple pie", "falafel", "paella", "carbonara", "dal",
+]
+WORDS = (
+    "chop stir simmer roast whisk fold season rest bake grill toss serve "
+    "garlic onion lemon butter thyme chilli ginger tomato cream salt"
+).split()
+
+FIRST_NAMES = ["Ada", "Kofi", "Mei", "Lars", "Amara", "Diego", "Yuki", "Ola"]
+LAST_NAMES = ["Mensah", "Okafor", "Silva", "Chen", "Novak", "Haddad", "Berg"]
+
+
+def aware_datetime(value):
+    """Parse an ISO 8601 --now, reading a naive value as UTC"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Not an ISO 8601 datetime: {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+def zipf_weights(count, exponent):
+    """Cumulative weights giving rank r a share proportional to r**-s"""
+    total, cumulative = 0.0, []
+    for rank in range(1, count + 1):
+        total += rank ** -exponent
+        cumulative.append(total)
+    return cumulative
+
+
+def lognormal(rng, median, sigma, low, high):
+    return min(max(rng.lognormvariate(math.log(median), sigma), low), high)
+
+
+class Command(BaseCommand):
+    """Generate `--users` users owning `--recipes` recipes.
+
+    Every user shares one precomputed password hash, so no per-user
+    PBKDF2 is paid. Recipes are spread over users with a Zipf curve
+    (`--skew` 0 is uniform), with log-normal cook times and prices. Rows
+    are written in batches with COPY (or bulk_create), each batch
+    committed on its own. The same `--seed` and `--now` produce the same
+    rows, timestamps included, whatever the id sequences are at. The
+    users' recipe stats are rebuilt at the end.
+    """
+
+    help = "Generate synthetic users and recipes for performance tests."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=100000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.0,
+            help="Zipf exponent of recipes per user; 0 is uniform.",
+        )
+        parser.add_argument("--median-minutes", type=float, default=35)
+        parser.add_argument("--median-price", type=float, default=12.0)
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Spread updated_at over this many past days.",
+        )
+        parser.add_argument(
+            "--now",
+            type=aware_datetime,
+            default="2024-01-01T00:00:00+00:00",
+            help="Timestamps are spread back from this ISO 8601 datetime.",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--method", choices=["copy", "bulk_create"], default="copy",
+        )
+        parser.add_argument("--email-prefix", default="user")
+        parser.add_argument("--password", default="password")
+
+    def handle(self, *args, **options):
+        """Entry Point for command"""
+        User = get_user_model()
+        prefix = options["email_prefix"]
+        if User.objects.filter(email__startswith=f"{prefix}-").exists():
+            raise CommandError(
+                f"Users named {prefix}-* already exist; "
+                "pick another --email-prefix."
+            )
+        if options["users"] < 1 and options["recipes"]:
+            raise CommandError("Recipes need at least one user.")
+
+        self.rng = random.Random(options["seed"])
+        self.now = options["now"]
+        self.options = options
+        self.password_hash = make_password(options["password"])
+        write = getattr(self, f"write_{options['method']}")
+
+        self.load(User, options["users"], self.user_rows, write)
+        # Owners are drawn by index into the generated users, not by id,
+        # so the recipes do not depend on where the id sequence was.
+        ids = dict(
+            User.objects.filter(email__startswith=f"{prefix}-")
+            .values_list("email", "id")
+        )
+        self.owner_ids = [
+            ids[self.email(index)] for index in range(options["users"])
+        ]
+        self.cum_weights = zipf_weights(
+            len(self.owner_ids), options["skew"],
+        )
+        self.load(Recipe, options["recipes"], self.recipe_rows, write)
+        stats.rebuild(self.owner_ids)
+
+        with connection.cursor() as cursor:
+            for model in (User, Recipe, RecipeStats):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def load(self, model, count, make_rows, write):
+        """Write `count` rows in batches and report the rate"""
+        start = time.perf_counter()
+        batch_size = self.options["batch_size"]
+        written = 0
+        while written < count:
+            size = min(batch_size, count - written)
+            write(model, make_rows(written, size))
+            written += size
+            if self.options["verbosity"] > 1:
+                self.stdout.write(f"  {model.__name__}: {written}/{count}")
+        elapsed = time.perf_counter() - start
+
+        rate = written / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{model._meta.verbose_name_plural}: {written} rows in "
+            f"{elapsed:.2f}s ({rate:,.0f} rows/s)"
+        ))
+
+    def email(self, index):
+        """Return the email of the index-th generated user"""
+        return f"{self.options['email_prefix']}-{index}@example.com"
+
+    def user_rows(self, offset, size):
+        """Return `size` user rows as {column: value} dicts"""
+        rows = []
+        for index in range(offset, offset + size):
+            joined = self.now - timedelta(
+                seconds=self.rng.randrange(self.options["days"] * 86400 + 1)
+            )
+            rows.append({
+                "email": self.email(index),
+                "password": self.password_hash,
+                "first_name": self.rng.choice(FIRST_NAMES),
+                "last_name": self.rng.choice(LAST_NAMES),
+                "is_active": True,
+                "is_staff": False,
+                "is_superuser": False,
+                "date_joined": joined,
+                "updated_at": joined,
+            })
+        return rows
+
+    def recipe_rows(self, offset, size):
+        """Return `size` recipe rows as {column: value} dicts"""
+        rng = self.rng
+        rows = []
+        for index in range(offset, offset + size):
+            # Drawn row by row so --batch-size does not change the rows.
+            owner, = rng.choices(
+                range(len(self.owner_ids)), cum_weights=self.cum_weights,
+            )
+            title = f"{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}"
+            minutes = lognormal(
+                rng, self.options["median_minutes"], 0.7, 1, 600,
+            )
+            price = lognormal(
+                rng, self.options["median_price"], 0.6, 0.5, 9999.99,
+            )
+            description = " ".join(rng.choices(WORDS, k=rng.randint(0, 40)))
+            rows.append({
+                "user_id": self.owner_ids[owner],
+                "title": title,
+                "slug": f"{slugify(title)}-{index}",
+                "description": description.capitalize(),
+                "times_minutes": round(minutes),
+                "price": Decimal(f"{price:.2f}"),
+                "link": (
+                    f"https://example.com/r/{index}"
+                    if rng.random() < 0.3 else ""
+                ),
+                "updated_at": self.now - timedelta(
+                    seconds=rng.randrange(self.options["days"] * 86400 + 1)
+                ),
+            })
+        return rows
+
+    def write_copy(self, model, rows):
+        """Load rows with a single COPY"""
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                value.isoformat() if hasattr(value, "isoformat") else value
+                for value in row.values()
+            ])
+        buffer.seek(0)
+        # Without FORCE_NOT_NULL an empty CSV field would be read as NULL.
+        text_columns = [
+            field.column for field in model._meta.concrete_fields
+            if field.get_internal_type() in ("CharField", "TextField",
+                                             "SlugField", "EmailField")
+            and field.column in columns
+        ]
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {model._meta.db_table} ({', '.join(columns)}) "
+                f"FROM STDIN WITH (FORMAT csv, "
+                f"FORCE_NOT_NULL ({', '.join(text_columns)}))",
+                buffer,
+            )
+
+    def write_bulk_create(self, model, rows):
+        """Load rows with one bulk INSERT
+
+        auto_now fields are stamped by Django here, so the generated
+        timestamps only survive the COPY path.
+        """
+        model.objects.bulk_create(model(**row) for row in rows)
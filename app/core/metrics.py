@@ -0,0 +1,226 @@
+"""
+Prometheus-style metrics kept in this process
+
+Histograms and counters are plain dicts of floats guarded by a lock, so
+recording a request costs a few microseconds and needs no client
+library. `render()` produces the Prometheus text exposition format.
+Each worker process keeps its own numbers; scrape every worker (or sum
+them downstream) when running more than one.
+"""
+import bisect
+import threading
+
+from core.db import pool as pooling
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+    5.0, 10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(names, values):
+    pairs = [
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'),
+        )
+        for name, value in zip(names, values)
+    ]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value):
+    if isinstance(value, float) and value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing value per label set"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels):
+        return self._values.get(labels, 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield '{}{} {}'.format(
+                self.name,
+                format_labels(self.labelnames, labels),
+                format_value(value),
+            )
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label set"""
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts, a final +Inf slot, then the sum.
+                series = self._series[labels] = [0] * (len(self.buckets) + 1)
+                series.append(0.0)
+            series[index] += 1
+            series[-1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self, labels):
+        """Return (cumulative bucket counts, count, sum) for `labels`"""
+        with self._lock:
+            series = list(self._series.get(labels) or ())
+        if not series:
+            return [], 0, 0.0
+        counts, total = series[:-1], series[-1]
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, total
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            labelsets = sorted(self._series)
+        bounds = self.buckets + (float('inf'),)
+        for labels in labelsets:
+            cumulative, count, total = self.snapshot(labels)
+            for bound, value in zip(bounds, cumulative):
+                yield '{}_bucket{} {}'.format(
+                    self.name,
+                    format_labels(
+                        self.labelnames + ('le',),
+                        labels + (format_value(float(bound)),),
+                    ),
+                    value,
+                )
+            label_text = format_labels(self.labelnames, labels)
+            yield f'{self.name}_sum{label_text} {format_value(total)}'
+            yield f'{self.name}_count{label_text} {count}'
+
+
+REQUEST_LABELS = ('route', 'method')
+
+requests_total = Counter(
+    'http_requests_total',
+    'Requests served, by route, method and status.',
+    REQUEST_LABELS + ('status',),
+)
+request_seconds = Histogram(
+    'http_request_duration_seconds',
+    'Time to produce the response.',
+    REQUEST_LABELS,
+)
+db_seconds = Histogram(
+    'http_request_db_seconds',
+    'Time spent executing SQL per request.',
+    REQUEST_LABELS,
+)
+queries = Histogram(
+    'http_request_queries',
+    'SQL queries executed per request.',
+    REQUEST_LABELS,
+    buckets=QUERY_BUCKETS,
+)
+serialize_seconds = Histogram(
+    'http_request_serialize_seconds',
+    'Time spent in serializers per request.',
+    REQUEST_LABELS,
+)
+render_seconds = Histogram(
+    'http_request_render_seconds',
+    'Time spent rendering the response body.',
+    REQUEST_LABELS,
+)
+
+REGISTRY = [
+    requests_total,
+    request_seconds,
+    db_seconds,
+    queries,
+    serialize_seconds,
+    render_seconds,
+]
+
+POOL_GAUGES = ('size', 'idle', 'in_use', 'min_size', 'max_size')
+
+
+def observe_request(route, method, status, total, timing):
+    """Record one request's timings (a core.timing.RequestTiming)"""
+    labels = (route, method)
+    requests_total.inc(labels + (str(status),))
+    request_seconds.observe(labels, total)
+    db_seconds.observe(labels, timing.durations['db'])
+    queries.observe(labels, timing.queries)
+    serialize_seconds.observe(labels, timing.durations['serialize'])
+    render_seconds.observe(labels, timing.durations['render'])
+
+
+def collect_pools():
+    """Expose core.db.pool statistics as gauges and counters"""
+    stats = pooling.all_stats()
+    if not stats:
+        return
+    for key in sorted(next(iter(stats.values()))):
+        kind = 'gauge' if key in POOL_GAUGES else 'counter'
+        name = f'db_pool_{key}' + ('' if kind == 'gauge' else '_total')
+        yield f'# HELP {name} Connection pool {key.replace("_", " ")}.'
+        yield f'# TYPE {name} {kind}'
+        for alias, values in sorted(stats.items()):
+            yield '{}{} {}'.format(
+                name,
+                format_labels(('alias',), (alias,)),
+                format_value(values[key]),
+            )
+
+
+def render():
+    """Return every metric in the Prometheus text format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    lines.extend(collect_pools())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Forget every observation; for tests"""
+    for metric in REGISTRY:
+        metric.clear()
@@ -0,0 +1,301 @@
+"""
+Middleware for the API
+"""
+import contextlib
+import math
+import time
+import zlib
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from core import metrics, timing
+from core.db import routers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+class GzipCompressor:
+    """Incremental gzip stream"""
+
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    """Incremental brotli stream"""
+
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class ZstdCompressor:
+    """Incremental zstd stream"""
+
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+COMPRESSORS = {'gzip': GzipCompressor}
+if brotli is not None:
+    COMPRESSORS['br'] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS['zstd'] = ZstdCompressor
+
+
+def parse_accept_encoding(header):
+    """Return {coding: q} for an Accept-Encoding header"""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with the best encoding the client accepts.
+
+    A drop-in replacement for GZipMiddleware that also speaks brotli and
+    zstd when their packages are installed (COMPRESSION_ENCODINGS gives
+    the server's preference). Only content types listed in
+    COMPRESSION_LEVELS are compressed, each at its own per-encoding
+    level. Responses under COMPRESSION_MIN_SIZE bytes are sent as is;
+    streaming responses are compressed incrementally, flushed every
+    COMPRESSION_STREAM_FLUSH_SIZE bytes so clients still get rows early.
+    """
+
+    def process_response(self, request, response):
+        min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 500)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        if response.has_header('Content-Encoding'):
+            return response
+
+        levels = self.get_levels(response)
+        if levels is None:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = self.select_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), levels,
+        )
+        if encoding is None:
+            return response
+        compressor = COMPRESSORS[encoding](levels[encoding])
+
+        if response.streaming:
+            response.streaming_content = self.compress_sequence(
+                response.streaming_content, compressor,
+            )
+            del response.headers['Content-Length']
+        else:
+            content = response.content
+            compressed = compressor.compress(content) + compressor.finish()
+            if len(compressed) >= len(content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # A strong ETag must not survive a change of representation; a
+        # weak one still matches conditional requests (RFC 7232 2.1).
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def get_levels(self, response):
+        """Return {encoding: level} for the response's content type.
+
+        Looks up the exact media type, then `type/*`; None means the
+        content type is not worth compressing.
+        """
+        levels = getattr(settings, 'COMPRESSION_LEVELS', {})
+        media_type = response.get('Content-Type', '').split(';')[0]
+        media_type = media_type.strip().lower()
+        if media_type in levels:
+            return levels[media_type]
+        return levels.get(media_type.split('/')[0] + '/*')
+
+    def select_encoding(self, header, levels):
+        """Return the encoding to use, or None to send identity.
+
+        The client's highest q-value wins; ties go to the first encoding
+        in COMPRESSION_ENCODINGS.
+        """
+        accepted = parse_accept_encoding(header)
+        preference = getattr(
+            settings, 'COMPRESSION_ENCODINGS', ['br', 'zstd', 'gzip'],
+        )
+        best, best_q = None, 0.0
+        for encoding in preference:
+            if encoding not in COMPRESSORS or encoding not in levels:
+                continue
+            q = accepted.get(encoding, accepted.get('*', 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def compress_sequence(self, sequence, compressor):
+        """Compress a streaming body chunk by chunk.
+
+        Output is flushed once COMPRESSION_STREAM_FLUSH_SIZE bytes of
+        input have gone in, rather than per chunk, so row-sized chunks
+        don't each pay for a flush block.
+        """
+        flush_size = getattr(settings, 'COMPRESSION_STREAM_FLUSH_SIZE', 16384)
+        pending = 0
+        for chunk in sequence:
+            data = compressor.compress(chunk)
+            pending += len(chunk)
+            if pending >= flush_size:
+                data += compressor.flush()
+                pending = 0
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+class ReplicaPinningMiddleware:
+    """Route a request's reads and pin clients that write to the primary.
+
+    See core.db.routers. A request that is not a safe method and did not
+    fail (status < 400) counts as a write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = routers.start_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.finish_request(token)
+
+        if (request.method not in routers.SAFE_METHODS
+                and response.status_code < 400):
+            routers.pin_primary(request, response)
+        return response
+
+
+class RateLimitHeadersMiddleware:
+    """Report the request's rate limit in X-RateLimit-* headers.
+
+    core.throttling.TokenBucketThrottle leaves its decision on the
+    request; 429 responses get Retry-After from DRF itself.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        decision = getattr(request, 'rate_limit', None)
+        if decision is not None:
+            response['X-RateLimit-Limit'] = str(decision.limit)
+            response['X-RateLimit-Remaining'] = str(decision.remaining)
+            response['X-RateLimit-Reset'] = str(math.ceil(decision.reset))
+        return response
+
+
+class TimingMiddleware:
+    """Measure every request: total, SQL, serializer and render time.
+
+    Goes first in MIDDLEWARE so the total covers the whole stack. The
+    breakdown is sent as a Server-Timing header (unless
+    SERVER_TIMING_HEADER is off), logged on "core.timing" and recorded
+    in the per-route histograms of core.metrics, labelled with the URL
+    name. The body of a streaming response is produced after this
+    returns and is not included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_timing = timing.RequestTiming()
+        token = timing.start(request_timing)
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(request_timing),
+                    )
+                response = self.get_response(request)
+        finally:
+            timing.finish(token)
+        total = time.perf_counter() - request_timing.start
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match is not None else 'unmatched'
+        metrics.observe_request(
+            route, request.method, response.status_code, total,
+            request_timing,
+        )
+        request_timing.log(request, route, response.status_code, total)
+        if getattr(settings, 'SERVER_TIMING_HEADER', True):
+            response['Server-Timing'] = request_timing.server_timing(total)
+        return response
+
+    def process_template_response(self, request, response):
+        """Time the render that follows, for DRF and template responses"""
+        request_timing = timing.current()
+        if request_timing is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: request_timing.add(
+                    'render', time.perf_counter() - start,
+                ),
+            )
+        return response
@@ -0,0 +1,28 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# The admin's `icontains` search compiles to UPPER(column) LIKE '%term%',
+# so the trigram indexes are built on UPPER(column) to match it.
+TRIGRAM_INDEXES = [
+    ('core_user_email_trgm_idx', 'email'),
+    ('core_user_first_name_trgm_idx', 'first_name'),
+    ('core_user_last_name_trgm_idx', 'last_name'),
+]
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('core', '0002_user_updated_at'),
+    ]
+
+    operations = [TrigramExtension()] + [
+        migrations.RunSQL(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON core_user '
+            f'USING gin (UPPER({column}) gin_trgm_ops);',
+            f'DROP INDEX CONCURRENTLY IF EXISTS {name};',
+        )
+        for name, column in TRIGRAM_INDEXES
+    ]
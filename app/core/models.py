@@ -12,15 +12,23 @@ from django.contrib.auth.models import (
 class UserManager(BaseUserManager):
     """Manager for User"""
 
-    def create_user(self, email, password, **extra_fields):
-        """Create save and return new User"""
+    def create_user(self, email, password, password_hash=None,
+                    **extra_fields):
+        """Create save and return new User
+
+        `password_hash` is `password` already hashed, by callers that
+        await the hash off the request thread (see core.hashing).
+        """
         if not email:
             raise ValueError("User must have an email address")
         user = self.model(
             email=self.normalize_email(email),
             **extra_fields,
         )
-        user.set_password(password)
+        if password_hash is None:
+            user.set_password(password)
+        else:
+            user.password = password_hash
         if not password:
             raise ValueError("User must have a password")
         user.save(using=self._db)
@@ -46,6 +54,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = UserManager()
 
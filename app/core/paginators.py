@@ -0,0 +1,59 @@
+"""
+Paginators for large admin changelists
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that avoids exact COUNT(*)s over big changelists.
+
+    An unfiltered changelist is counted from pg_class.reltuples, the row
+    estimate Postgres keeps per table, once that exceeds
+    ADMIN_ESTIMATED_COUNT_THRESHOLD; below it the exact count is cheap,
+    so it is still used. Planner estimates for filtered or searched
+    changelists can be off by orders of magnitude, so those are counted
+    exactly but only up to the threshold: past it, `count` stops at
+    threshold + 1 and `capped` is set, for the templates to show
+    "threshold+".
+    """
+
+    capped = False
+
+    @property
+    def threshold(self):
+        return getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 10000)
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return super().count
+
+        if not query.where:
+            estimate = self.estimate(self.object_list)
+            if estimate is None or estimate < self.threshold:
+                return super().count
+            return estimate
+
+        # SELECT COUNT(*) FROM (... LIMIT threshold + 1)
+        count = self.object_list.order_by()[:self.threshold + 1].count()
+        self.capped = count > self.threshold
+        return count
+
+    @staticmethod
+    def estimate(queryset):
+        """Return Postgres' row estimate for a model's table, or None"""
+        connection = connections[queryset.db]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1 means the table has never been analyzed.
+        if row is None or row[0] < 0:
+            return None
+        return int(row[0])
@@ -0,0 +1,37 @@
+"""
+Parsers for the API
+"""
+import io
+
+import orjson
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser that decodes with orjson.
+
+    orjson only reads UTF-8 and rejects NaN/Infinity, matching DRF's
+    STRICT_JSON default. Other encodings, and bodies orjson refuses, go
+    through the stdlib parser so error messages stay the same as
+    JSONParser's. Unlike json, orjson reads integers wider than 64 bits
+    as floats; no field in this API accepts values that large.
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON"""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        if self.strict and encoding.lower().replace('_', '-') == 'utf-8':
+            body = stream.read()
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                stream = io.BytesIO(body)
+
+        return super().parse(stream, media_type, parser_context)
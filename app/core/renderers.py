@@ -0,0 +1,45 @@
+"""
+Renderers for the API
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson.
+
+    Types orjson doesn't handle itself (Decimal, lazy strings, and
+    datetimes, which are passed through so they keep DRF's formatting)
+    go to DRF's own JSONEncoder, so the output matches JSONRenderer
+    byte for byte. Indented output, e.g. for the browsable API, and
+    anything orjson can't encode fall back to the stdlib renderer.
+    """
+
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON, returning a bytestring"""
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is None and self.compact and not self.ensure_ascii:
+            try:
+                ret = orjson.dumps(
+                    data, default=self.encoder.default, option=self.options,
+                )
+            except orjson.JSONEncodeError:
+                pass
+            else:
+                # Escape U+2028/U+2029 like JSONRenderer, keeping the
+                # output a strict JavaScript subset.
+                if b'\xe2\x80' in ret:
+                    ret = (
+                        ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+                        .replace(b'\xe2\x80\xa9', b'\\u2029')
+                    )
+                return ret
+
+        return super().render(data, accepted_media_type, renderer_context)
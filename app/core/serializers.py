@@ -2,12 +2,27 @@
 Serializers for the user API View
 """
 
-from django.contrib.auth import get_user_model, authenticate
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model, load_backend
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
 from django.utils.translation import gettext as _
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from core import hashing
+from core.timing import TimedSerializerMixin
 
+# What user_login_failed receivers see instead of the password, as in
+# django.contrib.auth.authenticate().
+CLEANSED_SUBSTITUTE = "********************"
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the user object
 
     Args:
@@ -48,7 +63,34 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class AuthTokenSerializer(serializers.Serializer):
+async def model_backend_authenticate(backend, email, password):
+    """ModelBackend.authenticate(), awaiting the password hashes.
+
+    An unknown email still pays for one hash so it cannot be told apart
+    from a wrong password by timing.
+    """
+    User = get_user_model()
+
+    async def upgrade_hash(raw_password):
+        user.password = await hashing.make_password(raw_password)
+        await sync_to_async(user.save)(update_fields=["password"])
+
+    try:
+        user = await sync_to_async(
+            User._default_manager.get_by_natural_key
+        )(email)
+    except User.DoesNotExist:
+        await hashing.make_password(password)
+        return None
+    if (
+        await hashing.check_password(password, user.password, upgrade_hash)
+        and backend.user_can_authenticate(user)
+    ):
+        return user
+    return None
+
+
+class AuthTokenSerializer(TimedSerializerMixin, serializers.Serializer):
     """Serializer for the user auth token."""
     email = serializers.EmailField()
     password = serializers.CharField(
@@ -56,18 +98,53 @@ class AuthTokenSerializer(serializers.Serializer):
         trim_whitespace=False
     )
 
-    def validate(self, attrs):
-        """Validate and authenticate the user"""
-        email = attrs.get("email")
-        password = attrs.get("password")
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password,
-        )
-        if not user:
-            msg = _('unable to authenticate with provided credentials')
-            raise serializers.ValidationError(msg, code='authorization')
+    async def authenticate(self):
+        """Return the user the validated credentials belong to.
+
+        Follows django.contrib.auth.authenticate(): each backend in
+        AUTHENTICATION_BACKENDS is tried in turn, the user found is
+        tagged with `user.backend`, and a failure sends
+        user_login_failed. Only ModelBackend changes, to await its
+        password check (see core.hashing); other backends run in a
+        thread as they are.
+        """
+        request = self.context.get("request")
+        credentials = {
+            "email": self.validated_data["email"],
+            "password": self.validated_data["password"],
+        }
+        for backend_path in settings.AUTHENTICATION_BACKENDS:
+            backend = load_backend(backend_path)
+            try:
+                inspect.signature(backend.authenticate).bind(
+                    request, **credentials,
+                )
+            except TypeError:
+                continue
+            try:
+                if isinstance(backend, ModelBackend):
+                    user = await model_backend_authenticate(
+                        backend, **credentials,
+                    )
+                else:
+                    user = await sync_to_async(backend.authenticate)(
+                        request, **credentials,
+                    )
+            except PermissionDenied:
+                break
+            if user is not None:
+                user.backend = backend_path
+                return user
 
-        attrs['user'] = user
-        return attrs
+        await sync_to_async(user_login_failed.send)(
+            sender=__name__,
+            credentials={
+                "email": credentials["email"],
+                "password": CLEANSED_SUBSTITUTE,
+            },
+            request=request,
+        )
+        msg = _('unable to authenticate with provided credentials')
+        raise serializers.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [msg]}, code='authorization',
+        )
@@ -0,0 +1,30 @@
+"""
+Signal handlers for Core
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_user_cache
+
+
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    """Drop a cached token when it is deleted, rotated or reassigned"""
+    token_user_cache.delete(instance.key)
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """Drop a user's cached tokens when the user changes.
+
+    Covers `is_active` flipping as well as any change that would leave
+    a stale copy of the user attached to authenticated requests.
+    """
+    keys = ()
+    if token_user_cache.shared is not None:
+        keys = Token.objects.filter(user_id=instance.pk).values_list(
+            'key', flat=True,
+        )
+    token_user_cache.delete_user(instance.pk, keys)
@@ -2,7 +2,9 @@
 Test for Django Admin Modifications
 """
 
+from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase, Client
 from django.urls import reverse
 
@@ -48,3 +50,43 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_search_users(self):
+        """Test searching users by part of their email or name"""
+        url = reverse("admin:core_user_changelist")
+
+        for term in ["user1@", "TES", "Use"]:
+            res = self.client.get(url, {"q": term})
+
+            self.assertEqual(list(res.context["cl"].result_list), [self.user])
+
+    def test_user_autocomplete(self):
+        """Test the user autocomplete used by the recipe admin"""
+        url = reverse("admin:autocomplete")
+        res = self.client.get(url, {
+            "term": "user1",
+            "app_label": "recipe",
+            "model_name": "recipe",
+            "field_name": "user",
+        })
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            [r["id"] for r in res.json()["results"]], [str(self.user.id)]
+        )
+
+    def test_search_uses_trigram_indexes(self):
+        """Test the user search is served by the trigram indexes"""
+        queryset = get_user_model().objects.all()
+        model_admin = admin.site._registry[get_user_model()]
+        queryset, _ = model_admin.get_search_results(None, queryset, "user")
+
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute("EXPLAIN " + sql, params)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+
+        self.assertNotIn("Seq Scan", plan, msg=plan)
+        for column in ["email", "first_name", "last_name"]:
+            self.assertIn(f"core_user_{column}_trgm_idx", plan, msg=plan)
@@ -0,0 +1,124 @@
+"""
+Test for the cached token authentication
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import CachedTokenAuthentication, token_user_cache
+
+ME_URL = reverse("core:me")
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """Test token lookups are cached and invalidated"""
+
+    def setUp(self):
+        token_user_cache.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(  # type: ignore
+            email="test@domain.com",
+            password="testpass1234",
+            first_name="Test",
+            last_name="User",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_lookup_is_cached(self):
+        """Test a repeated request does not query the token"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_request_user_changes_not_cached(self):
+        """Test changing request.user never reaches the cached user"""
+        authentication = CachedTokenAuthentication()
+
+        for _ in range(2):
+            user, _ = authentication.authenticate_credentials(self.token.key)
+            self.assertEqual(user.first_name, "Test")
+            user.first_name = "Changed"
+
+        self.assertEqual(
+            token_user_cache.get(self.token.key).first_name, "Test",
+        )
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is still rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION="Token invalid")
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token invalidates the cached entry"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user invalidates their cached tokens"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_not_served_stale(self):
+        """Test a profile update is visible on the next request"""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"first_name": "Changed"})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data["first_name"], "Changed")
+
+    def test_entries_expire(self):
+        """Test cached entries are dropped after the TTL"""
+        with patch("core.authentication.time.monotonic", return_value=0):
+            self.client.get(ME_URL)
+
+        with patch("core.authentication.time.monotonic", return_value=3600):
+            self.assertIsNone(token_user_cache.get(self.token.key))
+
+    @override_settings(TOKEN_AUTH_CACHE_SIZE=2)
+    def test_cache_is_bounded(self):
+        """Test the least recently used entry is evicted"""
+        for key in ["a", "b", "c"]:
+            token_user_cache.set(key, self.user)
+
+        self.assertIsNone(token_user_cache.get("a"))
+        self.assertIsNotNone(token_user_cache.get("c"))
+
+    @override_settings(TOKEN_AUTH_CACHE_ALIAS="default")
+    def test_shared_cache_invalidated(self):
+        """Test entries in the shared cache are dropped on deactivation"""
+        self.client.get(ME_URL)
+        token_user_cache.clear()
+
+        self.assertIsNotNone(token_user_cache.get(self.token.key))
+
+        self.user.is_active = False
+        self.user.save()
+        token_user_cache.clear()
+
+        self.assertIsNone(token_user_cache.get(self.token.key))
@@ -0,0 +1,76 @@
+"""
+Test the load test's statistics and run comparison
+"""
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from core.management.commands import bench_api
+
+
+def results(**operations):
+    return {"meta": {"revision": "abc123"}, "operations": operations}
+
+
+class BenchStatsTest(SimpleTestCase):
+    """Test percentiles, summaries and comparisons"""
+
+    def test_percentile_nearest_rank(self):
+        """Test percentiles pick an observed value by nearest rank"""
+        values = list(range(1, 101))
+
+        self.assertEqual(bench_api.percentile(values, 50), 50)
+        self.assertEqual(bench_api.percentile(values, 95), 95)
+        self.assertEqual(bench_api.percentile(values, 99), 99)
+        self.assertEqual(bench_api.percentile([7], 99), 7)
+        self.assertIsNone(bench_api.percentile([], 50))
+
+    def test_summarize(self):
+        """Test a summary reports milliseconds and throughput"""
+        samples = [0.001 * i for i in range(1, 101)]
+
+        summary = bench_api.summarize(samples, errors=2, elapsed=10)
+
+        self.assertEqual(summary["count"], 100)
+        self.assertEqual(summary["errors"], 2)
+        self.assertEqual(summary["throughput_rps"], 10.0)
+        self.assertEqual(summary["p50_ms"], 50.0)
+        self.assertEqual(summary["p99_ms"], 99.0)
+        self.assertEqual(summary["max_ms"], 100.0)
+
+    def test_summarize_empty(self):
+        """Test an operation that never ran summarizes without errors"""
+        summary = bench_api.summarize([], errors=0, elapsed=10)
+
+        self.assertEqual(summary["count"], 0)
+        self.assertIsNone(summary["p95_ms"])
+
+    def test_compare_flags_regressions(self):
+        """Test slower latencies and lower throughput are regressions"""
+        baseline = results(
+            list={"p50_ms": 10.0, "p95_ms": 20.0, "p99_ms": 30.0,
+                  "throughput_rps": 100.0},
+            token={"p50_ms": 5.0},
+        )
+        current = results(
+            list={"p50_ms": 10.5, "p95_ms": 30.0, "p99_ms": 20.0,
+                  "throughput_rps": 80.0},
+            signup={"p50_ms": 5.0},
+        )
+
+        rows, regressions = bench_api.compare(baseline, current, 10)
+
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(
+            [(name, metric) for name, metric, *_ in regressions],
+            [("list", "p95_ms"), ("list", "throughput_rps")],
+        )
+
+    def test_parse_mix(self):
+        """Test the operation mix is parsed and validated"""
+        command = bench_api.Command()
+
+        self.assertEqual(
+            command.parse_mix("list=3,token"), {"list": 3, "token": 1},
+        )
+        with self.assertRaises(CommandError):
+            command.parse_mix("list=3,bogus=1")
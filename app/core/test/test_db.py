@@ -0,0 +1,270 @@
+"""
+Test for the connection pool and the Postgres backend
+"""
+import copy
+import threading
+import time
+
+import psycopg2
+from django.db import OperationalError, connection
+from django.db.backends.signals import connection_created
+from django.test import TestCase
+
+from core.db import pool as pooling
+from core.db.backends.postgresql.base import DatabaseWrapper
+
+
+def terminate(pid):
+    """Kill the server process behind a connection, as a restart would"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_terminate_backend(%s)", [pid])
+
+
+def backend_pid(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        pid = cursor.fetchone()[0]
+    if not conn.autocommit:
+        conn.rollback()
+    return pid
+
+
+class ConnectionPoolTest(TestCase):
+    """Test ConnectionPool against the test database"""
+
+    def setUp(self):
+        params = connection.get_connection_params()
+        self.connect = lambda: psycopg2.connect(**params)
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.close()
+
+    def make_pool(self, **options):
+        pool = pooling.ConnectionPool(**options)
+        self.pools.append(pool)
+        return pool
+
+    def test_reuse(self):
+        """Test a returned connection is handed out again"""
+        pool = self.make_pool(max_size=2)
+
+        first = pool.getconn(self.connect)
+        pool.putconn(first)
+        second = pool.getconn(self.connect)
+        pool.putconn(second)
+
+        self.assertIs(first, second)
+        stats = pool.stats()
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["in_use"], 0)
+
+    def test_timeout(self):
+        """Test checkouts past max_size fail after the timeout"""
+        pool = self.make_pool(max_size=1, timeout=0.1)
+        held = pool.getconn(self.connect)
+
+        with self.assertRaises(pooling.PoolTimeout):
+            pool.getconn(self.connect)
+
+        pool.putconn(held)
+        stats = pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreater(stats["wait_seconds"], 0.05)
+
+    def test_waiter_gets_returned_connection(self):
+        """Test a waiting thread gets the next connection returned"""
+        pool = self.make_pool(max_size=1, timeout=5)
+        held = pool.getconn(self.connect)
+        threading.Timer(0.05, pool.putconn, [held]).start()
+
+        conn = pool.getconn(self.connect)
+
+        self.assertIs(conn, held)
+        self.assertEqual(pool.stats()["waits"], 1)
+        pool.putconn(conn)
+
+    def test_threads_share_max_size(self):
+        """Test many threads never open more than max_size connections"""
+        pool = self.make_pool(max_size=3, timeout=10)
+        errors = []
+
+        def work():
+            try:
+                for _ in range(20):
+                    conn = pool.getconn(self.connect)
+                    backend_pid(conn)
+                    pool.putconn(conn)
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        stats = pool.stats()
+        self.assertLessEqual(stats["connections_opened"], 3)
+        self.assertEqual(stats["checkouts"], 160)
+
+    def test_dead_connection_replaced(self):
+        """Test a connection killed while idle is replaced on checkout"""
+        pool = self.make_pool(check_after=0)
+        conn = pool.getconn(self.connect)
+        pid = backend_pid(conn)
+        pool.putconn(conn)
+        terminate(pid)
+
+        conn = pool.getconn(self.connect)
+
+        self.assertNotEqual(backend_pid(conn), pid)
+        self.assertEqual(pool.stats()["failed_checks"], 1)
+        pool.putconn(conn)
+
+    def test_open_transaction_rolled_back(self):
+        """Test connections are returned outside any transaction"""
+        pool = self.make_pool()
+        conn = pool.getconn(self.connect)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        pool.putconn(conn)
+
+        self.assertEqual(
+            conn.get_transaction_status(),
+            psycopg2.extensions.TRANSACTION_STATUS_IDLE,
+        )
+
+    def test_idle_expiry_keeps_min_size(self):
+        """Test idle connections above min_size are closed"""
+        pool = self.make_pool(min_size=1, max_size=3, max_idle=0)
+        conns = [pool.getconn(self.connect) for _ in range(3)]
+
+        for conn in conns:
+            pool.putconn(conn)
+
+        self.assertEqual(pool.stats()["size"], 1)
+        self.assertEqual(pool.stats()["connections_closed"], 2)
+
+    def test_max_lifetime(self):
+        """Test connections past max_lifetime are not reused"""
+        pool = self.make_pool(max_lifetime=0)
+        conn = pool.getconn(self.connect)
+        pool.putconn(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()["size"], 0)
+
+
+class BackendTest(TestCase):
+    """Test connections per request with each connection strategy"""
+
+    def setUp(self):
+        self.opened = 0
+        connection_created.connect(self.count, sender=DatabaseWrapper)
+        self.wrappers = []
+
+    def tearDown(self):
+        connection_created.disconnect(self.count, sender=DatabaseWrapper)
+        for wrapper in self.wrappers:
+            wrapper.close()
+        for pool in pooling._pools.values():
+            pool.close()
+        pooling._pools.clear()
+
+    def count(self, **kwargs):
+        self.opened += 1
+
+    def make_wrapper(self, **overrides):
+        settings_dict = copy.deepcopy(connection.settings_dict)
+        settings_dict.update({"OPTIONS": {}, **overrides})
+        wrapper = DatabaseWrapper(settings_dict)
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def serve(self, wrapper):
+        """Run one request's worth of queries, as the request signals do"""
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid()")
+            pid = cursor.fetchone()[0]
+        wrapper.close_if_unusable_or_obsolete()
+        return pid
+
+    def test_without_reuse(self):
+        """Test CONN_MAX_AGE = 0 opens a connection per request"""
+        wrapper = self.make_wrapper(CONN_MAX_AGE=0)
+
+        pids = {self.serve(wrapper) for _ in range(5)}
+
+        self.assertEqual(len(pids), 5)
+
+    def test_persistent(self):
+        """Test persistent connections open nothing in steady state"""
+        wrapper = self.make_wrapper(CONN_MAX_AGE=60)
+        self.serve(wrapper)
+        self.opened = 0
+
+        pids = {self.serve(wrapper) for _ in range(20)}
+
+        self.assertEqual(len(pids), 1)
+        self.assertEqual(self.opened, 0)
+
+    def test_pooled(self):
+        """Test pooled requests reuse one server connection"""
+        options = {"pool": {"max_size": 2, "check_after": 60}}
+        wrapper = self.make_wrapper(CONN_MAX_AGE=0, OPTIONS=options)
+        self.serve(wrapper)
+
+        pids = {self.serve(wrapper) for _ in range(20)}
+
+        stats = pooling.all_stats()["default"]
+        self.assertEqual(len(pids), 1)
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["checkouts"], 21)
+        self.assertEqual(stats["in_use"], 0)
+
+    def test_pooled_across_threads(self):
+        """Test threads hand the same connection to each other"""
+        options = {"pool": {"max_size": 1, "check_after": 60}}
+        pids = []
+
+        def request():
+            settings_dict = copy.deepcopy(connection.settings_dict)
+            settings_dict.update(CONN_MAX_AGE=0, OPTIONS=options)
+            wrapper = DatabaseWrapper(settings_dict)
+            for _ in range(5):
+                pids.append(self.serve(wrapper))
+            wrapper.close()
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(pids), 20)
+        self.assertEqual(len(set(pids)), 1)
+
+    def test_health_check_reconnects(self):
+        """Test a dead persistent connection is replaced between requests"""
+        wrapper = self.make_wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        pid = self.serve(wrapper)
+        terminate(pid)
+        time.sleep(0.05)
+
+        self.assertNotEqual(self.serve(wrapper), pid)
+
+    def test_no_health_check_fails(self):
+        """Test without health checks the next request hits the dead socket"""
+        wrapper = self.make_wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=False)
+        terminate(self.serve(wrapper))
+        time.sleep(0.05)
+
+        with self.assertRaises(OperationalError):
+            self.serve(wrapper)
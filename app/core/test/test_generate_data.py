@@ -0,0 +1,115 @@
+"""
+Test the synthetic data generator
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, Sum
+from django.test import TestCase
+
+from recipe.models import Recipe, RecipeStats
+
+
+def generate(**options):
+    out = StringIO()
+    options = {"users": 20, "recipes": 500, "seed": 7, **options}
+    call_command("generate_data", stdout=out, **options)
+    return out.getvalue()
+
+
+def recipe_values(prefix):
+    return list(
+        Recipe.objects.filter(user__email__startswith=f"{prefix}-")
+        .order_by("id")
+        .values_list("user__email", "title", "slug", "times_minutes",
+                     "price", "description", "link")
+    )
+
+
+class GenerateDataTest(TestCase):
+    """Test generated users and recipes"""
+
+    def test_generates_rows(self):
+        """Test the requested rows are loaded and the rate reported"""
+        out = generate(email_prefix="gen")
+
+        users = get_user_model().objects.filter(email__startswith="gen-")
+        self.assertEqual(users.count(), 20)
+        self.assertEqual(len({user.password for user in users}), 1)
+        self.assertTrue(users[0].check_password("password"))
+        self.assertEqual(Recipe.objects.count(), 500)
+        self.assertEqual(
+            RecipeStats.objects.aggregate(total=Sum("recipe_count")),
+            {"total": 500},
+        )
+        self.assertFalse(Recipe.objects.filter(description=None).exists())
+        self.assertRegex(out, r"users: 20 rows in .*rows/s")
+        self.assertRegex(out, r"recipes: 500 rows in .*rows/s")
+
+    def test_deterministic(self):
+        """Test the same seed gives the same rows, batched or not"""
+        generate(email_prefix="a", batch_size=64)
+        generate(email_prefix="b", method="bulk_create")
+
+        first = [row[1:] for row in recipe_values("a")]
+        second = [row[1:] for row in recipe_values("b")]
+        self.assertEqual(first, second)
+        self.assertEqual(
+            [row[0][2:] for row in recipe_values("a")],
+            [row[0][2:] for row in recipe_values("b")],
+        )
+
+    def test_deterministic_timestamps(self):
+        """Test timestamps follow --now instead of the clock"""
+        generate(email_prefix="c", users=5, recipes=50)
+        generate(email_prefix="d", users=5, recipes=50)
+
+        def timestamps(prefix):
+            users = get_user_model().objects.filter(
+                email__startswith=f"{prefix}-",
+            )
+            return (
+                sorted(users.values_list("date_joined", flat=True)),
+                list(
+                    Recipe.objects.filter(user__in=users)
+                    .order_by("id")
+                    .values_list("updated_at", flat=True)
+                ),
+            )
+
+        self.assertEqual(timestamps("c"), timestamps("d"))
+        call_command(
+            "generate_data", "--now", "2030-06-01T12:00:00",
+            users=5, recipes=50, email_prefix="e", stdout=StringIO(),
+        )
+        self.assertTrue(all(
+            stamp.year in (2029, 2030) for stamp in timestamps("e")[1]
+        ))
+
+    def test_skew(self):
+        """Test owners follow the Zipf curve and skew 0 is uniform"""
+        generate(email_prefix="zipf", recipes=2000, skew=1.2)
+        generate(email_prefix="flat", recipes=2000, skew=0)
+
+        def counts(prefix):
+            return list(
+                get_user_model().objects
+                .filter(email__startswith=f"{prefix}-")
+                .annotate(recipes=Count("recipe"))
+                .order_by("id")
+                .values_list("recipes", flat=True)
+            )
+
+        zipf, flat = counts("zipf"), counts("flat")
+        self.assertGreater(zipf[0], 5 * zipf[-1])
+        self.assertGreater(zipf[0], 2 * max(flat))
+        self.assertLess(max(flat), 3 * min(flat))
+
+    def test_existing_prefix(self):
+        """Test generating twice with one prefix is refused"""
+        generate(email_prefix="dup", recipes=0)
+
+        with self.assertRaises(CommandError):
+            generate(email_prefix="dup")
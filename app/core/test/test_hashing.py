@@ -0,0 +1,172 @@
+"""
+Test for awaitable password hashing in the thread pool
+"""
+
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password as django_check
+from django.test import (
+    AsyncClient,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashing
+
+TOKEN_URL = reverse("core:token")
+make_password = async_to_sync(hashing.make_password)
+check_password = async_to_sync(hashing.check_password)
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=1)
+class PooledHashingTest(SimpleTestCase):
+    """Test hashing and verification in the pool"""
+
+    def test_pool_used(self):
+        """Test a pool is created when workers are configured"""
+        self.assertIsNotNone(hashing.get_pool())
+
+    def test_make_and_check_password(self):
+        """Test pooled hashes are compatible with django's hashers"""
+        encoded = make_password("secret-password")
+
+        self.assertTrue(django_check("secret-password", encoded))
+        self.assertTrue(check_password("secret-password", encoded))
+        self.assertFalse(check_password("wrong", encoded))
+
+    def test_unusable_password(self):
+        """Test unusable passwords never verify"""
+        encoded = make_password(None)
+
+        self.assertFalse(check_password("", encoded))
+
+    @override_settings(
+        PASSWORD_HASHING_MAX_PENDING=1, PASSWORD_HASHING_WAIT=0.01
+    )
+    def test_busy_pool_rejects(self):
+        """Test callers get PasswordHashingBusy when no slot frees up"""
+        pool = hashing.get_pool()
+        pool.slots.acquire()
+        try:
+            with self.assertRaises(hashing.PasswordHashingBusy):
+                make_password("secret-password")
+        finally:
+            pool.slots.release()
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=0)
+class DefaultExecutorHashingTest(SimpleTestCase):
+    """Test hashing without a pool of its own"""
+
+    def test_no_pool(self):
+        """Test no pool is started without workers"""
+        self.assertIsNone(hashing.get_pool())
+
+    def test_hashes_off_the_event_loop(self):
+        """Test hashes still run outside the event loop's thread"""
+        async def threads():
+            return (
+                threading.get_ident(),
+                await hashing._run(threading.get_ident),
+            )
+
+        loop_thread, hash_thread = async_to_sync(threads)()
+
+        self.assertNotEqual(loop_thread, hash_thread)
+        self.assertTrue(check_password("pw", make_password("pw")))
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=1)
+class PooledLoginApiTest(TestCase):
+    """Test the signup and token endpoints with the pool"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_signup_and_login(self):
+        """Test a user created through the pool can log in"""
+        payload = {
+            "email": "test@domain.com",
+            "password": "testcase@123",
+            "first_name": "Test",
+            "last_name": "User",
+        }
+        res = self.client.post(reverse("core:create"), payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(TOKEN_URL, {
+            "email": payload["email"], "password": payload["password"],
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("token", res.data)
+
+    async def test_login_over_asgi(self):
+        """Test the ASGI handler awaits the token view"""
+        await sync_to_async(get_user_model().objects.create_user)(
+            email="test@domain.com", password="testcase@123",
+        )
+
+        res = await AsyncClient().post(TOKEN_URL, {
+            "email": "test@domain.com", "password": "testcase@123",
+        }, content_type="application/json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("token", res.json())
+
+    def test_login_when_busy(self):
+        """Test a saturated pool answers 503 instead of queueing"""
+        get_user_model().objects.create_user(  # type: ignore
+            email="test@domain.com", password="testcase@123",
+        )
+        busy = hashing.PasswordHashingBusy()
+
+        with patch.object(hashing._Pool, "run", side_effect=busy):
+            res = self.client.post(TOKEN_URL, {
+                "email": "test@domain.com", "password": "testcase@123",
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_wrong_password(self):
+        """Test a wrong password or unknown email is a 400"""
+        get_user_model().objects.create_user(  # type: ignore
+            email="test@domain.com", password="testcase@123",
+        )
+
+        for email, password in [
+            ("test@domain.com", "wrong"),
+            ("nobody@domain.com", "testcase@123"),
+        ]:
+            res = self.client.post(TOKEN_URL, {
+                "email": email, "password": password,
+            })
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("non_field_errors", res.data)
+
+    @override_settings(
+        PASSWORD_HASHING_MAX_PENDING=1, PASSWORD_HASHING_WAIT=0.01
+    )
+    def test_admin_login_when_busy(self):
+        """Test the admin login hashes inline and is never refused"""
+        get_user_model().objects.create_superuser(  # type: ignore
+            email="admin@domain.com", password="testcase@123",
+        )
+        pool = hashing.get_pool()
+        pool.slots.acquire()
+        try:
+            res = self.client.post(reverse("admin:login"), {
+                "username": "admin@domain.com", "password": "testcase@123",
+            })
+        finally:
+            pool.slots.release()
+
+        self.assertEqual(res.status_code, status.HTTP_302_FOUND)
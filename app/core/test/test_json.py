@@ -0,0 +1,144 @@
+"""
+Test for the orjson renderer and parser
+"""
+import io
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    """Test ORJSONRenderer output matches JSONRenderer"""
+
+    def assert_same(self, data, accepted_media_type=None, context=None):
+        expected = JSONRenderer().render(data, accepted_media_type, context)
+        actual = ORJSONRenderer().render(data, accepted_media_type, context)
+        self.assertEqual(actual, expected)
+        return actual
+
+    def test_recipe_payload(self):
+        """Test a recipe page with Decimal prices renders identically"""
+        self.assert_same({
+            'next': None,
+            'results': [
+                ReturnDict(
+                    id=1, title='Crème brûlée', price=Decimal('12.50'),
+                    serializer=None,
+                ),
+                {'id': 2, 'title': 'Pie', 'price': Decimal('0.00')},
+            ],
+        })
+
+    def test_decimal_as_number(self):
+        """Test prices are emitted as JSON numbers"""
+        ret = self.assert_same({'price': Decimal('5.25')})
+
+        self.assertEqual(ret, b'{"price":5.25}')
+
+    def test_datetimes(self):
+        """Test datetimes keep DRF's millisecond, Z-suffixed format"""
+        self.assert_same({
+            'date_joined': datetime(
+                2024, 2, 29, 13, 5, 7, 123456, tzinfo=timezone.utc,
+            ),
+            'naive': datetime(2024, 2, 29, 13, 5, 7),
+            'day': date(2024, 2, 29),
+            'duration': timedelta(minutes=90),
+        })
+
+    def test_lazy_strings_and_error_details(self):
+        """Test lazy translations and ErrorDetail render as strings"""
+        self.assert_same({
+            'detail': gettext_lazy('Not found.'),
+            'title': [ErrorDetail('This field is required.', 'required')],
+        })
+
+    def test_line_separators_escaped(self):
+        """Test U+2028/U+2029 are escaped like JSONRenderer does"""
+        ret = self.assert_same({'title': 'a\u2028b\u2029c'})
+
+        self.assertIn(b'\\u2028', ret)
+
+    def test_non_string_keys(self):
+        """Test integer keys are rendered as strings"""
+        self.assert_same({1: 'one', '2': 'two'})
+
+    def test_fallbacks(self):
+        """Test None, indentation and huge integers fall back cleanly"""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+        self.assert_same({'a': [1]}, 'application/json; indent=4')
+        self.assert_same({'a': [1]}, context={'indent': 2})
+        self.assert_same({'big': 2 ** 70})
+
+
+class ORJSONParserTest(SimpleTestCase):
+    """Test ORJSONParser agrees with JSONParser"""
+
+    def parse(self, parser, body, encoding='utf-8'):
+        return parser.parse(
+            io.BytesIO(body), 'application/json', {'encoding': encoding},
+        )
+
+    def assert_same(self, body, encoding='utf-8'):
+        expected = self.parse(JSONParser(), body, encoding)
+        actual = self.parse(ORJSONParser(), body, encoding)
+        self.assertEqual(actual, expected)
+        return actual
+
+    def test_parse(self):
+        """Test bodies parse to the same data"""
+        self.assert_same(
+            '{"title": "Crème", "price": 5.25, "tags": [1, null]}'.encode()
+        )
+        self.assert_same(b'[{"id": 1}, {"id": 2}]')
+
+    def test_other_encoding(self):
+        """Test non UTF-8 request bodies are decoded"""
+        data = self.assert_same('{"title": "Crème"}'.encode('latin-1'),
+                                encoding='latin-1')
+
+        self.assertEqual(data, {'title': 'Crème'})
+
+    def test_errors(self):
+        """Test invalid JSON and NaN raise the same ParseError"""
+        for body in [b'{"title": ', b'{"price": NaN}', b'']:
+            with self.assertRaises(ParseError) as expected:
+                self.parse(JSONParser(), body)
+            with self.assertRaises(ParseError) as actual:
+                self.parse(ORJSONParser(), body)
+            self.assertEqual(
+                str(actual.exception.detail), str(expected.exception.detail),
+            )
+
+
+class JSONApiTest(TestCase):
+    """Test the API speaks JSON through orjson"""
+
+    def test_request_and_response(self):
+        """Test a JSON body is parsed and the response rendered"""
+        user = get_user_model().objects.create_user(
+            email='test@domain.com', password='goodPass',
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.post(reverse('recipe:recipe-list'), {
+            'title': 'Pie', 'slug': 'pie', 'times_minutes': 5,
+            'price': '5.50',
+        }, format='json')
+
+        self.assertEqual(res.status_code, 201)
+        self.assertIsInstance(res.accepted_renderer, ORJSONRenderer)
+        self.assertIn(b'"price":5.5', res.content)
@@ -0,0 +1,212 @@
+"""
+Test for the compression middleware
+"""
+import gzip
+import json
+import os
+import unittest
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import middleware
+from core.middleware import CompressionMiddleware, parse_accept_encoding
+from recipe.models import Recipe
+
+PAYLOAD = json.dumps([
+    {'id': i, 'title': f'Recipe {i}', 'price': i / 4} for i in range(100)
+]).encode()
+
+
+def process(response, accept_encoding='gzip, deflate, br'):
+    request = RequestFactory().get(
+        '/', HTTP_ACCEPT_ENCODING=accept_encoding,
+    )
+    return CompressionMiddleware(lambda req: response)(request)
+
+
+def json_response(content=PAYLOAD, **kwargs):
+    return HttpResponse(content, content_type='application/json', **kwargs)
+
+
+@override_settings(COMPRESSION_ENCODINGS=['gzip'])
+class CompressionMiddlewareTest(SimpleTestCase):
+    """Test negotiation, thresholds and headers"""
+
+    def test_compress_json(self):
+        """Test large JSON responses are gzipped"""
+        res = process(json_response())
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+        self.assertEqual(gzip.decompress(res.content), PAYLOAD)
+
+    @override_settings(COMPRESSION_MIN_SIZE=10000)
+    def test_below_min_size(self):
+        """Test responses under the threshold are sent as is"""
+        res = process(json_response())
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res.content, PAYLOAD)
+
+    def test_unlisted_content_type(self):
+        """Test content types without levels are not compressed"""
+        res = process(HttpResponse(PAYLOAD, content_type='image/png'))
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertFalse(res.has_header('Vary'))
+
+    def test_content_type_wildcard(self):
+        """Test `type/*` entries match any subtype"""
+        res = process(HttpResponse(PAYLOAD, content_type='text/plain'))
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+
+    def test_already_encoded(self):
+        """Test responses with a Content-Encoding are left alone"""
+        response = json_response()
+        response['Content-Encoding'] = 'identity'
+
+        self.assertEqual(process(response).content, PAYLOAD)
+
+    def test_not_accepted(self):
+        """Test identity is sent when the client refuses every encoding"""
+        for header in ['', 'identity', 'gzip;q=0', 'br', '*;q=0']:
+            res = process(json_response(), header)
+
+            self.assertFalse(res.has_header('Content-Encoding'), header)
+            self.assertEqual(res['Vary'], 'Accept-Encoding')
+
+    def test_wildcard_accepted(self):
+        """Test `*` accepts the server's preferred encoding"""
+        res = process(json_response(), '*')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+
+    def test_weakens_etag(self):
+        """Test strong ETags become weak once the body is compressed"""
+        response = json_response()
+        response['ETag'] = '"abc"'
+
+        self.assertEqual(process(response)['ETag'], 'W/"abc"')
+
+    def test_incompressible_body(self):
+        """Test bodies that would grow are sent uncompressed"""
+        body = os.urandom(2000)
+
+        res = process(json_response(body))
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_level_per_content_type(self):
+        """Test each content type is compressed at its own level"""
+        levels = {
+            'application/json': {'gzip': 1},
+            'text/csv': {'gzip': 9},
+        }
+        with override_settings(COMPRESSION_LEVELS=levels):
+            fast = process(json_response()).content
+            dense = process(HttpResponse(PAYLOAD, content_type='text/csv'))
+
+        for level, content in [(1, fast), (9, dense.content)]:
+            compressor = middleware.GzipCompressor(level)
+            expected = compressor.compress(PAYLOAD) + compressor.finish()
+            self.assertEqual(content, expected)
+
+    @override_settings(COMPRESSION_STREAM_FLUSH_SIZE=1024)
+    def test_streaming(self):
+        """Test streaming bodies are compressed and flushed as they go"""
+        lines = [b'{"id": %d, "title": "Recipe"}\n' % i for i in range(500)]
+        response = StreamingHttpResponse(
+            iter(lines), content_type='application/x-ndjson',
+        )
+
+        res = process(response)
+        chunks = list(res.streaming_content)
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertFalse(res.has_header('Content-Length'))
+        self.assertGreater(len(chunks), 5)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), b''.join(lines))
+
+    def test_parse_accept_encoding(self):
+        """Test q-values are parsed, defaulting to 1"""
+        self.assertEqual(
+            parse_accept_encoding('GZip;q=0.5, br , zstd;q=x, ,*;q=0'),
+            {'gzip': 0.5, 'br': 1.0, 'zstd': 0.0, '*': 0.0},
+        )
+
+
+class OptionalEncodingsTest(SimpleTestCase):
+    """Test brotli and zstd when their packages are installed"""
+
+    def test_unavailable_encodings_skipped(self):
+        """Test encodings without a compressor are never chosen"""
+        res = process(json_response(), 'br, zstd, gzip;q=0.1')
+
+        self.assertIn(res['Content-Encoding'], middleware.COMPRESSORS)
+
+    @unittest.skipIf(middleware.brotli is None, 'brotli not installed')
+    def test_brotli(self):
+        """Test brotli is preferred and round-trips"""
+        res = process(json_response(), 'gzip, br')
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(res.content), PAYLOAD)
+
+    @unittest.skipIf(middleware.zstandard is None, 'zstandard not installed')
+    def test_zstd(self):
+        """Test zstd round-trips"""
+        res = process(json_response(), 'zstd')
+
+        self.assertEqual(res['Content-Encoding'], 'zstd')
+        decompressor = middleware.zstandard.ZstdDecompressor()
+        self.assertEqual(
+            decompressor.decompressobj().decompress(res.content), PAYLOAD,
+        )
+
+
+@override_settings(COMPRESSION_ENCODINGS=['gzip'], COMPRESSION_MIN_SIZE=1)
+class CompressionApiTest(TestCase):
+    """Test the API is served compressed"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@domain.com', password='goodPass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_schema(self):
+        """Test the OpenAPI schema is compressed"""
+        res = self.client.get(
+            reverse('api-schema'), HTTP_ACCEPT_ENCODING='gzip',
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn(b'openapi', gzip.decompress(res.content))
+
+    @override_settings(RECIPE_CACHE_SHARED=True)
+    def test_conditional_get(self):
+        """Test the weakened ETag still answers If-None-Match"""
+        for i in range(10):
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', slug=f'recipe-{i}',
+                times_minutes=i, price=Decimal('5.00'),
+            )
+        url = reverse('recipe:recipe-list')
+        res = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertTrue(res['ETag'].startswith('W/"'))
+
+        res = self.client.get(
+            url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+
+        self.assertEqual(res.status_code, 304)
@@ -0,0 +1,67 @@
+"""
+Test for the admin paginators
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core.paginators import EstimatedCountPaginator
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    """Test counts switch to estimates above the threshold"""
+
+    def setUp(self):
+        get_user_model().objects.bulk_create([
+            get_user_model()(email=f"user{i}@domain.com", password="x")
+            for i in range(50)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE core_user")
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1000)
+    def test_exact_count_below_threshold(self):
+        """Test small tables are counted exactly"""
+        paginator = EstimatedCountPaginator(
+            get_user_model().objects.order_by("id"), 10
+        )
+
+        self.assertEqual(paginator.count, 50)
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=10)
+    def test_unfiltered_count_uses_reltuples(self):
+        """Test a whole-table count comes from pg_class, not COUNT(*)"""
+        paginator = EstimatedCountPaginator(
+            get_user_model().objects.order_by("id"), 10
+        )
+
+        with self.assertNumQueries(1):
+            count = paginator.count
+
+        self.assertEqual(count, 50)
+        self.assertEqual(paginator.num_pages, 5)
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=10)
+    def test_filtered_count_capped(self):
+        """Test a filtered count is exact but stops past the threshold"""
+        queryset = get_user_model().objects.filter(is_active=True)
+        paginator = EstimatedCountPaginator(queryset.order_by("id"), 10)
+
+        with self.assertNumQueries(1):
+            count = paginator.count
+
+        self.assertEqual(count, 11)
+        self.assertTrue(paginator.capped)
+        self.assertEqual(paginator.num_pages, 2)
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=20)
+    def test_selective_filter_counted_exactly(self):
+        """Test a filter matching fewer rows than the threshold is exact"""
+        queryset = get_user_model().objects.filter(
+            email__istartswith="USER1",
+        )
+        paginator = EstimatedCountPaginator(queryset.order_by("id"), 10)
+
+        self.assertEqual(paginator.count, 11)
+        self.assertFalse(paginator.capped)
@@ -0,0 +1,58 @@
+"""
+Query budgets for the user API and the project-level routes
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from core.testing import Endpoint, QueryBudgetMixin
+
+
+class UserQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Test each user endpoint costs the same SQL however many users"""
+
+    namespaces = ("core", None)
+    endpoints = [
+        Endpoint(
+            "core:create", "post", queries=2, rows=1,
+            data={
+                "email": "new@domain.com", "password": "goodPass",
+                "first_name": "New", "last_name": "User",
+            },
+        ),
+        Endpoint(
+            "core:token", "post", queries=5, rows=1,
+            data={"email": "test@domain.com", "password": "goodPass"},
+        ),
+        Endpoint("core:me", queries=0),
+        Endpoint(
+            "core:me", "patch", queries=1, rows=0,
+            data={"first_name": "Renamed"},
+        ),
+        Endpoint("api-schema", queries=0),
+        Endpoint("api-docs", queries=0),
+        Endpoint(
+            "metrics", queries=0, settings={"METRICS_TOKEN": "scrape"},
+            headers={"HTTP_AUTHORIZATION": "Bearer scrape"},
+        ),
+    ]
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@domain.com", password="goodPass",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.password = make_password("goodPass")
+        self.created = 0
+
+    def create_rows(self, count):
+        get_user_model().objects.bulk_create([
+            get_user_model()(
+                email=f"user{self.created + i}@domain.com",
+                password=self.password,
+            )
+            for i in range(count)
+        ], batch_size=2000)
+        self.created += count
@@ -0,0 +1,153 @@
+"""
+Test for read-replica routing against two local databases
+"""
+import copy
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.test import RequestFactory, TransactionTestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.db import routers
+from recipe.models import Recipe
+
+RECIPE_URL = reverse("recipe:recipe-list")
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTest(TransactionTestCase):
+    """Test routing with a second database standing in for a replica.
+
+    Nothing replicates into it, so a read routed there shows exactly
+    the staleness a lagging replica would. The test runner doesn't know
+    the alias, so the class creates, cleans and drops it itself.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        settings_dict = copy.deepcopy(connections["default"].settings_dict)
+        settings_dict["TEST"] = {"NAME": settings_dict["NAME"] + "_replica"}
+        connections.databases["replica"] = settings_dict
+        cls.replica_name = settings_dict["NAME"]
+        connections["replica"].creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica"].creation.destroy_test_db(
+            cls.replica_name, verbosity=0,
+        )
+        connections["replica"].close()
+        del connections._connections.replica
+        del connections.databases["replica"]
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@domain.com", password="goodPass",
+        )
+        # The replica is a snapshot from before any recipe was written.
+        copy.copy(self.user).save(using="replica", force_insert=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        get_user_model().objects.using("replica").all().delete()
+
+    def create_recipe(self, client):
+        res = client.post(RECIPE_URL, {
+            "title": "Fresh", "slug": "fresh", "times_minutes": 5,
+            "price": Decimal("5.00"),
+        })
+        self.assertEqual(res.status_code, 201)
+        return res
+
+    def list_titles(self, client):
+        res = client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, 200)
+        return [recipe["title"] for recipe in res.data["results"]]
+
+    def fresh_client(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client
+
+    def test_reads_go_to_replica(self):
+        """Test safe requests read from the replica"""
+        Recipe.objects.create(
+            user=self.user, title="Primary only", slug="primary",
+            times_minutes=1, price=Decimal("1.00"),
+        )
+
+        self.assertEqual(self.list_titles(self.client), [])
+
+    def test_writer_reads_own_write(self):
+        """Test the client that wrote is pinned to the primary"""
+        res = self.create_recipe(self.client)
+
+        self.assertIn("db_pin", res.cookies)
+        self.assertEqual(self.list_titles(self.client), ["Fresh"])
+
+    def test_user_marker_pins_cookieless_client(self):
+        """Test another client of the same user is pinned too"""
+        self.create_recipe(self.client)
+
+        self.assertEqual(self.list_titles(self.fresh_client()), ["Fresh"])
+
+    def test_pin_expires(self):
+        """Test reads return to the replica once the window passes"""
+        self.create_recipe(self.client)
+        cache.clear()
+        later = time.time() + 11
+
+        with patch("django.core.signing.time.time", return_value=later):
+            self.assertEqual(self.list_titles(self.client), [])
+
+    def test_failed_write_does_not_pin(self):
+        """Test rejected writes don't pin the client"""
+        res = self.client.post(RECIPE_URL, {"title": ""})
+
+        self.assertEqual(res.status_code, 400)
+        self.assertNotIn("db_pin", res.cookies)
+
+    def test_router_decisions(self):
+        """Test the router outside and inside a request"""
+        router = routers.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Recipe))
+
+        request = RequestFactory().get(RECIPE_URL)
+        token = routers.start_request(request)
+        try:
+            self.assertEqual(router.db_for_read(Recipe), "replica")
+            self.assertEqual(router.db_for_read(get_user_model()), "default")
+            self.assertEqual(router.db_for_write(Recipe), "default")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Recipe), "default")
+        finally:
+            routers.finish_request(token)
+
+        request = RequestFactory().post(RECIPE_URL)
+        token = routers.start_request(request)
+        try:
+            self.assertEqual(router.db_for_read(Recipe), "default")
+        finally:
+            routers.finish_request(token)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Test everything stays on the primary without replicas"""
+        Recipe.objects.create(
+            user=self.user, title="Primary only", slug="primary",
+            times_minutes=1, price=Decimal("1.00"),
+        )
+
+        self.assertEqual(self.list_titles(self.client), ["Primary only"])
@@ -0,0 +1,218 @@
+"""
+Test for the token-bucket throttles
+"""
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core import throttling
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TOKEN_URL = reverse("core:token")
+
+
+def with_rates(**rates):
+    """Override the throttle rates, keeping the rest of REST_FRAMEWORK"""
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": rates,
+    })
+
+
+class DecideTest(SimpleTestCase):
+    """Test the GCRA bucket arithmetic"""
+
+    def run_requests(self, count, now, tat=None):
+        decisions = []
+        tat = now if tat is None else tat
+        for _ in range(count):
+            decision, tat = throttling.decide(tat, now, 4, 60)
+            decisions.append(decision)
+        return decisions, tat
+
+    def test_burst_then_refuse(self):
+        """Test a full bucket allows `limit` requests at once"""
+        decisions, tat = self.run_requests(5, now=100.0)
+
+        self.assertEqual(
+            [d.allowed for d in decisions], [True] * 4 + [False],
+        )
+        self.assertEqual([d.remaining for d in decisions], [3, 2, 1, 0, 0])
+        self.assertAlmostEqual(decisions[-1].retry_after, 15.0)
+        self.assertAlmostEqual(decisions[-1].reset, 60.0)
+        self.assertAlmostEqual(tat, 160.0)
+
+    def test_refill(self):
+        """Test one request's worth refills every period / limit"""
+        _, tat = self.run_requests(4, now=100.0)
+
+        refused, _ = self.run_requests(1, now=114.0, tat=tat)
+        allowed, _ = self.run_requests(1, now=115.0, tat=tat)
+
+        self.assertFalse(refused[0].allowed)
+        self.assertAlmostEqual(refused[0].retry_after, 1.0)
+        self.assertTrue(allowed[0].allowed)
+
+
+class StoreTest(TestCase):
+    """Test both bucket stores give the same answers"""
+
+    def consume_all(self, store, key="k", count=4):
+        return [store.consume(key, 3, 60).allowed for _ in range(count)]
+
+    def test_local_store(self):
+        """Test the in-process store limits and separates keys"""
+        store = throttling.LocalBucketStore()
+
+        self.assertEqual(self.consume_all(store), [True, True, True, False])
+        self.assertTrue(store.consume("other", 3, 60).allowed)
+
+    def test_local_store_prunes_full_buckets(self):
+        """Test buckets that refilled are dropped past max_entries"""
+        store = throttling.LocalBucketStore(max_entries=2)
+        store.consume("a", 3, 60)
+        store.consume("b", 3, 60)
+        later = time.monotonic() + 61
+
+        with patch("core.throttling.time.monotonic", return_value=later):
+            store.consume("c", 3, 60)
+
+        self.assertEqual(set(store._tats), {"c"})
+
+    def test_local_store_bounded_by_live_buckets(self):
+        """Test live buckets past max_entries evict the least recent"""
+        store = throttling.LocalBucketStore(max_entries=3)
+        for key in ["a", "b", "c", "d"]:
+            store.consume(key, 3, 60)
+        store.consume("b", 3, 60)
+        store.consume("e", 3, 60)
+
+        self.assertEqual(list(store._tats), ["d", "b", "e"])
+
+    def test_local_store_prunes_a_batch_per_check(self):
+        """Test a check drops at most prune_batch buckets"""
+        store = throttling.LocalBucketStore(max_entries=1000)
+        for i in range(100):
+            store.consume(f"key{i}", 3, 60)
+        later = time.monotonic() + 61
+
+        with patch("core.throttling.time.monotonic", return_value=later):
+            store.consume("new", 3, 60)
+
+        self.assertEqual(len(store._tats), 101 - store.prune_batch)
+
+    def test_cache_store_shared(self):
+        """Test cache-backed stores on different hosts share buckets"""
+        cache.clear()
+        host_a = throttling.CacheBucketStore()
+        host_b = throttling.CacheBucketStore()
+
+        self.assertEqual(self.consume_all(host_a, count=2), [True, True])
+        self.assertEqual(self.consume_all(host_b, count=2), [True, False])
+
+    def test_overhead(self):
+        """Test a local throttle check costs microseconds"""
+        store = throttling.LocalBucketStore()
+        throttle = throttling.TokenBucketThrottle()
+        request = Request(APIRequestFactory().get(RECIPE_URL))
+        request.user = get_user_model()(pk=1)
+        view = type("View", (), {"throttle_scope": "recipes"})()
+
+        with patch("core.throttling.get_store", return_value=store):
+            start = time.perf_counter()
+            for _ in range(10000):
+                throttle.allow_request(request, view)
+            per_check = (time.perf_counter() - start) / 10000
+
+        self.assertLess(per_check, 50e-6)
+
+
+class ThrottleApiTest(TestCase):
+    """Test throttled endpoints and their headers"""
+
+    def setUp(self):
+        throttling.get_store().clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@domain.com", password="goodPass",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_headers_and_retry_after(self):
+        """Test limits are reported and exhaustion returns 429"""
+        with with_rates(recipes="3/min"):
+            responses = [self.client.get(RECIPE_URL) for _ in range(4)]
+
+        self.assertEqual(
+            [res.status_code for res in responses], [200, 200, 200, 429],
+        )
+        self.assertEqual(
+            [res["X-RateLimit-Remaining"] for res in responses],
+            ["2", "1", "0", "0"],
+        )
+        self.assertEqual(responses[0]["X-RateLimit-Limit"], "3")
+        self.assertEqual(responses[0]["X-RateLimit-Reset"], "20")
+        self.assertEqual(responses[-1]["Retry-After"], "20")
+
+    def test_per_user(self):
+        """Test each user has their own bucket"""
+        other = get_user_model().objects.create_user(
+            email="other@domain.com", password="goodPass",
+        )
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+
+        with with_rates(recipes="1/min"):
+            self.client.get(RECIPE_URL)
+            res = other_client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_action_rate(self):
+        """Test "<scope>.<action>" rates override the view's scope"""
+        with with_rates(recipes="100/min", **{"recipes.export": "1/min"}):
+            self.assertEqual(self.client.get(RECIPE_URL).status_code, 200)
+            export_url = reverse("recipe:recipe-export")
+            self.assertEqual(self.client.get(export_url).status_code, 200)
+            self.assertEqual(self.client.get(export_url).status_code, 429)
+            self.assertEqual(self.client.get(RECIPE_URL).status_code, 200)
+
+    def test_unconfigured_scope_not_throttled(self):
+        """Test requests with no matching rate pass without headers"""
+        with with_rates():
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(res.has_header("X-RateLimit-Limit"))
+
+    def test_token_endpoint_by_ip(self):
+        """Test token requests are limited per client address"""
+        client = APIClient()
+        payload = {"email": "test@domain.com", "password": "goodPass"}
+
+        with with_rates(token="2/min"):
+            codes = [
+                client.post(TOKEN_URL, payload).status_code,
+                client.post(TOKEN_URL, payload).status_code,
+                client.post(
+                    TOKEN_URL, payload, REMOTE_ADDR="10.0.0.2",
+                ).status_code,
+                client.post(TOKEN_URL, payload).status_code,
+            ]
+
+        self.assertEqual(codes, [200, 200, 200, 429])
+
+    def test_default_classes(self):
+        """Test the throttle is installed for every view"""
+        self.assertEqual(
+            api_settings.DEFAULT_THROTTLE_CLASSES,
+            [throttling.TokenBucketThrottle],
+        )
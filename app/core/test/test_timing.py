@@ -0,0 +1,185 @@
+"""
+Test for request timing, Server-Timing headers and metrics
+"""
+import re
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import metrics, throttling
+from core.middleware import TimingMiddleware
+from core.renderers import ORJSONRenderer
+from recipe.models import Recipe
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TOKEN_URL = reverse("core:token")
+ME_URL = reverse("core:me")
+METRICS_URL = reverse("metrics")
+
+
+def parse_server_timing(header):
+    """Return {name: (milliseconds, desc)} for a Server-Timing header"""
+    timings = {}
+    for entry in header.split(","):
+        name, *params = entry.strip().split(";")
+        params = dict(param.split("=", 1) for param in params)
+        timings[name] = (float(params["dur"]), params.get("desc"))
+    return timings
+
+
+class HistogramTest(SimpleTestCase):
+    """Test the in-process histogram and its exposition"""
+
+    def test_cumulative_buckets(self):
+        """Test observations land in cumulative `le` buckets"""
+        histogram = metrics.Histogram("h", "Help.", ("route",), (1, 5))
+
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(("a",), value)
+
+        lines = list(histogram.collect())
+        self.assertIn('h_bucket{route="a",le="1.0"} 2', lines)
+        self.assertIn('h_bucket{route="a",le="5.0"} 3', lines)
+        self.assertIn('h_bucket{route="a",le="+Inf"} 4', lines)
+        self.assertIn('h_sum{route="a"} 14.5', lines)
+        self.assertIn('h_count{route="a"} 4', lines)
+
+    def test_label_escaping(self):
+        """Test label values are escaped"""
+        counter = metrics.Counter("c", "Help.", ("route",))
+
+        counter.inc(('say "hi"',))
+
+        self.assertIn('c{route="say \\"hi\\""} 1', list(counter.collect()))
+
+
+class TimingMiddlewareTest(TestCase):
+    """Test the timings reported for real requests"""
+
+    def setUp(self):
+        throttling.get_store().clear()
+        metrics.reset()
+        self.user = get_user_model().objects.create_user(
+            email="test@domain.com", password="goodPass",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Soup", slug="soup", times_minutes=5,
+            price=Decimal("5.00"),
+        )
+
+    def test_server_timing(self):
+        """Test the header breaks the request down and counts queries"""
+        url = reverse("recipe:recipe-detail", args=[self.recipe.id])
+        render = ORJSONRenderer.render
+
+        def slow_render(*args, **kwargs):
+            time.sleep(0.005)
+            return render(*args, **kwargs)
+
+        with CaptureQueriesContext(connection) as queries, \
+                patch.object(ORJSONRenderer, "render", slow_render):
+            res = self.client.get(url)
+
+        timings = parse_server_timing(res["Server-Timing"])
+        self.assertEqual(
+            set(timings), {"total", "db", "serialize", "render"},
+        )
+        self.assertEqual(timings["db"][1], f'"{len(queries)} queries"')
+        self.assertGreater(timings["serialize"][0], 0)
+        self.assertGreaterEqual(timings["render"][0], 5)
+        self.assertGreaterEqual(timings["total"][0], timings["render"][0])
+
+    def test_user_views_timed(self):
+        """Test the user and token views are timed too"""
+        res_me = self.client.get(ME_URL)
+        res_token = APIClient().post(
+            TOKEN_URL, {"email": "test@domain.com", "password": "goodPass"},
+        )
+
+        self.assertIn("Server-Timing", res_me)
+        serialize_ms = parse_server_timing(res_token["Server-Timing"])
+        self.assertGreater(serialize_ms["serialize"][0], 0)
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_header_disabled(self):
+        """Test the header can be turned off"""
+        res = self.client.get(RECIPE_URL)
+
+        self.assertFalse(res.has_header("Server-Timing"))
+
+    def test_log_line(self):
+        """Test each request is logged with its timings"""
+        with self.assertLogs("core.timing", "INFO") as logs:
+            self.client.get(RECIPE_URL)
+
+        record = logs.records[0]
+        self.assertEqual(record.timing["route"], "recipe:recipe-list")
+        self.assertEqual(record.timing["status"], 200)
+        self.assertRegex(
+            record.getMessage(),
+            r"^method=GET route=recipe:recipe-list status=200 "
+            r"total_ms=\S+ db_ms=\S+ queries=\d+ ",
+        )
+
+    @override_settings(METRICS_TOKEN="scrape")
+    def test_metrics_endpoint(self):
+        """Test per-route histograms are served to the scraper"""
+        self.client.get(RECIPE_URL)
+        self.client.get(RECIPE_URL)
+
+        res = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION="Bearer scrape",
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        body = res.content.decode()
+        labels = 'route="recipe:recipe-list",method="GET"'
+        self.assertIn(
+            f'http_requests_total{{{labels},status="200"}} 2', body,
+        )
+        self.assertIn(f"http_request_duration_seconds_count{{{labels}}} 2",
+                      body)
+        self.assertRegex(
+            body, re.escape(f"http_request_queries_bucket{{{labels},le=")
+        )
+
+    def test_metrics_endpoint_internal(self):
+        """Test the metrics need the token, whatever the peer address"""
+        cases = [
+            ("scrape", {}),
+            ("scrape", {"HTTP_AUTHORIZATION": "Bearer wrong"}),
+            ("scrape", {"HTTP_AUTHORIZATION": "Token scrape"}),
+            ("", {"HTTP_AUTHORIZATION": "Bearer "}),
+        ]
+        for token, headers in cases:
+            with override_settings(METRICS_TOKEN=token):
+                res = self.client.get(
+                    METRICS_URL, REMOTE_ADDR="127.0.0.1", **headers,
+                )
+
+            self.assertEqual(res.status_code, 404)
+
+    def test_overhead(self):
+        """Test the middleware adds microseconds, not milliseconds"""
+        response = HttpResponse()
+        middleware = TimingMiddleware(lambda request: response)
+        request = RequestFactory().get("/")
+
+        with self.assertLogs("core.timing", "INFO"):
+            start = time.perf_counter()
+            for _ in range(1000):
+                middleware(request)
+            per_request = (time.perf_counter() - start) / 1000
+
+        self.assertLess(per_request, 200e-6)
@@ -2,13 +2,19 @@
 Test for user API
 """
 
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import BaseBackend
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.serializers import AuthTokenSerializer
+
 CREATE_USER_URL = reverse("core:create")
 TOKEN_URL = reverse("core:token")
 ME_URL = reverse("core:me")
@@ -19,6 +25,13 @@ def create_user(**params):
     return get_user_model().objects.create_user(**params)  # type: ignore
 
 
+class DenyAllBackend(BaseBackend):
+    """Authentication backend refusing every login"""
+
+    def authenticate(self, request, **credentials):
+        raise PermissionDenied
+
+
 class PublicUserApiTest(TestCase):
     """Test the public api features of the user api"""
 
@@ -108,6 +121,58 @@ class PublicUserApiTest(TestCase):
         self.assertNotIn("token", res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_token_sets_backend(self):
+        """Test the authenticated user records the backend that passed"""
+        create_user(email="test@domain.com", password="goodpass")
+        serializer = AuthTokenSerializer(data={
+            "email": "test@domain.com", "password": "goodpass",
+        })
+        serializer.is_valid(raise_exception=True)
+
+        user = async_to_sync(serializer.authenticate)()
+
+        self.assertEqual(
+            user.backend, "django.contrib.auth.backends.ModelBackend",
+        )
+
+    def test_token_bad_credentials_signal(self):
+        """Test a failed login sends user_login_failed without the password"""
+        create_user(email="test@domain.com", password="goodpass")
+        received = []
+
+        def receiver(sender, credentials, request, **kwargs):
+            received.append(credentials)
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        for email in ("test@domain.com", "nobody@domain.com"):
+            self.client.post(TOKEN_URL, {
+                "email": email, "password": "badpass",
+            })
+
+        self.assertEqual(
+            [credentials["email"] for credentials in received],
+            ["test@domain.com", "nobody@domain.com"],
+        )
+        self.assertNotIn(
+            "badpass", [credentials["password"] for credentials in received]
+        )
+
+    @override_settings(AUTHENTICATION_BACKENDS=[
+        "core.test.test_user_api.DenyAllBackend",
+        "django.contrib.auth.backends.ModelBackend",
+    ])
+    def test_token_follows_authentication_backends(self):
+        """Test a backend denying the login stops the ones after it"""
+        create_user(email="test@domain.com", password="goodpass")
+
+        res = self.client.post(TOKEN_URL, {
+            "email": "test@domain.com", "password": "goodpass",
+        })
+
+        self.assertNotIn("token", res.data)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_create_token_blank_password(self):
         """Test posting a blank password return an error"""
         payload = {'email': 'test@domain.com', 'password': ''}
@@ -146,6 +211,25 @@ class PrivateUserApiTest(TestCase):
             'email': self.user.email,
         })
 
+    def test_profile_not_modified(self):
+        """Test a matching If-None-Match on the profile gets a 304"""
+        etag = self.client.get(ME_URL)['ETag']
+
+        res = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_profile_etag_changes_on_update(self):
+        """Test updating the profile changes its ETag"""
+        etag = self.client.get(ME_URL)['ETag']
+
+        self.client.patch(ME_URL, {'first_name': 'changed'})
+        res = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
     def test_post_me_not_allowed(self):
         """Test POST is not allowed for the me endpoint"""
         res = self.client.post(ME_URL, {})
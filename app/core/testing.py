@@ -0,0 +1,186 @@
+"""
+Query budgets: test helpers that keep each endpoint's SQL flat
+
+A test case using QueryBudgetMixin declares an Endpoint for every route
+of the URL namespaces it covers, each with the most queries and rows it
+may cost. The endpoints are then requested with fixtures of 1, 100 and
+10k rows; a test fails if any request goes over budget or if its query
+count changes with the amount of data, which is how an N+1 shows up.
+"""
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.urls import URLResolver, get_resolver, reverse
+
+from core import throttling
+
+
+class Endpoint:
+    """One request to check, and the most SQL it may cost.
+
+    `args` (URL arguments) and `data` may be callables taking the test
+    case, for values that depend on the fixture. `rows=None` leaves the
+    rows unbounded, e.g. for endpoints that stream the whole table.
+    `settings` are overridden for the request, to cover another code
+    path of the same route. `headers` are extra request META entries,
+    e.g. HTTP_AUTHORIZATION.
+    """
+
+    def __init__(self, url_name, method='get', queries=0, rows=0, args=(),
+                 data=None, format='json', settings=None, label=None,
+                 headers=None):
+        self.url_name = url_name
+        self.method = method
+        self.queries = queries
+        self.rows = rows
+        self.args = args
+        self.data = data
+        self.format = format
+        self.settings = settings or {}
+        self.headers = headers or {}
+        self.label = label or f'{method.upper()} {url_name}'
+
+
+class QueryCounter:
+    """Execute wrapper recording each statement and the rows it returned.
+
+    Rows read later through a server-side cursor (QuerySet.iterator())
+    are not seen here.
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        cursor = context['cursor']
+        rows = cursor.rowcount if cursor.description is not None else 0
+        self.statements.append((sql, max(rows, 0)))
+        return result
+
+    @property
+    def queries(self):
+        return len(self.statements)
+
+    @property
+    def rows(self):
+        return sum(rows for _, rows in self.statements)
+
+    def report(self):
+        return '\n'.join(
+            f'  {index}. [{rows} rows] {sql}'
+            for index, (sql, rows) in enumerate(self.statements, 1)
+        )
+
+
+def url_names(namespaces, urlconf=None):
+    """Return the names of the routes under the given URL namespaces.
+
+    None stands for the project's routes outside any namespace.
+    """
+    def walk(patterns, namespace):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                inner = ':'.join(filter(None, [namespace, pattern.namespace]))
+                yield from walk(pattern.url_patterns, inner or None)
+            elif pattern.name:
+                yield namespace, (
+                    f'{namespace}:{pattern.name}' if namespace
+                    else pattern.name
+                )
+
+    return {
+        name
+        for namespace, name in walk(get_resolver(urlconf).url_patterns, None)
+        if (namespace.split(':')[0] if namespace else None) in namespaces
+    }
+
+
+class QueryBudgetMixin:
+    """TestCase mixin checking endpoints against their query budgets.
+
+    Subclasses set `namespaces` (the URL namespaces they cover),
+    `endpoints` (Endpoint instances; every route in the namespaces needs
+    at least one, or a place in `exempt`) and `create_rows(count)`,
+    which adds `count` more rows of the data the endpoints read. Requests
+    are made with `self.client`, with caches and throttles cleared first
+    and inside a rolled-back transaction, so each one pays its full,
+    uncached cost and writes don't change the fixture.
+    """
+
+    sizes = (1, 100, 10000)
+    namespaces = ()
+    endpoints = ()
+    exempt = ()
+
+    def create_rows(self, count):
+        raise NotImplementedError
+
+    def resolve(self, value):
+        return value(self) if callable(value) else value
+
+    def measure(self, endpoint):
+        """Request `endpoint`; return the QueryCounter and the response"""
+        for cache in caches.all():
+            cache.clear()
+        throttling.get_store().clear()
+        url = reverse(endpoint.url_name, args=self.resolve(endpoint.args))
+        request = getattr(self.client, endpoint.method)
+        kwargs = dict(endpoint.headers)
+        if endpoint.method != 'get':
+            kwargs['format'] = endpoint.format
+        counter = QueryCounter()
+        with override_settings(**endpoint.settings), transaction.atomic():
+            with connection.execute_wrapper(counter):
+                response = request(
+                    url, self.resolve(endpoint.data), **kwargs,
+                )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        return counter, response
+
+    def test_routes_have_budgets(self):
+        """Test every route in the covered namespaces has a budget"""
+        covered = {endpoint.url_name for endpoint in self.endpoints}
+        missing = url_names(self.namespaces) - covered - set(self.exempt)
+
+        self.assertEqual(sorted(missing), [], 'Routes without a budget')
+
+    def test_query_budgets(self):
+        """Test query counts stay in budget and flat as data grows"""
+        failures = []
+        baseline = {}
+        created = 0
+        for size in self.sizes:
+            self.create_rows(size - created)
+            created = size
+            for endpoint in self.endpoints:
+                counter, response = self.measure(endpoint)
+                where = f'{endpoint.label} with {size} rows'
+                if response.status_code >= 400:
+                    failures.append(
+                        f'{where}: status {response.status_code}'
+                    )
+                    continue
+                label = endpoint.label
+                first = baseline.setdefault(label, counter.queries)
+                if counter.queries > endpoint.queries:
+                    failures.append(
+                        f'{where}: {counter.queries} queries, budget '
+                        f'{endpoint.queries}\n{counter.report()}'
+                    )
+                elif counter.queries != first:
+                    failures.append(
+                        f'{where}: {counter.queries} queries, '
+                        f'{first} with {self.sizes[0]} rows\n'
+                        f'{counter.report()}'
+                    )
+                if endpoint.rows is not None and counter.rows > endpoint.rows:
+                    failures.append(
+                        f'{where}: fetched {counter.rows} rows, budget '
+                        f'{endpoint.rows}\n{counter.report()}'
+                    )
+
+        if failures:
+            self.fail('\n\n'.join(failures))
@@ -0,0 +1,260 @@
+"""
+Token-bucket throttling for the API
+
+Every scope has a rate such as "600/min": a bucket holding that many
+requests that refills evenly over the period, so a client may burst up
+to the full amount and then continues at the steady rate. Buckets are
+tracked with GCRA, which stores one timestamp per bucket (the time the
+bucket would be full again) instead of a token count and a last-refill
+time.
+
+Two stores are provided, chosen with THROTTLE_STORE:
+
+- "local": a dict in this process, shared by its threads. A check costs
+  a few microseconds, but each worker process enforces its own limits.
+- "cache": the THROTTLE_CACHE_ALIAS cache, so all hosts share limits.
+  With django-redis the update runs as one Lua script and is atomic
+  across hosts; other backends are only serialized within a process.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+try:
+    from django_redis import get_redis_connection
+    from django_redis.cache import RedisCache
+except ImportError:  # pragma: no cover - optional dependency
+    RedisCache = None
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class Decision:
+    """Outcome of one bucket check, in seconds relative to now"""
+
+    __slots__ = ('allowed', 'limit', 'remaining', 'reset', 'retry_after')
+
+    def __init__(self, allowed, limit, remaining, reset, retry_after):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+
+def decide(tat, now, limit, period):
+    """Apply GCRA to a bucket whose full-again time is `tat`.
+
+    Returns the Decision and the new `tat` to store (unchanged when the
+    request is refused).
+    """
+    interval = period / limit
+    tat = max(tat, now)
+    new_tat = tat + interval
+    allow_at = new_tat - period
+    if now < allow_at:
+        return Decision(False, limit, 0, tat - now, allow_at - now), tat
+    remaining = int((period - (new_tat - now)) / interval)
+    return Decision(True, limit, remaining, new_tat - now, 0.0), new_tat
+
+
+class LocalBucketStore:
+    """Buckets in a dict shared by the threads of this process.
+
+    The dict is kept in least recently used order. Each check prunes at
+    most `prune_batch` buckets from the cold end: full ones, which
+    behave exactly like missing ones, and past `max_entries` live ones
+    too, so a check costs the same however many buckets there are.
+    """
+
+    prune_batch = 8
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._tats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, period):
+        now = time.monotonic()
+        with self._lock:
+            decision, tat = decide(
+                self._tats.get(key, now), now, limit, period,
+            )
+            self._tats[key] = tat
+            self._tats.move_to_end(key)
+            self._prune(now)
+        return decision
+
+    def _prune(self, now):
+        """Drop a bounded number of cold buckets; hold the lock"""
+        for _ in range(self.prune_batch):
+            key, tat = next(iter(self._tats.items()))
+            if tat > now and len(self._tats) <= self.max_entries:
+                break
+            del self._tats[key]
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+
+
+# KEYS[1] bucket; ARGV limit, period. Uses the server clock so hosts
+# with skewed clocks still agree. Floats are returned as strings since
+# Redis truncates Lua numbers to integers.
+GCRA_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local interval = period / limit
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+    return {0, 0, tostring(tat - now), tostring(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat),
+           'PX', math.ceil((new_tat - now) * 1000))
+local remaining = math.floor((period - (new_tat - now)) / interval)
+return {1, remaining, tostring(new_tat - now), '0'}
+"""
+
+
+class CacheBucketStore:
+    """Buckets in a Django cache, shared by every host using it"""
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._script = None
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def consume(self, key, limit, period):
+        cache = self.cache
+        if RedisCache is not None and isinstance(cache, RedisCache):
+            return self._consume_redis(cache, key, limit, period)
+
+        with self._lock:
+            now = time.time()
+            decision, tat = decide(
+                cache.get(key, now), now, limit, period,
+            )
+            if decision.allowed:
+                cache.set(key, tat, math.ceil(tat - now))
+        return decision
+
+    def _consume_redis(self, cache, key, limit, period):
+        if self._script is None:
+            client = get_redis_connection(self.alias)
+            self._script = client.register_script(GCRA_SCRIPT)
+        allowed, remaining, reset, retry_after = self._script(
+            keys=[cache.make_key(key)], args=[limit, period],
+        )
+        return Decision(
+            bool(allowed), limit, int(remaining),
+            float(reset), float(retry_after),
+        )
+
+    def clear(self):
+        self.cache.clear()
+
+
+_lock = threading.Lock()
+_store = None
+
+
+def get_store():
+    """Return the bucket store selected by THROTTLE_STORE"""
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                if getattr(settings, 'THROTTLE_STORE', 'local') == 'cache':
+                    _store = CacheBucketStore(
+                        getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')
+                    )
+                else:
+                    _store = LocalBucketStore()
+    return _store
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    global _store
+    if setting in ('THROTTLE_STORE', 'THROTTLE_CACHE_ALIAS'):
+        _store = None
+
+
+def parse_rate(rate):
+    """Parse "600/min" into (600, 60)"""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle by user, or by client IP for anonymous requests.
+
+    The rate comes from DEFAULT_THROTTLE_RATES, looked up in order:
+
+    - "<throttle_scope>.<action>", e.g. "recipes.import_recipes",
+    - "<throttle_scope>" from the view,
+    - "user" or "anon".
+
+    Requests matching none of them are not throttled. The outcome is
+    left on the request for RateLimitHeadersMiddleware to report.
+    """
+
+    def get_rate(self, request, view):
+        """Return (scope, rate string), or (None, None)"""
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        scope = getattr(view, 'throttle_scope', None)
+        action = getattr(view, 'action', None)
+        candidates = []
+        if scope:
+            if action:
+                candidates.append(f'{scope}.{action}')
+            candidates.append(scope)
+        is_user = request.user and request.user.is_authenticated
+        candidates.append('user' if is_user else 'anon')
+        for candidate in candidates:
+            rate = rates.get(candidate)
+            if rate:
+                return candidate, rate
+        return None, None
+
+    def get_cache_key(self, request, scope):
+        if request.user and request.user.is_authenticated:
+            ident = f'u{request.user.pk}'
+        else:
+            ident = f'ip{self.get_ident(request)}'
+        return f'throttle:{scope}:{ident}'
+
+    def allow_request(self, request, view):
+        scope, rate = self.get_rate(request, view)
+        if rate is None:
+            return True
+        limit, period = parse_rate(rate)
+        self.decision = get_store().consume(
+            self.get_cache_key(request, scope), limit, period,
+        )
+
+        # Report the tightest limit when several throttles apply.
+        current = getattr(request._request, 'rate_limit', None)
+        if current is None or self.decision.remaining < current.remaining:
+            request._request.rate_limit = self.decision
+        return self.decision.allowed
+
+    def wait(self):
+        return self.decision.retry_after
@@ -0,0 +1,117 @@
+"""
+Per-request timing: where a request's time goes
+
+TimingMiddleware starts a RequestTiming for every request. SQL is timed
+by a connection execute wrapper, serializers by TimedSerializerMixin and
+`timer('serialize')`, and rendering by the middleware's template
+response hook. The result is sent as a Server-Timing header, logged as
+one line on the "core.timing" logger and recorded in core.metrics.
+"""
+import contextlib
+import contextvars
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+PHASES = ('db', 'serialize', 'render')
+
+
+class RequestTiming:
+    """Durations (in seconds) and query count of one request"""
+
+    __slots__ = ('start', 'durations', 'queries')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper timing every query on a connection"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.durations['db'] += time.perf_counter() - start
+            self.queries += 1
+
+    def add(self, phase, seconds):
+        self.durations[phase] += seconds
+
+    def server_timing(self, total):
+        """Return the Server-Timing header value, in milliseconds"""
+        durations = self.durations
+        return (
+            f'total;dur={total * 1000:.1f}, '
+            f'db;dur={durations["db"] * 1000:.1f};'
+            f'desc="{self.queries} queries", '
+            f'serialize;dur={durations["serialize"] * 1000:.1f}, '
+            f'render;dur={durations["render"] * 1000:.1f}'
+        )
+
+    def log(self, request, route, status, total):
+        """Write the request as one logfmt line, with the fields as extra"""
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        fields = {
+            'method': request.method,
+            'route': route,
+            'status': status,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(self.durations['db'] * 1000, 2),
+            'queries': self.queries,
+            'serialize_ms': round(self.durations['serialize'] * 1000, 2),
+            'render_ms': round(self.durations['render'] * 1000, 2),
+        }
+        logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'timing': fields},
+        )
+
+
+def start(timing):
+    """Make `timing` current for this context; returns a token"""
+    return _current.set(timing)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def timer(phase):
+    """Add the time spent in the block to the current request's `phase`"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, time.perf_counter() - start)
+
+
+class TimedSerializerMixin:
+    """Count validation and `.data` as the request's serializer time.
+
+    Goes before the serializer base class. Nested serializers are
+    called through to_representation/run_validation, so only the outer
+    serializer is timed and nothing is counted twice.
+    """
+
+    def is_valid(self, *args, **kwargs):
+        with timer('serialize'):
+            return super().is_valid(*args, **kwargs)
+
+    @property
+    def data(self):
+        with timer('serialize'):
+            return super().data
@@ -1,30 +1,167 @@
 """
 Views for the user API
 """
+import asyncio
+import hashlib
+import hmac
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.decorators import classonlymethod, method_decorator
+from django.views.decorators.http import condition
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from . import hashing, metrics
+from .authentication import CachedTokenAuthentication
 from .serializers import AuthTokenSerializer, UserSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+def user_etag(request, *args, **kwargs):
+    """Return a strong ETag for the authenticated user's profile"""
+    user = request.user
+    value = ':'.join([
+        str(user.pk),
+        user.updated_at.isoformat(),
+        request.accepted_renderer.format,
+    ])
+    return hashlib.sha1(value.encode()).hexdigest()
+
+
+def user_last_modified(request, *args, **kwargs):
+    """Return when the authenticated user's profile last changed"""
+    return request.user.updated_at
+
+
+class PasswordHashingUnavailable(APIException):
+    """The hashing pool had no free slot in time (see core.hashing)"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many concurrent logins, try again shortly.'
+    default_code = 'password_hashing_busy'
+
+
+class AsyncHashingViewMixin:
+    """Dispatch to async handlers that await password hashes.
+
+    DRF 3.12 only calls sync handlers, so `dispatch` is redone as a
+    coroutine: the request setup (authentication, throttling), exception
+    handling and response finalizing run in a thread via sync_to_async,
+    and the handler itself runs on the event loop. While it awaits a
+    hash, the view holds no thread.
+    """
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        """Return the view, marked so Django awaits it"""
+        return markcoroutinefunction(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        """`APIView.dispatch`, awaiting the handler"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = self.http_method_not_allowed
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), handler)
+            if not asyncio.iscoroutinefunction(handler):
+                handler = sync_to_async(handler)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = await sync_to_async(self.finalize_response)(
+            request, response, *args, **kwargs,
+        )
+        return self.response
+
+    def handle_exception(self, exc):
+        """Answer a saturated hashing pool with a 503"""
+        if isinstance(exc, hashing.PasswordHashingBusy):
+            exc = PasswordHashingUnavailable()
+        return super().handle_exception(exc)
+
+
+class CreateUserView(AsyncHashingViewMixin, generics.CreateAPIView):
     """Create a new user in the system"""
 
     serializer_class = UserSerializer
 
+    async def post(self, request, *args, **kwargs):
+        """Create the user, awaiting the password hash"""
+        serializer = self.get_serializer(data=request.data)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        password_hash = await hashing.make_password(
+            serializer.validated_data["password"],
+        )
+        await sync_to_async(serializer.save)(password_hash=password_hash)
+        headers = self.get_success_headers(serializer.data)
+        return Response(
+            serializer.data, status=status.HTTP_201_CREATED, headers=headers,
+        )
+
 
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(AsyncHashingViewMixin, ObtainAuthToken):
     """Create a new auth token"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'token'
+
+    async def post(self, request, *args, **kwargs):
+        """Return the user's token, awaiting the password check"""
+        serializer = self.get_serializer(data=request.data)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        user = await serializer.authenticate()
+        token, _ = await sync_to_async(Token.objects.get_or_create)(
+            user=user,
+        )
+        return Response({'token': token.key})
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrieve and return the authenticated user"""
         return self.request.user
+
+    @method_decorator(condition(
+        etag_func=user_etag,
+        last_modified_func=user_last_modified,
+    ))
+    def get(self, request, *args, **kwargs):
+        """Retrieve the profile, or 304 if the client's copy is current"""
+        return super().get(request, *args, **kwargs)
+
+
+def metrics_view(request):
+    """Serve core.metrics in the Prometheus text format.
+
+    Internal only: scrapers must send `Authorization: Bearer
+    <METRICS_TOKEN>`; anyone else, and everyone while no token is
+    configured, gets a 404. The peer address proves nothing behind the
+    reverse proxy, where every client is 127.0.0.1.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    scheme, _, credentials = request.META.get(
+        'HTTP_AUTHORIZATION', '',
+    ).partition(' ')
+    if not (
+        token
+        and scheme.lower() == 'bearer'
+        and hmac.compare_digest(credentials.encode(), token.encode())
+    ):
+        raise Http404
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
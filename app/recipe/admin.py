@@ -1,18 +1,208 @@
 """
 Admiin Customization for the Recipe Admin
 """
+from collections import defaultdict
+from decimal import Decimal
+
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+
+from core.paginators import EstimatedCountPaginator
 
+from . import cache, stats
 from .models import Recipe
 
 
+class RangeListFilter(admin.SimpleListFilter):
+    """Filter on fixed value buckets instead of every distinct value.
+
+    Django's default filter for a plain field lists every distinct value,
+    which takes a full table scan per page load. `buckets` is a list of
+    (label, low, high) with either bound optional; high is exclusive.
+    """
+    field_name = None
+    buckets = []
+
+    def lookups(self, request, model_admin):
+        return [(str(index), label)
+                for index, (label, _, _) in enumerate(self.buckets)]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value is None:
+            return queryset
+        try:
+            _, low, high = self.buckets[int(value)]
+        except (ValueError, IndexError):
+            return queryset.none()
+        if low is not None:
+            queryset = queryset.filter(**{f'{self.field_name}__gte': low})
+        if high is not None:
+            queryset = queryset.filter(**{f'{self.field_name}__lt': high})
+        return queryset
+
+
+class PriceRangeFilter(RangeListFilter):
+    title = 'price'
+    parameter_name = 'price_range'
+    field_name = 'price'
+    buckets = [
+        ('Under 5', None, Decimal('5')),
+        ('5 to 10', Decimal('5'), Decimal('10')),
+        ('10 to 20', Decimal('10'), Decimal('20')),
+        ('20 to 50', Decimal('20'), Decimal('50')),
+        ('50 and over', Decimal('50'), None),
+    ]
+
+
+class CookTimeRangeFilter(RangeListFilter):
+    title = 'cook time'
+    parameter_name = 'times_minutes_range'
+    field_name = 'times_minutes'
+    buckets = [
+        ('Under 15 minutes', None, 15),
+        ('15 to 30 minutes', 15, 30),
+        ('30 minutes to 1 hour', 30, 60),
+        ('1 to 2 hours', 60, 120),
+        ('2 hours and over', 120, None),
+    ]
+
+
+class UserEmailFilter(admin.SimpleListFilter):
+    """Filter by owner email typed into a box, not picked from a list.
+
+    The default `user` filter renders a link for every user in the
+    system; this one renders a single input and matches emails starting
+    with what was typed, case-insensitively. `istartswith` compiles to
+    UPPER(email) LIKE 'TERM%', served by the email trigram index.
+    """
+    title = 'user'
+    parameter_name = 'user_email'
+    template = 'admin/recipe/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        return queryset.filter(user__email__istartswith=value.strip())
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.parameter_name],
+            ),
+            'display': 'All',
+        }
+        yield {
+            'selected': self.value() is not None,
+            'parameter_name': self.parameter_name,
+            'value': self.value(),
+            'display': 'Email',
+            'hidden_params': [
+                (name, value) for name, value in changelist.params.items()
+                if name not in (self.parameter_name, PAGE_VAR)
+            ],
+        }
+
+
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    """Admin Customization for the recipe model"""
+    """Admin Customization for the recipe model.
+
+    Saves and deletes fold into the owners' RecipeStats like API writes:
+    the old values are read under a row lock, then `stats.apply` runs in
+    the same transaction as the write.
+    """
     autocomplete_fields = ['user']
-    prepopulated_fields = {'slug': ['title']}
-    list_filter = ['user', 'times_minutes', 'price']
+    # Slugs are generated on save and must stay unique per user.
+    readonly_fields = ['slug']
+    list_filter = [UserEmailFilter, CookTimeRangeFilter, PriceRangeFilter]
     list_display = ['user', 'title', 'price']
     list_per_page: int = 10
     list_select_related = ['user']
-    search_fields = ["user", "title"]
+    paginator = EstimatedCountPaginator
+    search_fields = ['title', 'user__email']
+    show_full_result_count = False
+    # Most users a search term may match by email before it is refined.
+    user_search_limit = 100
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search titles and owner emails without an OR across the join.
+
+        `title OR user.email` in a single WHERE cannot use an index on
+        either table. Matching users are resolved first (capped, through
+        the email trigram index) so the recipe query becomes
+        `title LIKE ... OR user_id IN (...)`, a BitmapOr of two indexes.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        user_ids = list(
+            get_user_model().objects
+            .filter(email__icontains=search_term)
+            .values_list('id', flat=True)[:self.user_search_limit]
+        )
+        queryset = queryset.filter(
+            Q(title__icontains=search_term) | Q(user_id__in=user_ids)
+        )
+        return queryset, False
+
+    def locked_values(self, queryset):
+        """Lock the recipes and return their (user_id, price, minutes)"""
+        return list(
+            queryset.order_by()
+            .select_for_update(of=('self',))
+            .values_list('user_id', 'price', 'times_minutes')
+        )
+
+    def apply_removed(self, rows):
+        """Take deleted (user_id, price, minutes) rows out of the stats"""
+        removed = defaultdict(list)
+        for user_id, price, minutes in rows:
+            removed[user_id].append((price, minutes))
+        for user_id, values in removed.items():
+            stats.apply(user_id, removed=values)
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            old = []
+            if change:
+                old = self.locked_values(Recipe.objects.filter(pk=obj.pk))
+            super().save_model(request, obj, form, change)
+            added = stats.recipe_values([obj])
+            if not old:
+                stats.apply(obj.user_id, added=added)
+                return
+            old_user_id, price, minutes = old[0]
+            removed = [(price, minutes)]
+            if old_user_id == obj.user_id:
+                if removed != added:
+                    stats.apply(obj.user_id, added=added, removed=removed)
+                return
+            # Reassigned: the signal only invalidates the new owner.
+            stats.apply(old_user_id, removed=removed)
+            stats.apply(obj.user_id, added=added)
+            cache.bump_version(old_user_id)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            rows = self.locked_values(Recipe.objects.filter(pk=obj.pk))
+            super().delete_model(request, obj)
+            self.apply_removed(rows)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            rows = self.locked_values(queryset)
+            super().delete_queryset(request, queryset)
+            self.apply_removed(rows)
@@ -0,0 +1,146 @@
+"""
+Versioned per-user response cache for the recipe APIs
+
+Cached responses are keyed on the user, the request URL (path and query
+parameters) and a per-user version counter. Writing a recipe bumps the
+counter, which orphans every cached response for that user at once; the
+orphans simply age out of the cache. Single-recipe writes bump it from
+the Recipe signals (see recipe.signals), wherever they come from; bulk
+writes, which send no signals, bump it themselves.
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+# How long a cache miss may hold the recompute lock before other
+# requests give up waiting and compute the value themselves.
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+
+def get_cache():
+    """Return the cache backend used for recipe responses"""
+    return caches[getattr(settings, 'RECIPE_CACHE_ALIAS', 'default')]
+
+
+def is_shared():
+    """Return whether the cache, and so its versions, spans all workers"""
+    return getattr(settings, 'RECIPE_CACHE_SHARED', False)
+
+
+def _version_key(user_id):
+    return f'recipe:version:{user_id}'
+
+
+def get_version(user_id):
+    """Return the current cache version for a user"""
+    cache = get_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock rather than 1 so a counter that was evicted
+        # never hands out a version that old responses are cached under.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _incr_version(user_id):
+    cache = get_cache()
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_version(user_id):
+    """Invalidate every cached response for a user.
+
+    Inside a transaction the version is bumped again on commit, so a
+    response computed from the old rows before the commit is not left
+    cached under the new version.
+    """
+    _incr_version(user_id)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _incr_version(user_id))
+
+
+def response_key(user_id, url, version=None):
+    """Return the cache key for a user's response to `url`.
+
+    Uses the user's current version unless one is given.
+    """
+    if version is None:
+        version = get_version(user_id)
+    digest = hashlib.sha1(url.encode()).hexdigest()
+    return f'recipe:response:{user_id}:{version}:{digest}'
+
+
+@contextmanager
+def _local_lock(key):
+    """Serialize threads of this process computing the same key"""
+    with _key_locks_guard:
+        lock, waiters = _key_locks.get(key, (threading.Lock(), 0))
+        _key_locks[key] = (lock, waiters + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _key_locks_guard:
+            lock, waiters = _key_locks[key]
+            if waiters == 1:
+                del _key_locks[key]
+            else:
+                _key_locks[key] = (lock, waiters - 1)
+
+
+def get_or_compute(key, compute, timeout=None):
+    """Return the cached value for `key`, computing it on a miss.
+
+    Concurrent misses on the same key compute the value once: threads in
+    this process queue on a local lock, and other processes sharing the
+    cache wait on a lock entry stored in the cache itself.
+    """
+    cache = get_cache()
+    if timeout is None:
+        timeout = getattr(settings, 'RECIPE_CACHE_TIMEOUT', 300)
+
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    with _local_lock(key):
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+        lock_key = f'{key}:lock'
+        acquired = cache.add(lock_key, 1, LOCK_TIMEOUT)
+        if not acquired:
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                value = cache.get(key)
+                if value is not None:
+                    return value
+                if cache.add(lock_key, 1, LOCK_TIMEOUT):
+                    acquired = True
+                    break
+
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            if acquired:
+                cache.delete(lock_key)
+
+    return value
@@ -0,0 +1,44 @@
+"""
+Streaming export formats for recipes
+"""
+import csv
+
+from rest_framework.utils.encoders import JSONEncoder
+
+EXPORT_FIELDS = [
+    'id',
+    'title',
+    'slug',
+    'description',
+    'times_minutes',
+    'price',
+    'link',
+]
+
+
+class _Echo:
+    """File-like object whose write() returns the line csv produced"""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(rows):
+    """Yield one JSON document per row, newline delimited"""
+    encoder = JSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def csv_lines(rows):
+    """Yield a CSV header followed by one line per row"""
+    writer = csv.DictWriter(_Echo(), fieldnames=EXPORT_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
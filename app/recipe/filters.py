@@ -0,0 +1,33 @@
+"""
+Filters for the recipe APIs
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Full-text search over recipe title and description.
+
+    `?q=` is parsed like a web search box (quoted phrases, `or`, `-`)
+    and matched against the stored `search_vector`. Matches are
+    annotated with their `rank` for RecipeCursorPagination to order by.
+    """
+    search_param = 'q'
+    config = 'english'
+
+    @classmethod
+    def get_search_terms(cls, request):
+        return request.query_params.get(cls.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        query = SearchQuery(terms, config=self.config, search_type='websearch')
+        # Cast the float4 rank to float8 so it survives the round trip
+        # through the pagination cursor without losing precision.
+        rank = Cast(SearchRank(F('search_vector'), query), FloatField())
+        return queryset.filter(search_vector=query).annotate(rank=rank)
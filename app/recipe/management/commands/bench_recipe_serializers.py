@@ -0,0 +1,83 @@
+"""
+Django Command to benchmark recipe list serialization
+"""
+
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.models import Recipe
+from recipe.serializers import RecipeSerializer, row_serializer
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark rows"""
+
+
+class Command(BaseCommand):
+    """Compare RecipeSerializer with the compiled values_list() path.
+
+    Inserts `--rows` recipes for a throwaway user inside a transaction
+    that is rolled back afterwards, then times a full page through each
+    path, query included, and reports the best of `--repeat` runs.
+    """
+
+    help = "Benchmark recipe list serialization throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entry Point for command"""
+        try:
+            with transaction.atomic():
+                self.run(options["rows"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, rows, repeat):
+        user = get_user_model().objects.create(
+            email="bench-serializers@example.com",
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                user=user,
+                title=f"Benchmark recipe {index}",
+                slug=f"benchmark-recipe-{index}",
+                times_minutes=index % 240,
+                price=Decimal(index % 100000) / 100,
+                link=f"https://example.com/recipes/{index}",
+            )
+            for index in range(rows)
+        )
+        recipes = Recipe.objects.filter(user=user).order_by("-id")
+        columns, to_dict = row_serializer(RecipeSerializer)
+
+        def serializer():
+            return RecipeSerializer(
+                recipes.defer("search_vector")[:rows], many=True,
+            ).data
+
+        def compiled():
+            page = recipes.values_list(*columns)[:rows]
+            return [to_dict(row) for row in page]
+
+        self.stdout.write(f"{rows} rows per page, best of {repeat}")
+        runs = [("serializer", serializer), ("compiled", compiled)]
+        for label, func in runs:
+            best = min(self.time(func) for _ in range(repeat))
+            self.stdout.write(self.style.SUCCESS(
+                f"{label:>10}: {rows / best:11.0f} rows/s  "
+                f"{best * 1000:8.1f} ms/page"
+            ))
+
+    def time(self, func):
+        """Return how long one call of `func` takes"""
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
@@ -0,0 +1,77 @@
+"""
+Django Command to bulk import recipes for a user
+"""
+
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import importer
+
+
+class Command(BaseCommand):
+    """Import recipes from an NDJSON or CSV file with Postgres COPY."""
+
+    help = "Bulk import recipes for a user from NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON or CSV file to import.")
+        parser.add_argument(
+            "--user", required=True, help="Email of the owning user."
+        )
+        parser.add_argument(
+            "--format",
+            choices=importer.FORMATS,
+            help="Input format; inferred from the file extension if omitted.",
+        )
+        parser.add_argument(
+            "--errors",
+            help="Where to write rejected rows (default: <path>.errors).",
+        )
+        parser.add_argument("--chunk-size", type=int)
+
+    def handle(self, *args, **options):
+        """Entry Point for command"""
+        path = options["path"]
+        fmt = options["format"] or os.path.splitext(path)[1].lstrip(".")
+        if fmt not in importer.FORMATS:
+            raise CommandError(f"Cannot infer the format of {path}.")
+
+        try:
+            user = get_user_model().objects.get(email=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}.")
+
+        with open(path, "rb") as raw:
+            if not importer.is_utf8(raw):
+                raise CommandError(f"{path} is not valid UTF-8.")
+
+        errors_path = options["errors"] or f"{path}.errors"
+        with open(path, newline="", encoding="utf-8") as stream, \
+                open(errors_path, "w", encoding="utf-8") as errors:
+            stats = importer.import_recipes(
+                user,
+                stream,
+                fmt,
+                errors=errors,
+                progress=self.report,
+                chunk_size=options["chunk_size"],
+            )
+
+        style = self.style.WARNING if stats.failed else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Imported {stats.imported} of {stats.rows} rows in "
+            f"{stats.elapsed:.1f}s ({stats.rows_per_second:.0f} rows/s)."
+        ))
+        if stats.failed:
+            self.stdout.write(style(
+                f"{stats.failed} rejected rows written to {errors_path}."
+            ))
+
+    def report(self, stats):
+        """Print progress after every chunk"""
+        self.stdout.write(
+            f"{stats.rows} rows read, {stats.imported} imported, "
+            f"{stats.failed} rejected, {stats.rows_per_second:.0f} rows/s"
+        )
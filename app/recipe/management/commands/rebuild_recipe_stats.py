@@ -0,0 +1,50 @@
+"""
+Django Command to recompute the per-user recipe statistics
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipe import stats
+
+
+class Command(BaseCommand):
+    """Recompute RecipeStats rows from the recipe table.
+
+    Run it after writes that bypass the API and the admin (raw SQL, COPY
+    loads) to correct any drift. Rebuilds every user unless `--user` is given.
+    """
+
+    help = "Recompute the per-user recipe statistics."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            help="Email of a user to rebuild; may be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        """Entry Point for command"""
+        user_ids = None
+        if options["user"]:
+            users = dict(
+                get_user_model().objects
+                .filter(email__in=options["user"])
+                .values_list("email", "id")
+            )
+            missing = sorted(set(options["user"]) - set(users))
+            if missing:
+                raise CommandError(f"No user with email {', '.join(missing)}.")
+            user_ids = list(users.values())
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            written = stats.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt recipe stats of {written} users in "
+            f"{time.perf_counter() - start:.2f}s."
+        ))
@@ -0,0 +1,21 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('recipe', '0004_recipe_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # Matches the admin's title__icontains, UPPER(title) LIKE '%term%'.
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS recipe_title_trgm_idx '
+            'ON recipe_recipe USING gin (UPPER(title) gin_trgm_ops);',
+            'DROP INDEX CONCURRENTLY IF EXISTS recipe_title_trgm_idx;',
+        ),
+    ]
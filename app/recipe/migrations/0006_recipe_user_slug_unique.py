@@ -0,0 +1,142 @@
+from django.db import IntegrityError, migrations, models
+from django.db.models import Count, Q
+from django.utils.text import slugify
+
+INDEX = 'recipe_user_slug_uniq'
+# Builds attempted before giving up on writers adding duplicates.
+ATTEMPTS = 3
+
+# Frozen copy of recipe.slugs as of this migration.
+FALLBACK = 'recipe'
+MAX_LENGTH = 255
+SUFFIX_LENGTH = 11
+
+
+def base_slug(title):
+    slug = slugify(title)[:MAX_LENGTH - SUFFIX_LENGTH].strip('-_')
+    return slug or FALLBACK
+
+
+def unique_slugs(queryset, titles):
+    bases = [base_slug(title) for title in titles]
+    if not bases:
+        return []
+    condition = Q(slug__in=bases)
+    for base in set(bases):
+        condition |= Q(slug__startswith=f'{base}-')
+    taken = set(
+        queryset.filter(condition).order_by().values_list('slug', flat=True)
+    )
+    suffixes = {}
+    slugs = []
+    for base in bases:
+        slug = base
+        number = suffixes.get(base, 1)
+        while slug in taken:
+            number += 1
+            slug = f'{base}-{number}'
+        suffixes[base] = number
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def dedupe_slugs(Recipe):
+    """Give every recipe a slug that is unique for its user.
+
+    Of recipes sharing a user and slug the oldest keeps it; the others,
+    and recipes without a slug, get a fresh one.
+    """
+    clashes = (
+        Recipe.objects.values('user_id', 'slug')
+        .annotate(count=Count('id'))
+        .filter(Q(count__gt=1) | Q(slug=''))
+    )
+    for clash in list(clashes):
+        recipes = list(
+            Recipe.objects
+            .filter(user_id=clash['user_id'], slug=clash['slug'])
+            .order_by('id')
+        )
+        if clash['slug']:
+            recipes = recipes[1:]
+        names = [clash['slug'] or recipe.title for recipe in recipes]
+        new_slugs = unique_slugs(
+            Recipe.objects.filter(user_id=clash['user_id']), names,
+        )
+        for recipe, slug in zip(recipes, new_slugs):
+            recipe.slug = slug
+        Recipe.objects.bulk_update(recipes, ['slug'])
+
+
+def index_is_valid(schema_editor):
+    """Return whether the index exists and is valid, None if missing"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT i.indisvalid FROM pg_index i '
+            'JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = %s',
+            [INDEX],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX};')
+
+
+def build_unique_index(apps, schema_editor):
+    """Deduplicate slugs, then build the (user_id, slug) unique index.
+
+    Recipes can still be written between the dedupe and the CONCURRENTLY
+    build. A duplicate slipping in fails the build and leaves an INVALID
+    index behind, which is dropped before deduplicating again. Such a
+    leftover from an earlier failed run is dropped the same way.
+    """
+    Recipe = apps.get_model('recipe', 'Recipe')
+    for attempt in range(ATTEMPTS):
+        valid = index_is_valid(schema_editor)
+        if valid:
+            return
+        if valid is not None:
+            drop_index(apps, schema_editor)
+        dedupe_slugs(Recipe)
+        try:
+            schema_editor.execute(
+                f'CREATE UNIQUE INDEX CONCURRENTLY {INDEX} ON recipe_recipe '
+                f'(user_id int8_ops, slug varchar_pattern_ops);'
+            )
+            return
+        except IntegrityError:
+            if attempt == ATTEMPTS - 1:
+                drop_index(apps, schema_editor)
+                raise
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('recipe', '0005_recipe_title_trigram_index'),
+    ]
+
+    operations = [
+        # The slug-only index is superseded by the (user_id, slug) one.
+        migrations.AlterField(
+            model_name='recipe',
+            name='slug',
+            field=models.SlugField(blank=True, db_index=False, max_length=255),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(build_unique_index, drop_index),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='recipe',
+                    constraint=models.UniqueConstraint(fields=('user', 'slug'), name='recipe_user_slug_uniq', opclasses=['int8_ops', 'varchar_pattern_ops']),
+                ),
+            ],
+        ),
+    ]
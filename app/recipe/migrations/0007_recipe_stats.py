@@ -0,0 +1,59 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Frozen copy of recipe.stats.rebuild as of this migration; the table is
+# new, so there is nothing to update or delete.
+BUILD_STATS = """
+INSERT INTO recipe_recipestats (
+    user_id, recipe_count, price_total, price_min, price_max,
+    minutes_under_15, minutes_15_to_30, minutes_30_to_60,
+    minutes_60_to_120, minutes_120_and_over
+)
+SELECT
+    user_id, COUNT(*), SUM(price), MIN(price), MAX(price),
+    COUNT(*) FILTER (WHERE times_minutes < 15),
+    COUNT(*) FILTER (WHERE times_minutes >= 15 AND times_minutes < 30),
+    COUNT(*) FILTER (WHERE times_minutes >= 30 AND times_minutes < 60),
+    COUNT(*) FILTER (WHERE times_minutes >= 60 AND times_minutes < 120),
+    COUNT(*) FILTER (WHERE times_minutes >= 120)
+FROM recipe_recipe
+GROUP BY user_id;
+"""
+
+
+def build_stats(apps, schema_editor):
+    schema_editor.execute(BUILD_STATS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0006_recipe_user_slug_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('price_min', models.DecimalField(decimal_places=2, max_digits=6, null=True)),
+                ('price_max', models.DecimalField(decimal_places=2, max_digits=6, null=True)),
+                ('minutes_under_15', models.IntegerField(default=0)),
+                ('minutes_15_to_30', models.IntegerField(default=0)),
+                ('minutes_30_to_60', models.IntegerField(default=0)),
+                ('minutes_60_to_120', models.IntegerField(default=0)),
+                ('minutes_120_and_over', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'recipe stats',
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-18 04:12
+
+from django.contrib.postgres.operations import RemoveIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # DROP INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('recipe', '0007_recipe_stats'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='recipe',
+            name='recipe_user_updated_idx',
+        ),
+    ]
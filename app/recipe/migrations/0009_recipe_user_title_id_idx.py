@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 04:24
+
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('recipe', '0008_remove_recipe_user_updated_idx'),
+    ]
+
+    operations = [
+        # Build the replacement before dropping the old index, so title
+        # ordered lists are never left without one.
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'title', 'id'], name='recipe_user_title_id_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='recipe',
+            name='recipe_user_title_idx',
+        ),
+    ]
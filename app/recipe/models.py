@@ -1,9 +1,13 @@
 """
 Database models= for recipe
 """
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.conf import settings
 
+from . import slugs
+
 
 class Recipe(models.Model):
     """Recipe Object"""
@@ -12,14 +16,98 @@ class Recipe(models.Model):
         on_delete=models.CASCADE
         )
     title = models.CharField(max_length=255)
-    slug = models.SlugField(max_length=255)
+    # Generated from the title on insert (see recipe.slugs) and kept
+    # when the title changes, so links to a recipe stay valid.
+    slug = models.SlugField(max_length=255, blank=True, db_index=False)
     description = models.TextField(blank=True)
     times_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=6, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Weighted tsvector of title (A) and description (B), maintained by
+    # the recipe_search_vector_update trigger (see migration 0004).
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __str__(self) -> str:
         return self.title
 
+    def save(self, *args, **kwargs):
+        """Save the recipe, giving a new one a unique slug if it has none"""
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        def insert():
+            self.slug = ''
+            slugs.assign_slugs([self])
+            super(Recipe, self).save(*args, **kwargs)
+
+        slugs.retry_on_conflict(insert)
+
     class Meta:
         ordering = ['title']
+        indexes = [
+            # Per-user list, newest first (the API default ordering).
+            models.Index(
+                fields=['user', '-id'],
+                name='recipe_user_id_desc_idx',
+            ),
+            # Per-user list by title: the cursor seeks on (title, id)
+            # in either direction. Also the admin filtered by user.
+            models.Index(
+                fields=['user', 'title', 'id'],
+                name='recipe_user_title_id_idx',
+            ),
+            # Full-text search within one user's recipes (btree_gin).
+            GinIndex(
+                fields=['user', 'search_vector'],
+                name='recipe_user_search_idx',
+            ),
+            # Admin changelist: Meta.ordering plus the admin's -pk.
+            models.Index(
+                fields=['title', '-id'],
+                name='recipe_title_id_desc_idx',
+            ),
+        ]
+        constraints = [
+            # Lookup by slug. The pattern opclass also serves the
+            # `slug LIKE 'base-%'` probes of the collision check.
+            models.UniqueConstraint(
+                fields=['user', 'slug'],
+                name=slugs.CONSTRAINT,
+                opclasses=['int8_ops', 'varchar_pattern_ops'],
+            ),
+        ]
+
+
+class RecipeStats(models.Model):
+    """Running totals of a user's recipes (see recipe.stats)"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recipe_stats',
+    )
+    recipe_count = models.IntegerField(default=0)
+    price_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0,
+    )
+    price_min = models.DecimalField(max_digits=6, decimal_places=2, null=True)
+    price_max = models.DecimalField(max_digits=6, decimal_places=2, null=True)
+    # Cook-time histogram, one column per bucket of recipe.stats.BUCKETS.
+    minutes_under_15 = models.IntegerField(default=0)
+    minutes_15_to_30 = models.IntegerField(default=0)
+    minutes_30_to_60 = models.IntegerField(default=0)
+    minutes_60_to_120 = models.IntegerField(default=0)
+    minutes_120_and_over = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'recipe stats'
+
+    def __str__(self) -> str:
+        return f'Recipe stats of {self.user_id}'
+
+    @property
+    def price_average(self):
+        if not self.recipe_count:
+            return None
+        return self.price_total / self.recipe_count
@@ -0,0 +1,146 @@
+"""
+Pagination for the recipe APIs
+"""
+import json
+
+from django.conf import settings
+from django.db.models import BooleanField, F, Func, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+from .filters import RecipeSearchFilter
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination for recipes.
+
+    Pages are addressed by an opaque cursor that encodes the position of
+    the last row seen, so every page is a ``WHERE ... < position LIMIT n``
+    query instead of an ``OFFSET`` that gets slower the deeper you go.
+    The ordering itself comes from the view's ``OrderingFilter``, except
+    that search results default to best match first.
+
+    DRF's cursor keeps only the first ordering column and steps over
+    rows sharing its value with an offset, which degrades to OFFSET
+    scans on repeated titles. Here ``id`` is appended as a tiebreaker in
+    the direction of the first column, the position holds every ordering
+    column, and pages seek with a row comparison, ``(title, id) > (%s,
+    %s)``, that the (user, title, id) index serves.
+    """
+    page_size = getattr(settings, 'RECIPE_PAGE_SIZE', 25)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'RECIPE_MAX_PAGE_SIZE', 100)
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        if (RecipeSearchFilter.get_search_terms(request)
+                and 'ordering' not in request.query_params):
+            ordering = ('-rank', '-id')
+        else:
+            ordering = super().get_ordering(request, queryset, view)
+        return self.unique_ordering(ordering)
+
+    @staticmethod
+    def unique_ordering(ordering):
+        """Return `ordering` up to `id`, every column in one direction.
+
+        A row comparison needs a single direction; `id` is unique, so
+        columns after it never matter.
+        """
+        prefix = '-' if ordering[0].startswith('-') else ''
+        columns = []
+        for name in ordering:
+            columns.append(prefix + name.lstrip('-'))
+            if name.lstrip('-') == 'id':
+                break
+        else:
+            columns.append(prefix + 'id')
+        return tuple(columns)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """CursorPagination.paginate_queryset, seeking on every column"""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self.seek(current_position, reverse))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering,
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def seek(self, position, reverse):
+        """Return the filter for rows past `position`.
+
+        ``ROW(columns) > ROW(values)``, or ``<`` for a descending
+        ordering, swapped again when paging backwards.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        descending = self.ordering[0].startswith('-')
+        operator = '<' if reverse != descending else '>'
+        columns = [F(name.lstrip('-')) for name in self.ordering]
+        return Func(
+            Func(*columns, function='ROW'),
+            Func(*(Value(value) for value in values), function='ROW'),
+            template='%(expressions)s',
+            arg_joiner=f' {operator} ',
+            output_field=BooleanField(),
+        )
+
+    def _get_position_from_instance(self, instance, ordering):
+        names = [name.lstrip('-') for name in ordering]
+        if isinstance(instance, dict):
+            values = [instance[name] for name in names]
+        else:
+            values = [getattr(instance, name) for name in names]
+        return json.dumps(values)
@@ -1,14 +1,66 @@
 """
 Serializer for recipe APIs
 """
+import functools
 
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
-from .models import Recipe
+from core.timing import TimedSerializerMixin
 
+from . import slugs, stats
+from .models import Recipe, RecipeStats
 
-class RecipeSerializer(serializers.ModelSerializer):
-    """Serializer for recipe"""
+
+class RecipeListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """Create and update many recipes with one query each"""
+
+    def create(self, validated_data):
+        """Insert every recipe with a single bulk INSERT.
+
+        The slugs of the whole batch are picked with one query first.
+        """
+        model = self.child.Meta.model
+
+        def insert():
+            recipes = [model(**attrs) for attrs in validated_data]
+            slugs.assign_slugs(recipes)
+            return model.objects.bulk_create(recipes)
+
+        return slugs.retry_on_conflict(insert)
+
+    def update(self, instance, validated_data):
+        """Apply each item to the recipe at the same index.
+
+        `instance` is a list of recipes lined up with the submitted data.
+        bulk_update() skips auto_now, so updated_at is set explicitly.
+        """
+        model = self.child.Meta.model
+        now = timezone.now()
+        fields = {'updated_at'}
+        for recipe, attrs in zip(instance, validated_data):
+            for attr, value in attrs.items():
+                setattr(recipe, attr, value)
+            recipe.updated_at = now
+            fields.update(attrs)
+        model.objects.bulk_update(instance, sorted(fields))
+        return instance
+
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for recipe
+
+    Pass `fields` to emit only a subset of the declared fields.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
     class Meta:
         model = Recipe
@@ -20,7 +72,8 @@ class RecipeSerializer(serializers.ModelSerializer):
             'price',
             'link',
             ]
-        read_only_fields = ['id']
+        read_only_fields = ['id', 'slug']
+        list_serializer_class = RecipeListSerializer
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -29,3 +82,94 @@ class RecipeDetailSerializer(RecipeSerializer):
 
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ['description']
+
+
+class RecipeStatsSerializer(serializers.ModelSerializer):
+    """Serializer for a user's recipe statistics"""
+    price_average = serializers.DecimalField(
+        max_digits=14, decimal_places=2, read_only=True,
+    )
+    cook_time_histogram = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RecipeStats
+        fields = [
+            'recipe_count',
+            'price_total',
+            'price_average',
+            'price_min',
+            'price_max',
+            'cook_time_histogram',
+        ]
+        read_only_fields = fields
+
+    def get_cook_time_histogram(self, instance):
+        """Return the recipes per cook-time bucket, in minutes"""
+        return [
+            {
+                'min_minutes': low,
+                'max_minutes': high,
+                'count': getattr(instance, column),
+            }
+            for column, low, high in stats.BUCKETS
+        ]
+
+
+def _is_passthrough(field, model):
+    """Return True if the database value already is the representation.
+
+    Integers and strings come back from the driver in their final form.
+    Decimals do too when they are not coerced to strings and the column
+    scale matches, since quantizing them again is then a no-op.
+    """
+    if isinstance(field, (serializers.IntegerField, serializers.CharField)):
+        return True
+    if isinstance(field, serializers.DecimalField):
+        model_field = model._meta.get_field(field.source)
+        return (
+            not getattr(
+                field,
+                'coerce_to_string',
+                api_settings.COERCE_DECIMAL_TO_STRING,
+            )
+            and not field.localize
+            and model_field.decimal_places == field.decimal_places
+        )
+    return False
+
+
+@functools.lru_cache(maxsize=128)
+def row_serializer(serializer_class, fields=None):
+    """Compile a row -> dict function for a model serializer.
+
+    Returns `(columns, to_dict)`: pass `columns` to `values_list()` and
+    `to_dict` turns each row into the same dict `serializer_class` would
+    emit for the instance, without building model instances or walking
+    the field machinery per row. Compiled once per field selection; pass
+    `fields` normalized (see RecipeViewSet.get_requested_fields) and the
+    most recent selections stay cached.
+    """
+    serializer = serializer_class(fields=fields)
+    model = serializer.Meta.model
+    columns = []
+    namespace = {}
+    items = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source in ('*', None) or '.' in field.source:
+            raise ImproperlyConfigured(
+                f'{serializer_class.__name__}.{name} does not map to a '
+                f'column and cannot be serialized from rows.'
+            )
+        index = len(columns)
+        columns.append(field.source)
+        value = f'row[{index}]'
+        if not _is_passthrough(field, model):
+            namespace[f'_to_{index}'] = field.to_representation
+            value = f'None if {value} is None else _to_{index}({value})'
+        items.append(f'{name!r}: {value}')
+
+    source = f'def to_dict(row):\n    return {{{", ".join(items)}}}\n'
+    exec(source, namespace)
+    return tuple(columns), namespace['to_dict']
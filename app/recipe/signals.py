@@ -0,0 +1,18 @@
+"""
+Signal handlers for Recipe
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache
+from .models import Recipe
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def invalidate_recipe_responses(sender, instance, **kwargs):
+    """Drop a user's cached responses when one of their recipes changes.
+
+    Covers writes made outside the API views as well: the admin, shell
+    sessions and management commands.
+    """
+    cache.bump_version(instance.user_id)
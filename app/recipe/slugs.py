@@ -0,0 +1,95 @@
+"""
+Server-generated recipe slugs, unique per user
+
+A slug is the slugified title, suffixed with -2, -3, ... when the user
+already has it. The slugs taken for a whole batch of titles are read
+with one query on the (user_id, slug) unique index, rather than one
+exists() per candidate. Two writers can still race for the same slug;
+the loser hits the unique index and `retry_on_conflict` starts over.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+CONSTRAINT = 'recipe_user_slug_uniq'
+FALLBACK = 'recipe'
+MAX_LENGTH = 255
+# Room left for a "-<n>" suffix.
+SUFFIX_LENGTH = 11
+
+
+def base_slug(title):
+    """Return the unsuffixed slug for a title"""
+    slug = slugify(title)[:MAX_LENGTH - SUFFIX_LENGTH].strip('-_')
+    return slug or FALLBACK
+
+
+def taken_slugs(queryset, bases):
+    """Return the slugs in `queryset` that clash with any of `bases`.
+
+    A slug clashes if it is a base or starts with a base and a hyphen;
+    the prefix match is served by the index's pattern opclass.
+    """
+    condition = Q(slug__in=bases)
+    for base in bases:
+        condition |= Q(slug__startswith=f'{base}-')
+    return set(
+        queryset.filter(condition).order_by().values_list('slug', flat=True)
+    )
+
+
+def unique_slugs(queryset, titles):
+    """Return a slug for each title, unique within `queryset` and the batch.
+
+    `queryset` holds the recipes the slugs must not clash with, i.e. the
+    user's. Costs one query however many titles are given.
+    """
+    bases = [base_slug(title) for title in titles]
+    if not bases:
+        return []
+    taken = taken_slugs(queryset, sorted(set(bases)))
+    suffixes = {}
+    slugs = []
+    for base in bases:
+        slug = base
+        number = suffixes.get(base, 1)
+        while slug in taken:
+            number += 1
+            slug = f'{base}-{number}'
+        suffixes[base] = number
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def assign_slugs(recipes):
+    """Give each recipe without a slug a unique one; a query per user"""
+    pending = {}
+    for recipe in recipes:
+        if not recipe.slug:
+            pending.setdefault(recipe.user_id, []).append(recipe)
+    for user_id, batch in pending.items():
+        queryset = type(batch[0])._default_manager.filter(user_id=user_id)
+        titles = [recipe.title for recipe in batch]
+        for recipe, slug in zip(batch, unique_slugs(queryset, titles)):
+            recipe.slug = slug
+
+
+def is_conflict(exc):
+    """Return True if an IntegrityError comes from the slug index"""
+    diag = getattr(exc.__cause__, 'diag', None)
+    return getattr(diag, 'constraint_name', None) == CONSTRAINT
+
+
+def retry_on_conflict(func, attempts=3):
+    """Call `func` in a transaction, again if it loses a slug race.
+
+    `func` must pick its slugs afresh on every call.
+    """
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                return func()
+        except IntegrityError as exc:
+            if attempt == attempts - 1 or not is_conflict(exc):
+                raise
@@ -0,0 +1,188 @@
+"""
+Per-user recipe statistics, maintained incrementally
+
+Each user's RecipeStats row holds the recipe count, the price total,
+minimum and maximum, and a cook-time histogram. Every write path hands
+the (price, times_minutes) of the recipes it added and removed to
+`apply`, which folds them in with one UPDATE of F() expressions. Reading
+the stats is then a primary key lookup however many recipes a user has.
+
+The minimum and maximum cannot be adjusted by a delta. When a removed
+price was the current extreme, it is recomputed from the user's
+recipes, inside the same UPDATE. A user's first write aggregates their
+row instead. `rebuild` recomputes rows from scratch; run it after writes
+that bypass both the API and the admin (see recipe.admin), e.g. raw SQL
+or COPY loads.
+"""
+from collections import Counter
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Case, F, Max, Min, Subquery, Value, When
+from django.db.models.functions import Greatest, Least
+
+from .models import Recipe, RecipeStats
+
+# (column, low, high) cook-time buckets in minutes; high is exclusive.
+BUCKETS = [
+    ('minutes_under_15', None, 15),
+    ('minutes_15_to_30', 15, 30),
+    ('minutes_30_to_60', 30, 60),
+    ('minutes_60_to_120', 60, 120),
+    ('minutes_120_and_over', 120, None),
+]
+# The aggregated columns of a RecipeStats row.
+COLUMNS = [
+    'recipe_count', 'price_total', 'price_min', 'price_max',
+] + [column for column, _, _ in BUCKETS]
+
+
+def bucket(minutes):
+    """Return the histogram column counting a cook time"""
+    for column, _, high in BUCKETS:
+        if high is None or minutes < high:
+            return column
+
+
+def recipe_values(recipes):
+    """Return the (price, times_minutes) of recipe instances"""
+    return [(recipe.price, recipe.times_minutes) for recipe in recipes]
+
+
+def _extreme(user_id, field, aggregate, combine, added, removed):
+    """Return the expression for a new price_min or price_max.
+
+    The lowest or highest added price is combined with the current
+    value (LEAST/GREATEST skip NULLs). If a removed price was the
+    extreme, the value is recomputed from the user's recipes instead;
+    the subquery only runs for that branch of the CASE.
+    """
+    current = F(field)
+    if added is not None:
+        current = combine(current, Value(added))
+    if not removed:
+        return current
+    recomputed = Subquery(
+        Recipe.objects.filter(user_id=user_id)
+        .order_by()
+        .values('user')
+        .annotate(value=aggregate('price'))
+        .values('value')
+    )
+    return Case(
+        When(**{f'{field}__in': removed}, then=recomputed),
+        default=current,
+    )
+
+
+def apply(user_id, added=(), removed=()):
+    """Fold recipes added and removed into a user's stats.
+
+    `added` and `removed` are (price, times_minutes) pairs; an update is
+    its old values removed and its new ones added. Call it after the
+    recipes were written, in the same transaction. Costs one UPDATE, or
+    for a user without a row an INSERT ... ON CONFLICT DO NOTHING that
+    aggregates it, so concurrent first writes neither lose nor repeat a
+    delta.
+    """
+    added, removed = list(added), list(removed)
+    if not added and not removed:
+        return
+    added_prices = [price for price, _ in added]
+    removed_prices = [price for price, _ in removed]
+
+    changes = {
+        'recipe_count': F('recipe_count') + (len(added) - len(removed)),
+        'price_total': F('price_total') + (
+            sum(added_prices, Decimal(0)) - sum(removed_prices, Decimal(0))
+        ),
+        'price_min': _extreme(
+            user_id, 'price_min', Min, Least,
+            min(added_prices, default=None), removed_prices,
+        ),
+        'price_max': _extreme(
+            user_id, 'price_max', Max, Greatest,
+            max(added_prices, default=None), removed_prices,
+        ),
+    }
+    buckets = Counter(bucket(minutes) for _, minutes in added)
+    buckets.subtract(bucket(minutes) for _, minutes in removed)
+    for column, delta in buckets.items():
+        if delta:
+            changes[column] = F(column) + delta
+
+    rows = RecipeStats.objects.filter(user_id=user_id)
+    if rows.update(**changes):
+        return
+    # No row yet: aggregate one from the recipes, this transaction's
+    # writes included. If a concurrent writer inserts it first, its
+    # aggregate could not see our uncommitted rows; add our delta to it.
+    if not _insert([user_id], conflict='DO NOTHING'):
+        rows.update(**changes)
+
+
+def get(user):
+    """Return the user's stats, zeroed if they have none"""
+    try:
+        return RecipeStats.objects.get(user=user)
+    except RecipeStats.DoesNotExist:
+        return RecipeStats(user=user)
+
+
+def _insert(user_ids, conflict):
+    """Aggregate stats rows from the recipe table; return rows written.
+
+    `conflict` is the ON CONFLICT (user_id) action for existing rows.
+    """
+    histogram = []
+    for _, low, high in BUCKETS:
+        bounds = []
+        if low is not None:
+            bounds.append(f'times_minutes >= {low}')
+        if high is not None:
+            bounds.append(f'times_minutes < {high}')
+        histogram.append(
+            f'COUNT(*) FILTER (WHERE {" AND ".join(bounds)})'
+        )
+    recipes, params = '', []
+    if user_ids is not None:
+        recipes = 'WHERE user_id = ANY(%s)'
+        params = [list(user_ids)]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {RecipeStats._meta.db_table} '
+            f'(user_id, {", ".join(COLUMNS)}) '
+            f'SELECT user_id, COUNT(*), SUM(price), MIN(price), MAX(price), '
+            f'{", ".join(histogram)} '
+            f'FROM {Recipe._meta.db_table} {recipes} GROUP BY user_id '
+            f'ON CONFLICT (user_id) {conflict}',
+            params,
+        )
+        return cursor.rowcount
+
+
+def rebuild(user_ids=None):
+    """Recompute the stats of the given users, or of everyone.
+
+    One INSERT ... ON CONFLICT aggregates the recipe table; rows of
+    users left without recipes are deleted. Returns the rows written.
+    """
+    if user_ids is not None and not user_ids:
+        return 0
+    written = _insert(user_ids, 'DO UPDATE SET ' + ', '.join(
+        f'{column} = EXCLUDED.{column}' for column in COLUMNS
+    ))
+
+    stale, params = '', []
+    if user_ids is not None:
+        stale = 'AND stats.user_id = ANY(%s)'
+        params = [list(user_ids)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {RecipeStats._meta.db_table} AS stats '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {Recipe._meta.db_table} '
+            f'AS recipe WHERE recipe.user_id = stats.user_id) {stale}',
+            params,
+        )
+    return written
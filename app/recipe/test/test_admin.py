@@ -0,0 +1,227 @@
+"""
+Test for the Recipe admin
+"""
+
+from decimal import Decimal
+
+from django.contrib import admin
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from recipe import stats
+from recipe.models import Recipe
+from recipe.serializers import RecipeStatsSerializer
+from recipe.test.test_query_plans import explain
+from recipe.test.test_recipe_api import create_recipe, create_user
+
+CHANGELIST_URL = reverse('admin:recipe_recipe_changelist')
+ADD_URL = reverse('admin:recipe_recipe_add')
+
+
+def change_url(recipe_id):
+    return reverse('admin:recipe_recipe_change', args=[recipe_id])
+
+
+def delete_url(recipe_id):
+    return reverse('admin:recipe_recipe_delete', args=[recipe_id])
+
+
+class RecipeAdminSearchTest(TestCase):
+    """Test the recipe admin search"""
+
+    def setUp(self):
+        self.admin_user = create_user(email='admin@domain.com', password='pw')
+        self.admin_user.is_staff = True
+        self.admin_user.is_superuser = True
+        self.admin_user.save()
+        self.client = Client()
+        self.client.force_login(self.admin_user)
+
+        self.cook = create_user(email='cook@kitchen.com', password='pw')
+        self.baker = create_user(email='baker@bakery.com', password='pw')
+        create_recipe(user=self.cook, title='Roast chicken')
+        create_recipe(user=self.baker, title='Sourdough loaf')
+
+    def test_search_by_title(self):
+        """Test searching recipes by part of the title"""
+        res = self.client.get(CHANGELIST_URL, {'q': 'chick'})
+
+        self.assertContains(res, 'Roast chicken')
+        self.assertNotContains(res, 'Sourdough loaf')
+
+    def test_search_by_owner_email(self):
+        """Test searching recipes by part of the owner's email"""
+        res = self.client.get(CHANGELIST_URL, {'q': 'bakery'})
+
+        self.assertContains(res, 'Sourdough loaf')
+        self.assertNotContains(res, 'Roast chicken')
+
+    def test_search_uses_indexes(self):
+        """Test the search filter is served by indexes on both tables"""
+        model_admin = admin.site._registry[Recipe]
+        queryset, _ = model_admin.get_search_results(
+            None, Recipe.objects.order_by(), 'bakery',
+        )
+        sql, params = queryset.query.sql_with_params()
+
+        plan = explain(sql, params, disable=['seqscan'])
+
+        self.assertIn('recipe_title_trgm_idx', plan, msg=plan)
+        self.assertIn('BitmapOr', plan, msg=plan)
+        self.assertNotIn('Seq Scan', plan, msg=plan)
+
+
+class RecipeAdminFilterTest(TestCase):
+    """Test the recipe admin changelist filters"""
+
+    def setUp(self):
+        self.admin_user = create_user(email='admin@domain.com', password='pw')
+        self.admin_user.is_staff = True
+        self.admin_user.is_superuser = True
+        self.admin_user.save()
+        self.client = Client()
+        self.client.force_login(self.admin_user)
+
+        self.cook = create_user(email='cook@kitchen.com', password='pw')
+        self.quick = create_recipe(
+            user=self.cook, title='Quick snack', times_minutes=5,
+            price=Decimal('2.00'),
+        )
+        self.slow = create_recipe(
+            user=self.admin_user, title='Slow roast', times_minutes=180,
+            price=Decimal('25.00'),
+        )
+
+    def results(self, **params):
+        res = self.client.get(CHANGELIST_URL, params)
+        self.assertEqual(res.status_code, 200)
+        return list(res.context['cl'].result_list)
+
+    def test_changelist_does_not_list_distinct_values(self):
+        """Test rendering filters runs no DISTINCT scans"""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(CHANGELIST_URL)
+
+        self.assertContains(res, 'name="user_email"')
+        self.assertFalse(
+            [q for q in ctx.captured_queries if 'DISTINCT' in q['sql']]
+        )
+
+    def test_filter_by_cook_time_bucket(self):
+        """Test filtering by a cook time bucket"""
+        self.assertEqual(self.results(times_minutes_range='0'), [self.quick])
+        self.assertEqual(self.results(times_minutes_range='4'), [self.slow])
+        self.assertEqual(self.results(times_minutes_range='2'), [])
+
+    def test_filter_by_price_bucket(self):
+        """Test filtering by a price bucket"""
+        self.assertEqual(self.results(price_range='0'), [self.quick])
+        self.assertEqual(self.results(price_range='3'), [self.slow])
+
+    def test_filter_by_user_email(self):
+        """Test filtering by the owner's email"""
+        self.assertEqual(
+            self.results(user_email='cook@kitchen.com'), [self.quick]
+        )
+        self.assertEqual(self.results(user_email='nobody@domain.com'), [])
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=2)
+    def test_filtered_count_capped(self):
+        """Test a filtered changelist past the threshold shows N+"""
+        for title in ('Tea', 'Toast'):
+            create_recipe(user=self.cook, title=title)
+
+        res = self.client.get(CHANGELIST_URL, {'user_email': 'cook@'})
+        self.assertContains(res, '2+ recipes')
+
+        res = self.client.get(CHANGELIST_URL, {'q': 'Toast'})
+        self.assertContains(res, '1 recipe')
+        self.assertNotContains(res, '+ recipes')
+
+    def test_filter_by_user_email_prefix(self):
+        """Test the email filter matches a prefix in any case"""
+        self.assertEqual(self.results(user_email=' COOK@'), [self.quick])
+        self.assertEqual(self.results(user_email='kitchen'), [])
+
+
+class RecipeAdminStatsTest(TestCase):
+    """Test admin writes keep the recipe stats current"""
+
+    def setUp(self):
+        self.admin_user = create_user(email='admin@domain.com', password='pw')
+        self.admin_user.is_staff = True
+        self.admin_user.is_superuser = True
+        self.admin_user.save()
+        self.client = Client()
+        self.client.force_login(self.admin_user)
+
+        self.cook = create_user(email='cook@kitchen.com', password='pw')
+        self.baker = create_user(email='baker@bakery.com', password='pw')
+        stats.rebuild()
+
+    def submit(self, url, user, **params):
+        payload = {
+            'user': user.pk, 'title': 'Stew', 'times_minutes': 30,
+            'price': '5.00', 'description': '', 'link': '',
+        }
+        payload.update(params)
+        res = self.client.post(url, payload)
+        self.assertEqual(res.status_code, 302)
+
+    def maintained(self):
+        return [
+            RecipeStatsSerializer(stats.get(user)).data
+            for user in (self.cook, self.baker)
+        ]
+
+    def assertStatsRebuilt(self):
+        """Assert the maintained stats match a rebuild from scratch"""
+        maintained = self.maintained()
+        stats.rebuild()
+        self.assertEqual(maintained, self.maintained())
+
+    def test_add_and_change(self):
+        """Test adding, editing and reassigning a recipe"""
+        self.submit(ADD_URL, self.cook, price='4.00')
+        self.submit(ADD_URL, self.cook, price='8.00')
+        recipe = Recipe.objects.get(price=Decimal('8.00'))
+        self.assertEqual(stats.get(self.cook).recipe_count, 2)
+        self.assertStatsRebuilt()
+
+        self.submit(change_url(recipe.pk), self.cook, price='2.00')
+        self.assertEqual(stats.get(self.cook).price_min, Decimal('2.00'))
+        self.assertStatsRebuilt()
+
+        self.submit(change_url(recipe.pk), self.baker, times_minutes=200)
+        self.assertEqual(stats.get(self.cook).recipe_count, 1)
+        self.assertEqual(stats.get(self.cook).price_max, Decimal('4.00'))
+        self.assertEqual(stats.get(self.baker).recipe_count, 1)
+        self.assertStatsRebuilt()
+
+    def test_delete(self):
+        """Test deleting one recipe and a selection of recipes"""
+        recipes = [
+            create_recipe(user=user, price=Decimal(price))
+            for user, price in [
+                (self.cook, '1.00'), (self.cook, '3.00'),
+                (self.baker, '6.00'), (self.baker, '9.00'),
+            ]
+        ]
+        stats.rebuild()
+
+        res = self.client.post(delete_url(recipes[0].pk), {'post': 'yes'})
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(stats.get(self.cook).price_min, Decimal('3.00'))
+        self.assertStatsRebuilt()
+
+        res = self.client.post(CHANGELIST_URL, {
+            'action': 'delete_selected',
+            '_selected_action': [recipe.pk for recipe in recipes[1:3]],
+            'post': 'yes',
+        })
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(stats.get(self.cook).recipe_count, 0)
+        self.assertEqual(stats.get(self.baker).price_min, Decimal('9.00'))
+        self.assertStatsRebuilt()
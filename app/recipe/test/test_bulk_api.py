@@ -0,0 +1,171 @@
+"""
+Test for the recipe bulk API
+"""
+
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.models import Recipe
+from recipe.test.test_recipe_api import create_recipe, create_user
+
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def recipe_payload(**params):
+    """Return a valid recipe payload"""
+    payload = {
+        'title': 'Sample title',
+        'times_minutes': 30,
+        'price': '30.00',
+    }
+    payload.update(params)
+    return payload
+
+
+class BulkRecipeApiTest(TestCase):
+    """Test bulk create, update and delete of recipes"""
+
+    def setUp(self):
+        self.user = create_user(email='test@domain.com', password='goodPass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create(self):
+        """Test creating many recipes with one INSERT"""
+        payload = [recipe_payload(title=f'Recipe {i}') for i in range(10)]
+
+        # Savepoints around the view and the insert, slugs, INSERT, and
+        # the stats, which a user's first write builds from the table.
+        with self.assertNumQueries(8):
+            res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 10)  # type: ignore
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 10)
+        self.assertTrue(all(r['id'] for r in res.data))  # type: ignore
+
+    def test_bulk_create_slugs(self):
+        """Test a batch gets slugs unique within it and among the user's"""
+        create_recipe(user=self.user, title='Soup')
+        payload = [recipe_payload(title='Soup') for _ in range(2)]
+        payload.append(recipe_payload(title='Bread', slug='mine'))
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [item['slug'] for item in res.data],  # type: ignore
+            ['soup-2', 'soup-3', 'bread'],
+        )
+
+    def test_bulk_create_reports_errors_by_index(self):
+        """Test invalid items are reported at their index, nothing saved"""
+        payload = [
+            recipe_payload(),
+            recipe_payload(price='100000.00'),
+            recipe_payload(),
+            recipe_payload(times_minutes='x'),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'1', '3'})  # type: ignore
+        self.assertIn('price', res.data['1'])  # type: ignore
+        self.assertFalse(Recipe.objects.exists())
+
+    @override_settings(RECIPE_BULK_MAX_ITEMS=2)
+    def test_bulk_create_too_many_items(self):
+        """Test batches over the limit are rejected"""
+        payload = [recipe_payload() for _ in range(3)]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_requires_list(self):
+        """Test a non-list body is rejected"""
+        res = self.client.post(BULK_URL, recipe_payload(), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update(self):
+        """Test partially updating many recipes"""
+        first = create_recipe(user=self.user, title='First')
+        second = create_recipe(user=self.user, title='Second')
+        updated_at = second.updated_at
+        payload = [
+            {'id': first.id, 'title': 'First updated'},
+            {'id': second.id, 'price': '1.50'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.title, 'First updated')
+        self.assertEqual(second.title, 'Second')
+        self.assertEqual(second.price, Decimal('1.50'))
+        self.assertGreater(second.updated_at, updated_at)
+
+    def test_bulk_update_other_users_recipe_not_found(self):
+        """Test bulk update cannot touch other users' recipes"""
+        other = create_user(email='other@domain.com', password='goodPass')
+        mine = create_recipe(user=self.user)
+        theirs = create_recipe(user=other, title='Theirs')
+        payload = [
+            {'id': mine.id, 'title': 'Changed'},
+            {'id': theirs.id, 'title': 'Changed'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(res.data), ['1'])  # type: ignore
+        mine.refresh_from_db()
+        theirs.refresh_from_db()
+        self.assertNotEqual(mine.title, 'Changed')
+        self.assertEqual(theirs.title, 'Theirs')
+
+    def test_bulk_update_duplicate_and_missing_ids(self):
+        """Test items without an id or with a repeated id are rejected"""
+        recipe = create_recipe(user=self.user)
+        payload = [{'id': recipe.id}, {'id': recipe.id}, {'title': 'x'}]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'1', '2'})  # type: ignore
+
+    def test_bulk_delete(self):
+        """Test deleting many recipes limited to the user"""
+        other = create_user(email='other@domain.com', password='goodPass')
+        mine = [create_recipe(user=self.user) for _ in range(3)]
+        theirs = create_recipe(user=other)
+        ids = [r.id for r in mine[:2]] + [theirs.id]
+
+        res = self.client.delete(BULK_URL, ids, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'deleted': 2})  # type: ignore
+        self.assertEqual(
+            list(Recipe.objects.values_list('id', flat=True).order_by('id')),
+            sorted([mine[2].id, theirs.id]),
+        )
+
+    def test_bulk_write_invalidates_list(self):
+        """Test the cached list reflects bulk writes"""
+        list_url = reverse('recipe:recipe-list')
+        self.client.get(list_url)
+
+        self.client.post(BULK_URL, [recipe_payload()], format='json')
+        res = self.client.get(list_url)
+
+        self.assertEqual(len(res.data['results']), 1)  # type: ignore
@@ -0,0 +1,172 @@
+"""
+Test for the recipe response cache
+"""
+
+import threading
+import time
+
+from django.core.cache import cache as default_cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe import cache
+from recipe.test.test_recipe_api import (
+    RECIPE_URL,
+    create_recipe,
+    create_user,
+    detail_url,
+)
+
+
+class GetOrComputeTest(SimpleTestCase):
+    """Test the read-through cache helper"""
+
+    def setUp(self):
+        default_cache.clear()
+
+    def test_value_is_computed_once(self):
+        """Test a cached value is not recomputed"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'value'
+
+        self.assertEqual(cache.get_or_compute('k', compute), 'value')
+        self.assertEqual(cache.get_or_compute('k', compute), 'value')
+        self.assertEqual(len(calls), 1)
+
+    def test_concurrent_misses_compute_once(self):
+        """Test concurrent misses on one key share a single computation"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    cache.get_or_compute('stampede', compute)
+                )
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_bump_version_changes_key(self):
+        """Test bumping a user's version changes their response keys"""
+        before = cache.response_key(1, '/url/')
+        cache.bump_version(1)
+
+        self.assertNotEqual(cache.response_key(1, '/url/'), before)
+        self.assertNotEqual(cache.response_key(2, '/url/'), before)
+
+
+class BumpVersionOnCommitTest(TestCase):
+    """Test bumps made inside a transaction"""
+
+    def test_bumped_again_on_commit(self):
+        """Test the version moves again when the transaction commits"""
+        default_cache.clear()
+        before = cache.get_version(1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cache.bump_version(1)
+            bumped = cache.get_version(1)
+
+        self.assertNotEqual(bumped, before)
+        self.assertNotEqual(cache.get_version(1), bumped)
+
+
+class RecipeResponseCacheTest(TestCase):
+    """Test the recipe endpoints use the response cache"""
+
+    def setUp(self):
+        default_cache.clear()
+        self.user = create_user(email='test@domain.com', password='goodPass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request runs no queries"""
+        create_recipe(user=self.user)
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, second.data)  # type: ignore
+
+    def test_query_params_are_cached_separately(self):
+        """Test different query parameters get different responses"""
+        create_recipe(user=self.user, title='A')
+        create_recipe(user=self.user, title='B')
+
+        by_id = self.client.get(RECIPE_URL)
+        by_title = self.client.get(RECIPE_URL, {'ordering': 'title'})
+
+        self.assertNotEqual(by_id.data, by_title.data)  # type: ignore
+
+    def test_create_invalidates_list(self):
+        """Test creating a recipe through the API refreshes the list"""
+        self.client.get(RECIPE_URL)
+        payload = {
+            'title': 'New', 'slug': 'new', 'times_minutes': 5, 'price': '1.00'
+        }
+        self.client.post(RECIPE_URL, payload)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)  # type: ignore
+
+    def test_update_and_delete_invalidate_detail(self):
+        """Test updating and deleting a recipe refreshes its detail"""
+        recipe = create_recipe(user=self.user)
+        url = detail_url(recipe.id)  # type: ignore
+        self.client.get(url)
+
+        self.client.patch(url, {'title': 'Changed'})
+        res = self.client.get(url)
+        self.assertEqual(res.data['title'], 'Changed')  # type: ignore
+
+        self.client.delete(url)
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cache_is_per_user(self):
+        """Test one user never sees another user's cached list"""
+        create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+
+        other = create_user(email='other@domain.com', password='goodPass')
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])  # type: ignore
+
+    def test_model_writes_invalidate(self):
+        """Test saves and deletes outside the API refresh the cache"""
+        recipe = create_recipe(user=self.user, title='Before')
+        self.client.get(RECIPE_URL)
+
+        recipe.title = 'After'
+        recipe.save()
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(
+            res.data['results'][0]['title'], 'After',  # type: ignore
+        )
+
+        recipe.delete()
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'], [])  # type: ignore
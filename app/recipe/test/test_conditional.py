@@ -0,0 +1,136 @@
+"""
+Test conditional GETs on the recipe APIs
+"""
+
+import time
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.test.test_recipe_api import (
+    RECIPE_URL,
+    create_recipe,
+    create_user,
+    detail_url,
+)
+
+
+@override_settings(RECIPE_CACHE_SHARED=True)
+class RecipeConditionalGetTest(TestCase):
+    """Test ETag and Last-Modified handling for recipes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(email='test@domain.com', password='goodPass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def test_list_returns_etag(self):
+        """Test the list carries an ETag but no Last-Modified"""
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertNotIn('Last-Modified', res)
+
+    def test_list_not_modified(self):
+        """Test a matching If-None-Match gets a 304 without queries"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_list_etag_changes_on_write(self):
+        """Test creating, updating or deleting a recipe changes the ETag"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+        other = create_recipe(user=self.user, title='Other')
+
+        writes = [
+            lambda: self.client.patch(detail_url(self.recipe.id), {
+                'title': 'Changed',
+            }),
+            lambda: self.client.delete(detail_url(other.id)),
+        ]
+        for write in [lambda: None] + writes:
+            write()
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(res['ETag'], etag)
+            etag = res['ETag']
+
+    def test_list_etag_changes_on_model_save(self):
+        """Test a save outside the API never gets a 304 with the old body"""
+        first = self.client.get(RECIPE_URL)
+
+        self.recipe.title = 'Changed'
+        self.recipe.save()
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'][0]['title'], 'Changed',  # type: ignore
+        )
+        again = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_modified_after_delete(self):
+        """Test If-Modified-Since does not hide a deleted recipe"""
+        other = create_recipe(user=self.user, title='Other')
+        self.client.get(RECIPE_URL)
+        since = http_date(time.time() + 60)
+
+        self.client.delete(detail_url(other.id))
+        res = self.client.get(RECIPE_URL, HTTP_IF_MODIFIED_SINCE=since)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)  # type: ignore
+
+    def test_list_etag_differs_per_query(self):
+        """Test different pages of the list have different ETags"""
+        by_id = self.client.get(RECIPE_URL)['ETag']
+        by_title = self.client.get(RECIPE_URL, {'ordering': 'title'})['ETag']
+
+        self.assertNotEqual(by_id, by_title)
+
+    def test_detail_not_modified(self):
+        """Test conditional GET of a recipe detail"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(url, {'title': 'Changed'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_of_other_users_recipe_not_found(self):
+        """Test conditional GET does not leak other users' recipes"""
+        other = create_user(email='other@domain.com', password='goodPass')
+        recipe = create_recipe(user=other)
+
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(RECIPE_CACHE_SHARED=False)
+    def test_no_etag_with_process_local_cache(self):
+        """Test per-process cache versions do not back ETags"""
+        url = detail_url(self.recipe.id)
+
+        self.assertNotIn('ETag', self.client.get(RECIPE_URL))
+        res = self.client.get(url)
+        self.assertNotIn('ETag', res)
+
+        res = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=res['Last-Modified'],
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
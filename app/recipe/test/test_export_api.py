@@ -0,0 +1,74 @@
+"""
+Test for the recipe export API
+"""
+
+import csv
+import io
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.test.test_recipe_api import create_recipe, create_user
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportApiTest(TestCase):
+    """Test streaming exports of a user's recipes"""
+
+    def setUp(self):
+        self.user = create_user(email='test@domain.com', password='goodPass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(3)
+        ]
+        other = create_user(email='other@domain.com', password='goodPass')
+        create_recipe(user=other, title='Not mine')
+
+    def get_content(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res, b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as NDJSON"""
+        res, content = self.get_content()
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [row['title'] for row in rows],
+            ['Recipe 0', 'Recipe 1', 'Recipe 2'],
+        )
+        self.assertEqual(rows[0]['id'], self.recipes[0].id)
+        self.assertEqual(rows[0]['price'], 20.25)
+        self.assertEqual(rows[0]['description'], 'Sample description')
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV"""
+        res, content = self.get_content(type='csv')
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        self.assertIn('recipes.csv', res['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['title'], 'Recipe 0')
+        self.assertEqual(rows[0]['price'], '20.25')
+
+    def test_export_unknown_type(self):
+        """Test an unsupported export type is rejected"""
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_requires_auth(self):
+        """Test exporting requires authentication"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
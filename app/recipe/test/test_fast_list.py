@@ -0,0 +1,142 @@
+"""
+Test the values_list() fast path matches the recipe serializer
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from recipe.models import Recipe
+from recipe.serializers import (
+    RecipeDetailSerializer,
+    RecipeSerializer,
+    row_serializer,
+)
+from recipe.test.test_recipe_api import RECIPE_URL, create_recipe, create_user
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class RowSerializerTest(TestCase):
+    """Test compiled row serializers against the DRF serializers"""
+
+    def setUp(self):
+        self.user = create_user(email='test@domain.com', password='goodPass')
+        create_recipe(user=self.user, price=Decimal('0.00'), link='')
+        create_recipe(
+            user=self.user,
+            title='Crème brûlée "au four" ☃',
+            slug='creme-brulee',
+            times_minutes=0,
+            price=Decimal('9999.99'),
+        )
+        create_recipe(user=self.user, price=Decimal('12.30'))
+
+    def assert_parity(self, serializer_class, fields=None):
+        recipes = Recipe.objects.order_by('id')
+        kwargs = {} if fields is None else {'fields': fields}
+        expected = serializer_class(recipes, many=True, **kwargs).data
+
+        columns, to_dict = row_serializer(
+            serializer_class, None if fields is None else tuple(fields),
+        )
+        actual = [to_dict(row) for row in recipes.values_list(*columns)]
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(render(actual), render(expected))
+
+    def test_list_serializer_parity(self):
+        """Test rows serialize exactly like RecipeSerializer"""
+        self.assert_parity(RecipeSerializer)
+
+    def test_detail_serializer_parity(self):
+        """Test rows serialize exactly like RecipeDetailSerializer"""
+        self.assert_parity(RecipeDetailSerializer)
+
+    def test_field_subset_parity(self):
+        """Test a field selection keeps the serializer's field order"""
+        self.assert_parity(RecipeSerializer, ['price', 'id'])
+
+    def test_price_keeps_decimal(self):
+        """Test price stays a Decimal with the column's two places"""
+        columns, to_dict = row_serializer(RecipeSerializer)
+        row = to_dict(Recipe.objects.values_list(*columns).first())
+
+        self.assertIsInstance(row['price'], Decimal)
+        self.assertEqual(row['price'].as_tuple().exponent, -2)
+
+    def test_converted_fields(self):
+        """Test fields that are not pass-through use to_representation"""
+        class PriceAsString(RecipeSerializer):
+            price = serializers.DecimalField(
+                max_digits=6, decimal_places=1, coerce_to_string=True,
+            )
+
+        self.assert_parity(PriceAsString)
+
+    def test_unmappable_field(self):
+        """Test fields without a column are rejected at compile time"""
+        class WithOwner(RecipeSerializer):
+            owner = serializers.CharField(source='user.email')
+
+            class Meta(RecipeSerializer.Meta):
+                fields = RecipeSerializer.Meta.fields + ['owner']
+
+        with self.assertRaises(ImproperlyConfigured):
+            row_serializer(WithOwner)
+
+
+class FastListApiTest(TestCase):
+    """Test the fast list returns the same responses as the serializer"""
+
+    def setUp(self):
+        self.user = create_user(email='test@domain.com', password='goodPass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for index in range(7):
+            create_recipe(
+                user=self.user,
+                title=f'Recipe {index % 3} pasta',
+                price=Decimal(f'{index}.{index}5'),
+            )
+
+    def get_both(self, url, **params):
+        """Return the fast and the serializer response for the same GET"""
+        responses = []
+        for fast in (True, False):
+            cache.clear()
+            with override_settings(RECIPE_FAST_LIST=fast):
+                res = self.client.get(url, params)
+            self.assertEqual(res.status_code, 200)
+            responses.append(res)
+        return responses
+
+    def assert_same_pages(self, **params):
+        """Walk every page both ways and compare the raw bodies"""
+        url = RECIPE_URL
+        while url:
+            fast, slow = self.get_both(url, **params)
+            self.assertEqual(fast.content, slow.content)
+            url, params = fast.data['next'], {}
+
+    def test_default_ordering(self):
+        """Test paging by -id is identical"""
+        self.assert_same_pages(page_size=3)
+
+    def test_title_ordering(self):
+        """Test paging by a non-unique ordering column is identical"""
+        self.assert_same_pages(page_size=2, ordering='title')
+
+    def test_search_ordering(self):
+        """Test paging search results by rank is identical"""
+        self.assert_same_pages(page_size=2, q='pasta')
+
+    def test_sparse_fields(self):
+        """Test ?fields= responses are identical"""
+        self.assert_same_pages(page_size=4, fields='price,title')
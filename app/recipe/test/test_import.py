@@ -0,0 +1,210 @@
+"""
+Test for the recipe bulk import
+"""
+
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe import cache, importer
+from recipe.models import Recipe
+from recipe.test.test_recipe_api import create_user
+
+IMPORT_URL = reverse('recipe:recipe-import')
+
+NDJSON = '\n'.join([
+    json.dumps({
+        'title': 'Pancakes', 'times_minutes': 20,
+        'price': '4.50', 'description': 'Fluffy',
+    }),
+    json.dumps({
+        'title': 'Bad price', 'times_minutes': 5,
+        'price': '10000.00',
+    }),
+    'not json',
+    json.dumps({'times_minutes': 5, 'price': '1.00'}),
+    json.dumps({
+        'title': 'Toast', 'times_minutes': 3,
+        'price': '1.25', 'link': 'http://example.com/toast',
+    }),
+]) + '\n'
+
+CSV = (
+    'title,slug,description,times_minutes,price,link\n'
+    'Soup,soup,"Hot, with\nbread",30,6.00,\n'
+    'No time,no-time,,,2.00,\n'
+)
+
+
+class ImporterTest(TestCase):
+    """Test validating and loading rows with COPY"""
+
+    def setUp(self):
+        self.user = create_user(email='test@domain.com', password='goodPass')
+
+    def test_import_ndjson(self):
+        """Test valid rows are imported and invalid ones reported"""
+        errors = StringIO()
+        progress = []
+
+        stats = importer.import_recipes(
+            self.user, StringIO(NDJSON), 'ndjson',
+            errors=errors, progress=progress.append, chunk_size=2,
+        )
+
+        self.assertEqual(stats.rows, 5)
+        self.assertEqual(stats.imported, 2)
+        self.assertEqual(stats.failed, 3)
+        self.assertGreaterEqual(len(progress), 3)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual([r.title for r in recipes], ['Pancakes', 'Toast'])
+        self.assertEqual(recipes[0].price, Decimal('4.50'))
+        self.assertEqual(recipes[0].description, 'Fluffy')
+        self.assertEqual(recipes[1].description, '')
+        self.assertIsNotNone(recipes[0].updated_at)
+
+        lines = errors.getvalue().splitlines()
+        rejected = [json.loads(line) for line in lines]
+        self.assertEqual([r['line'] for r in rejected], [2, 3, 4])
+        self.assertIn('price', rejected[0]['errors'])
+        self.assertIn('title', rejected[2]['errors'])
+
+    def test_import_generates_slugs(self):
+        """Test slugs are generated per user, ignoring the file's"""
+        rows = '\n'.join(
+            json.dumps({
+                'title': 'Toast', 'slug': 'mine', 'times_minutes': 3,
+                'price': '1.25',
+            })
+            for _ in range(3)
+        )
+
+        importer.import_recipes(self.user, StringIO(rows), 'ndjson')
+        importer.import_recipes(
+            self.user, StringIO(rows), 'ndjson', chunk_size=2,
+        )
+
+        slugs = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [recipe.slug for recipe in slugs],
+            ['toast', 'toast-2', 'toast-3', 'toast-4', 'toast-5', 'toast-6'],
+        )
+
+    def test_import_csv(self):
+        """Test CSV rows, including quoted newlines and empty fields"""
+        errors = StringIO()
+
+        stats = importer.import_recipes(
+            self.user, StringIO(CSV), 'csv', errors=errors,
+        )
+
+        self.assertEqual(stats.imported, 1)
+        self.assertEqual(stats.failed, 1)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.description, 'Hot, with\nbread')
+        self.assertEqual(recipe.link, '')
+        self.assertIn('times_minutes', errors.getvalue())
+
+    def test_failed_import_invalidates_cache(self):
+        """Test chunks committed before an error still bump the cache"""
+        def lines():
+            yield NDJSON.splitlines()[0]
+            raise OSError('Connection reset')
+
+        version = cache.get_version(self.user.pk)
+
+        with self.assertRaises(OSError):
+            importer.import_recipes(
+                self.user, lines(), 'ndjson', chunk_size=1,
+            )
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+        self.assertNotEqual(cache.get_version(self.user.pk), version)
+
+    def test_import_command(self):
+        """Test the import_recipes management command"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'recipes.ndjson')
+            with open(path, 'w') as f:
+                f.write(NDJSON)
+            out = StringIO()
+
+            call_command('import_recipes', path, user=self.user.email,
+                         stdout=out)
+
+            with open(f'{path}.errors') as f:
+                self.assertEqual(len(f.readlines()), 3)
+
+        self.assertIn('Imported 2 of 5 rows', out.getvalue())
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+
+class ImportApiTest(TestCase):
+    """Test the recipe import upload endpoint"""
+
+    def setUp(self):
+        self.user = create_user(email='test@domain.com', password='goodPass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_upload_ndjson(self):
+        """Test uploading an NDJSON file"""
+        upload = SimpleUploadedFile('recipes.ndjson', NDJSON.encode())
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['imported'], 2)  # type: ignore
+        self.assertEqual(len(res.data['errors']), 3)  # type: ignore
+        self.assertIn('rows_per_second', res.data)  # type: ignore
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_upload_csv_with_type(self):
+        """Test the format can be given explicitly"""
+        upload = SimpleUploadedFile('upload.txt', CSV.encode())
+
+        res = self.client.post(IMPORT_URL, {'file': upload, 'type': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['imported'], 1)  # type: ignore
+
+    @override_settings(RECIPE_IMPORT_CHUNK_SIZE=1)
+    def test_upload_invalid_utf8(self):
+        """Test a file with a bad byte past the first chunk loads nothing"""
+        content = NDJSON.encode() + b'{"title": "\xff"}\n'
+        upload = SimpleUploadedFile('recipes.ndjson', content)
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('file', res.data)  # type: ignore
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_upload_unknown_format(self):
+        """Test an unknown format is rejected"""
+        upload = SimpleUploadedFile('recipes.xml', b'<recipes/>')
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_invalidates_list(self):
+        """Test imported recipes show up in the cached list"""
+        list_url = reverse('recipe:recipe-list')
+        self.client.get(list_url)
+
+        upload = SimpleUploadedFile('recipes.ndjson', NDJSON.encode())
+        self.client.post(IMPORT_URL, {'file': upload})
+        res = self.client.get(list_url)
+
+        self.assertEqual(len(res.data['results']), 2)  # type: ignore
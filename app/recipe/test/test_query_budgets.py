@@ -0,0 +1,138 @@
+"""
+Query budgets for the recipe API
+"""
+
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from core.testing import Endpoint, QueryBudgetMixin
+from recipe import stats
+from recipe.models import Recipe
+from recipe.test.test_recipe_api import create_user
+
+PAGE_ROWS = 25 + 1  # a page, plus the row that tells if there is more
+# Writes run in transactions (one for the recipes and their stats, one
+# more around picking slugs), each a savepoint and its release here
+# because the test already runs in a transaction.
+SAVEPOINT = 2
+
+
+def first_id(test):
+    return [test.recipe_ids[0]]
+
+
+def recipe_payload(**params):
+    payload = {
+        'title': 'Budget soup',
+        'times_minutes': 10,
+        'price': '3.50',
+    }
+    payload.update(params)
+    return payload
+
+
+def import_upload(test):
+    csv = 'title,times_minutes,price\nToast,3,1.25\n'
+    return {'file': SimpleUploadedFile('recipes.csv', csv.encode())}
+
+
+class RecipeQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Test each recipe endpoint costs the same SQL at any data size"""
+
+    namespaces = ('recipe',)
+    # The viewset is registered at the router's root, so the list route
+    # shadows the API root view.
+    exempt = ['recipe:api-root']
+    endpoints = [
+        Endpoint(
+            'recipe:recipe-list', queries=1, rows=PAGE_ROWS,
+        ),
+        Endpoint(
+            'recipe:recipe-list', queries=1, rows=PAGE_ROWS,
+            settings={'RECIPE_FAST_LIST': False},
+            label='GET recipe:recipe-list via serializer',
+        ),
+        Endpoint(
+            'recipe:recipe-list', queries=1, rows=PAGE_ROWS,
+            data={'ordering': 'title', 'fields': 'id,title'},
+            label='GET recipe:recipe-list ordered, sparse',
+        ),
+        Endpoint(
+            'recipe:recipe-list', queries=1, rows=PAGE_ROWS,
+            data={'q': 'soup'}, label='GET recipe:recipe-list search',
+        ),
+        # The slugs taken, the INSERT and the stats UPDATE.
+        Endpoint(
+            'recipe:recipe-list', 'post', queries=3 + 2 * SAVEPOINT, rows=1,
+            data=recipe_payload(),
+        ),
+        # The updated_at behind Last-Modified, then the recipe itself.
+        Endpoint(
+            'recipe:recipe-detail', queries=2, rows=2,
+            args=first_id,
+        ),
+        # A new title leaves the stats alone.
+        Endpoint(
+            'recipe:recipe-detail', 'patch', queries=2 + SAVEPOINT, rows=1,
+            args=first_id, data={'title': 'Renamed'},
+        ),
+        Endpoint(
+            'recipe:recipe-detail', 'put', queries=3 + SAVEPOINT, rows=1,
+            args=first_id, data=recipe_payload(),
+        ),
+        Endpoint(
+            'recipe:recipe-detail', 'delete', queries=3 + SAVEPOINT, rows=1,
+            args=first_id,
+        ),
+        # Up to one clashing slug per item is read back.
+        Endpoint(
+            'recipe:recipe-bulk', 'post', queries=3 + 2 * SAVEPOINT, rows=20,
+            data=[recipe_payload(title=f'Soup {i}') for i in range(10)],
+        ),
+        Endpoint(
+            'recipe:recipe-bulk', 'patch', queries=4, rows=1,
+            data=lambda test: [{'id': test.recipe_ids[0], 'title': 'New'}],
+        ),
+        # The deleted prices and cook times are read for the stats.
+        Endpoint(
+            'recipe:recipe-bulk', 'delete', queries=3 + SAVEPOINT, rows=1,
+            data=first_id,
+        ),
+        Endpoint(
+            'recipe:recipe-slug', queries=1, rows=1,
+            args=lambda test: ['soup-0'],
+        ),
+        Endpoint('recipe:recipe-stats', queries=1, rows=1),
+        # The export streams every row through a server-side cursor.
+        Endpoint('recipe:recipe-export', queries=1, rows=None),
+        # The slugs taken and the stats UPDATE; the COPY itself is not
+        # seen by the counter.
+        Endpoint(
+            'recipe:recipe-import', 'post', queries=2 + SAVEPOINT, rows=0,
+            data=import_upload, format='multipart',
+        ),
+    ]
+
+    def setUp(self):
+        self.user = create_user(email='test@domain.com', password='goodPass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe_ids = []
+
+    def create_rows(self, count):
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=self.user,
+                title=f'Soup {len(self.recipe_ids) + i}',
+                slug=f'soup-{len(self.recipe_ids) + i}',
+                times_minutes=i % 120 + 1,
+                price=Decimal(i % 5000) / 100,
+                description='Simmer slowly.',
+            )
+            for i in range(count)
+        ], batch_size=2000)
+        self.recipe_ids.extend(recipe.id for recipe in recipes)
+        stats.rebuild([self.user.pk])
@@ -2,12 +2,16 @@
 Test for recipe APIs
 """
 
+from base64 import b64decode, b64encode
 from decimal import Decimal
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlencode, urlparse
 
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
 from recipe.models import Recipe
+from recipe.pagination import RecipeCursorPagination
 from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -24,7 +28,6 @@ def create_recipe(user, **params):
     """Create and return a new recipe object"""
     defaults = {
         'title': 'Sample Recipe',
-        'slug': 'sample-recipe',
         'times_minutes': 22,
         'price': Decimal('20.25'),
         'description': 'Sample description',
@@ -74,7 +77,7 @@ class PrivateRecipeApiTest(TestCase):
         recipes = Recipe.objects.all().order_by("-id")
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)  # type: ignore
+        self.assertEqual(res.data['results'], serializer.data)  # type: ignore
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes is limited to authenticated user"""
@@ -91,7 +94,7 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)   # type: ignore
+        self.assertEqual(res.data['results'], serializer.data)  # type: ignore
 
     def test_get_recipe_details(self):
         """Test get recipe details."""
@@ -107,7 +110,6 @@ class PrivateRecipeApiTest(TestCase):
         """Test creating a recipe"""
         payload = {
             'title': 'Sample title',
-            'slug': 'sample-title',
             'times_minutes': 30,
             'price': Decimal('30.00')
         }
@@ -118,6 +120,31 @@ class PrivateRecipeApiTest(TestCase):
         for k, v in payload.items():
             self.assertEqual(getattr(recipe, k), v)
         self.assertEqual(recipe.user, self.user)
+        self.assertEqual(recipe.slug, 'sample-title')
+
+    def test_create_recipe_unique_slug(self):
+        """Test slugs are generated unique per user, ignoring the client's"""
+        other_user = create_user(email='other@domain.com', password='pass')
+        create_recipe(user=other_user, title='Soup')
+        create_recipe(user=self.user, title='Soup')
+        create_recipe(user=self.user, title='Soup dumplings')
+        payload = {
+            'title': 'Soup', 'slug': 'mine', 'times_minutes': 5,
+            'price': Decimal('1.00'),
+        }
+
+        slugs = [
+            self.client.post(RECIPE_URL, payload).data['slug']  # type: ignore
+            for _ in range(2)
+        ]
+
+        self.assertEqual(slugs, ['soup-2', 'soup-3'])
+
+    def test_slug_fallback(self):
+        """Test a title with nothing to slugify still gets a slug"""
+        recipe = create_recipe(user=self.user, title='!!!')
+
+        self.assertEqual(recipe.slug, 'recipe')
 
     def test_partial_update(self):
         """Test partial Update of a recipe"""
@@ -153,7 +180,6 @@ class PrivateRecipeApiTest(TestCase):
 
         payload = {
             'title': 'new recipe title',
-            'slug': 'new-recipe-title',
             'description': 'new sample description',
             'times_minutes': 10,
             'price': Decimal('2.50'),
@@ -161,14 +187,36 @@ class PrivateRecipeApiTest(TestCase):
         }
 
         url = detail_url(recipe_id=recipe.id)  # type: ignore
-        res = self.client.put(url, payload)
+        res = self.client.put(url, {**payload, 'slug': 'new-recipe-title'})
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         recipe.refresh_from_db()
         for k, v in payload.items():
             self.assertEqual(getattr(recipe, k), v)
+        self.assertEqual(recipe.slug, 'sample-recipe-title')
         self.assertEqual(recipe.user, self.user)
 
+    def test_get_recipe_by_slug(self):
+        """Test retrieving a recipe by slug, in a single query"""
+        recipe = create_recipe(user=self.user, title='Lemon tart')
+        url = reverse('recipe:recipe-slug', args=[recipe.slug])
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
+
+    def test_get_other_users_recipe_by_slug(self):
+        """Test another user's slug is not found"""
+        other_user = create_user(email='other@domain.com', password='pass')
+        recipe = create_recipe(user=other_user, title='Lemon tart')
+
+        url = reverse('recipe:recipe-slug', args=[recipe.slug])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_update_user_return_error(self):
         """Test changing the recipe user results in an error"""
         new_user = create_user(email='user_2@domain.com', password='goodPass')
@@ -208,3 +256,87 @@ class PrivateRecipeApiTest(TestCase):
                         .filter(id=recipe.id)  # type: ignore
                         .exists()
                         )
+
+    def test_list_is_paginated_by_cursor(self):
+        """Test following the next cursor walks every recipe once"""
+        recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        seen = []
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)  # type: ignore
+            seen += [r['id'] for r in res.data['results']]  # type: ignore
+            if not res.data['next']:  # type: ignore
+                break
+            res = self.client.get(res.data['next'])  # type: ignore
+
+        ids = [r.id for r in recipes]  # type: ignore
+        self.assertEqual(seen, sorted(ids, reverse=True))
+
+    def test_cursor_pages_through_repeated_titles(self):
+        """Test title cursors seek on (title, id), without offsets"""
+        recipes = [
+            create_recipe(user=self.user, title=title)
+            for title in ['Soup'] * 5 + ['Bread', 'Stew']
+        ]
+        ascending = sorted(recipes, key=lambda r: (r.title, r.id))
+
+        for ordering, order in [
+            ('title', ascending), ('-title', ascending[::-1]),
+        ]:
+            seen, cursors = [], []
+            res = self.client.get(
+                RECIPE_URL, {'ordering': ordering, 'page_size': 2},
+            )
+            while True:
+                seen += [r['id'] for r in res.data['results']]  # type: ignore
+                if not res.data['next']:  # type: ignore
+                    break
+                cursors.append(
+                    parse_qs(urlparse(res.data['next']).query)  # type: ignore
+                    ['cursor'][0]
+                )
+                res = self.client.get(res.data['next'])  # type: ignore
+
+            self.assertEqual(seen, [r.id for r in order])
+            for cursor in cursors:
+                self.assertNotIn('o=', b64decode(cursor).decode())
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor is a 404, not a server error"""
+        for position in ['not json', '["Soup"]', '{}']:
+            cursor = b64encode(
+                urlencode({'p': position}).encode()
+            ).decode()
+
+            res = self.client.get(
+                RECIPE_URL, {'ordering': 'title', 'cursor': cursor},
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_page_size_is_capped(self):
+        """Test page_size larger than the maximum is capped"""
+        for i in range(3):
+            create_recipe(user=self.user)
+
+        with patch.object(RecipeCursorPagination, 'max_page_size', 2):
+            res = self.client.get(RECIPE_URL, {'page_size': 1000})
+
+        self.assertEqual(len(res.data['results']), 2)  # type: ignore
+        self.assertIsNotNone(res.data['next'])  # type: ignore
+
+    def test_list_ordered_by_title(self):
+        """Test ordering the recipe list by title"""
+        create_recipe(user=self.user, title='Banana bread')
+        create_recipe(user=self.user, title='Apple pie')
+        create_recipe(user=self.user, title='Carrot cake')
+
+        res = self.client.get(RECIPE_URL, {'ordering': 'title'})
+
+        titles = [r['title'] for r in res.data['results']]  # type: ignore
+        self.assertEqual(titles, ['Apple pie', 'Banana bread', 'Carrot cake'])
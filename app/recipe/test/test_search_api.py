@@ -0,0 +1,110 @@
+"""
+Test for recipe full-text search
+"""
+
+from io import StringIO
+import json
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe import importer
+from recipe.test.test_recipe_api import (
+    RECIPE_URL,
+    create_recipe,
+    create_user,
+    detail_url,
+)
+
+
+class RecipeSearchApiTest(TestCase):
+    """Test searching recipes with ?q="""
+
+    def setUp(self):
+        self.user = create_user(email='test@domain.com', password='goodPass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, terms, **params):
+        res = self.client.get(RECIPE_URL, {'q': terms, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def titles(self, res):
+        return [r['title'] for r in res.data['results']]
+
+    def test_search_title_and_description(self):
+        """Test search matches title and description, stemmed"""
+        create_recipe(user=self.user, title='Chicken curry',
+                      description='Spicy')
+        create_recipe(user=self.user, title='Salad',
+                      description='Goes well with grilled chickens')
+        create_recipe(user=self.user, title='Pancakes', description='Sweet')
+
+        res = self.search('chicken')
+
+        self.assertEqual(self.titles(res), ['Chicken curry', 'Salad'])
+
+    def test_search_ranks_title_matches_first(self):
+        """Test a title match outranks a description match"""
+        create_recipe(user=self.user, title='Salad',
+                      description='Add some tomato')
+        create_recipe(user=self.user, title='Tomato soup', description='')
+
+        res = self.search('tomato')
+
+        self.assertEqual(self.titles(res), ['Tomato soup', 'Salad'])
+
+    def test_search_limited_to_user(self):
+        """Test search never returns other users' recipes"""
+        other = create_user(email='other@domain.com', password='goodPass')
+        create_recipe(user=other, title='Chicken pie')
+
+        res = self.search('chicken')
+
+        self.assertEqual(res.data['results'], [])  # type: ignore
+
+    def test_search_is_cursor_paginated(self):
+        """Test walking search results page by page"""
+        for i in range(5):
+            create_recipe(user=self.user, title=f'Bread {i}',
+                          description='bread ' * i)
+
+        res = self.search('bread', page_size=2)
+        seen = self.titles(res)
+        while res.data['next']:  # type: ignore
+            res = self.client.get(res.data['next'])  # type: ignore
+            seen += self.titles(res)
+
+        self.assertEqual(sorted(seen), [f'Bread {i}' for i in range(5)])
+        self.assertEqual(seen[0], 'Bread 4')
+
+    def test_search_with_explicit_ordering(self):
+        """Test ?ordering= overrides the rank ordering"""
+        create_recipe(user=self.user, title='B bread')
+        create_recipe(user=self.user, title='A bread')
+
+        res = self.search('bread', ordering='title')
+
+        self.assertEqual(self.titles(res), ['A bread', 'B bread'])
+
+    def test_search_vector_follows_updates(self):
+        """Test editing a recipe updates what it is found by"""
+        recipe = create_recipe(user=self.user, title='Chicken curry')
+
+        self.client.patch(detail_url(recipe.id), {'title': 'Lentil curry'})
+
+        self.assertEqual(self.titles(self.search('chicken')), [])
+        self.assertEqual(self.titles(self.search('lentil')), ['Lentil curry'])
+
+    def test_imported_recipes_are_searchable(self):
+        """Test rows loaded with COPY get a search vector"""
+        row = {'title': 'Mushroom risotto', 'slug': 'risotto',
+               'times_minutes': 40, 'price': '9.00'}
+        importer.import_recipes(self.user, StringIO(json.dumps(row)),
+                                'ndjson')
+
+        res = self.search('mushrooms')
+
+        self.assertEqual(self.titles(res), ['Mushroom risotto'])
@@ -0,0 +1,99 @@
+"""
+Test for sparse fieldsets on the recipe APIs
+"""
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.serializers import row_serializer
+from recipe.test.test_recipe_api import (
+    RECIPE_URL,
+    create_recipe,
+    create_user,
+    detail_url,
+)
+
+
+class SparseFieldsApiTest(TestCase):
+    """Test ?fields= trims the response and the SELECT"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(email='test@domain.com', password='goodPass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params)
+        selects = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT "recipe_recipe"."id"')
+        ]
+        return res, selects
+
+    def test_list_fields(self):
+        """Test the list only returns and selects the requested fields"""
+        res, selects = self.get(RECIPE_URL, fields='id,title,price')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{  # type: ignore
+            'id': self.recipe.id,
+            'title': self.recipe.title,
+            'price': self.recipe.price,
+        }])
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn('"slug"', selects[0])
+        self.assertNotIn('"link"', selects[0])
+
+    def test_detail_fields(self):
+        """Test retrieve honours ?fields= and skips the description"""
+        res, selects = self.get(detail_url(self.recipe.id), fields='title')
+
+        self.assertEqual(res.data, {'title': self.recipe.title})
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn('"description"', selects[0])
+
+    def test_detail_can_request_description(self):
+        """Test detail-only fields are accepted on retrieve"""
+        res, _ = self.get(detail_url(self.recipe.id), fields='description')
+
+        self.assertEqual(res.data, {'description': self.recipe.description})
+
+    def test_fields_normalized(self):
+        """Test repeated or reordered names share one compiled serializer"""
+        row_serializer.cache_clear()
+
+        for fields in ['title,id,title', 'id,title', 'title,id']:
+            res, _ = self.get(RECIPE_URL, fields=fields)
+
+            self.assertEqual(
+                list(res.data['results'][0]), ['id', 'title'],  # type: ignore
+            )
+        self.assertEqual(row_serializer.cache_info().currsize, 1)
+
+    def test_unknown_field_rejected(self):
+        """Test unknown fields are a 400"""
+        for fields in ['id,nope', 'description', '']:
+            res, _ = self.get(RECIPE_URL, fields=fields)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('fields', res.data)
+
+    def test_pagination_without_ordering_field(self):
+        """Test cursor pagination works when the ordering isn't requested"""
+        create_recipe(user=self.user, title='Another')
+
+        res, selects = self.get(
+            RECIPE_URL, fields='id', ordering='title', page_size=1,
+        )
+        self.assertEqual(len(selects), 1)
+        res, _ = self.get(res.data['next'])  # type: ignore
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)  # type: ignore
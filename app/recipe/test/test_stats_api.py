@@ -0,0 +1,278 @@
+"""
+Test for the recipe statistics API
+"""
+
+import json
+import threading
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe import stats
+from recipe.models import RecipeStats
+from recipe.serializers import RecipeStatsSerializer
+from recipe.test.test_recipe_api import (
+    RECIPE_URL,
+    create_recipe,
+    create_user,
+    detail_url,
+)
+
+STATS_URL = reverse('recipe:recipe-stats')
+BULK_URL = reverse('recipe:recipe-bulk')
+IMPORT_URL = reverse('recipe:recipe-import')
+
+
+def recipe_payload(**params):
+    """Return a valid recipe payload"""
+    payload = {'title': 'Soup', 'times_minutes': 20, 'price': '5.00'}
+    payload.update(params)
+    return payload
+
+
+class RecipeStatsApiTest(TestCase):
+    """Test the stats endpoint and the writes that maintain it"""
+
+    def setUp(self):
+        self.user = create_user(email='test@domain.com', password='goodPass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_stats(self):
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def assertStatsRebuilt(self):
+        """Assert the incremental stats match a rebuild from scratch"""
+        maintained = self.get_stats()
+        stats.rebuild([self.user.pk])
+        self.assertEqual(maintained, self.get_stats())
+
+    def create(self, **params):
+        res = self.client.post(RECIPE_URL, recipe_payload(**params))
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['id']  # type: ignore
+
+    def test_stats_empty(self):
+        """Test a user without recipes gets zeroed stats"""
+        data = self.get_stats()
+
+        self.assertEqual(data['recipe_count'], 0)
+        self.assertIsNone(data['price_average'])
+        self.assertIsNone(data['price_min'])
+        self.assertEqual(
+            [bucket['count'] for bucket in data['cook_time_histogram']],
+            [0] * len(stats.BUCKETS),
+        )
+
+    def test_stats_single_query(self):
+        """Test the stats are read with one primary key lookup"""
+        for price in ('1.00', '2.00'):
+            self.create(price=price)
+
+        with self.assertNumQueries(1):
+            self.client.get(STATS_URL)
+
+    def test_create_update_delete(self):
+        """Test single writes keep the stats current"""
+        cheap = self.create(price='2.00', times_minutes=10)
+        self.create(price='4.00', times_minutes=45)
+        dear = self.create(price='9.00', times_minutes=200)
+
+        data = self.get_stats()
+        self.assertEqual(data['recipe_count'], 3)
+        self.assertEqual(data['price_total'], Decimal('15.00'))
+        self.assertEqual(data['price_average'], Decimal('5.00'))
+        self.assertEqual(data['price_min'], Decimal('2.00'))
+        self.assertEqual(data['price_max'], Decimal('9.00'))
+        self.assertEqual(
+            [bucket['count'] for bucket in data['cook_time_histogram']],
+            [1, 0, 1, 0, 1],
+        )
+        self.assertStatsRebuilt()
+
+        self.client.patch(detail_url(dear), {'price': '3.00'})
+        data = self.get_stats()
+        self.assertEqual(data['price_max'], Decimal('4.00'))
+        self.assertEqual(data['price_total'], Decimal('9.00'))
+        self.assertStatsRebuilt()
+
+        self.client.patch(detail_url(cheap), {'times_minutes': 90})
+        self.client.delete(detail_url(cheap))
+        data = self.get_stats()
+        self.assertEqual(data['recipe_count'], 2)
+        self.assertEqual(data['price_min'], Decimal('3.00'))
+        self.assertStatsRebuilt()
+
+    def test_single_writes_lock_the_row(self):
+        """Test updates and deletes read the old values under a row lock"""
+        recipe_id = self.create(price='2.00')
+        writes = [
+            lambda: self.client.patch(detail_url(recipe_id), {'price': '3'}),
+            lambda: self.client.put(
+                detail_url(recipe_id), recipe_payload(price='4.00'),
+            ),
+            lambda: self.client.delete(detail_url(recipe_id)),
+        ]
+
+        for write in writes:
+            with CaptureQueriesContext(connection) as ctx:
+                write()
+
+            selects = [
+                q['sql'] for q in ctx.captured_queries
+                if q['sql'].startswith('SELECT')
+            ]
+            self.assertTrue(selects)
+            self.assertTrue(selects[0].endswith('FOR UPDATE'), selects[0])
+        self.assertStatsRebuilt()
+
+    def test_bulk_writes(self):
+        """Test bulk create, update and delete keep the stats current"""
+        res = self.client.post(BULK_URL, [
+            recipe_payload(price=f'{price}.00') for price in (1, 2, 3, 4)
+        ], format='json')
+        ids = [item['id'] for item in res.data]  # type: ignore
+        self.assertEqual(self.get_stats()['recipe_count'], 4)
+        self.assertStatsRebuilt()
+
+        self.client.patch(BULK_URL, [
+            {'id': ids[0], 'price': '7.00'},
+            {'id': ids[1], 'title': 'Renamed'},
+        ], format='json')
+        self.assertEqual(self.get_stats()['price_min'], Decimal('2.00'))
+        self.assertStatsRebuilt()
+
+        self.client.delete(BULK_URL, ids[:2], format='json')
+        data = self.get_stats()
+        self.assertEqual(data['recipe_count'], 2)
+        self.assertEqual(data['price_max'], Decimal('4.00'))
+        self.assertStatsRebuilt()
+
+    def test_import(self):
+        """Test imported recipes are counted"""
+        self.create(price='5.00')
+        rows = '\n'.join(json.dumps(recipe_payload(price=price))
+                         for price in ('1.50', '8.00'))
+        upload = SimpleUploadedFile('recipes.ndjson', rows.encode())
+
+        self.client.post(IMPORT_URL, {'file': upload})
+
+        data = self.get_stats()
+        self.assertEqual(data['recipe_count'], 3)
+        self.assertEqual(data['price_min'], Decimal('1.50'))
+        self.assertStatsRebuilt()
+
+    def test_stats_limited_to_user(self):
+        """Test only the user's own recipes are counted"""
+        other_user = create_user(email='other@domain.com', password='pass')
+        create_recipe(user=other_user)
+        stats.rebuild()
+        self.create()
+
+        self.assertEqual(self.get_stats()['recipe_count'], 1)
+
+
+class ApplyWithoutStatsRowTest(TransactionTestCase):
+    """Test apply() for users who have no stats row yet"""
+
+    def setUp(self):
+        self.user = create_user(email='test@domain.com', password='goodPass')
+
+    def add(self, price):
+        recipe = create_recipe(
+            user=self.user, title=f'Soup {price}', price=Decimal(price),
+        )
+        stats.apply(self.user.pk, added=stats.recipe_values([recipe]))
+
+    def test_first_write_creates_row(self):
+        """Test the first write aggregates the row from the recipes"""
+        create_recipe(user=self.user, price=Decimal('2.00'))
+        self.assertFalse(RecipeStats.objects.exists())
+
+        self.add('6.00')
+
+        row = RecipeStats.objects.get(user=self.user)
+        self.assertEqual(row.recipe_count, 2)
+        self.assertEqual(row.price_total, Decimal('8.00'))
+        self.assertEqual(row.price_min, Decimal('2.00'))
+
+    def test_concurrent_first_writes(self):
+        """Test two first writes racing to create the row both count"""
+        insert = stats._insert
+        missed = threading.Barrier(2, timeout=5)
+
+        def insert_after_both_missed(*args, **kwargs):
+            missed.wait()
+            return insert(*args, **kwargs)
+
+        def write(price):
+            try:
+                with transaction.atomic():
+                    self.add(price)
+            finally:
+                connection.close()
+
+        with patch.object(stats, '_insert', insert_after_both_missed):
+            threads = [
+                threading.Thread(target=write, args=[price])
+                for price in ('1.00', '5.00')
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        row = RecipeStats.objects.get(user=self.user)
+        self.assertEqual(row.recipe_count, 2)
+        self.assertEqual(row.price_total, Decimal('6.00'))
+        self.assertEqual(row.price_max, Decimal('5.00'))
+
+
+class RebuildRecipeStatsTest(TestCase):
+    """Test the rebuild_recipe_stats command"""
+
+    def setUp(self):
+        self.user = create_user(email='test@domain.com', password='goodPass')
+
+    def test_rebuild(self):
+        """Test stats are recomputed for recipes written behind the API"""
+        create_recipe(user=self.user, price=Decimal('2.00'), times_minutes=5)
+        create_recipe(user=self.user, price=Decimal('6.00'), times_minutes=65)
+        out = StringIO()
+
+        call_command('rebuild_recipe_stats', stdout=out)
+
+        data = RecipeStatsSerializer(stats.get(self.user)).data
+        self.assertEqual(data['recipe_count'], 2)
+        self.assertEqual(data['price_average'], Decimal('4.00'))
+        self.assertEqual(
+            [bucket['count'] for bucket in data['cook_time_histogram']],
+            [1, 0, 0, 1, 0],
+        )
+        self.assertIn('Rebuilt recipe stats of 1 users', out.getvalue())
+
+    def test_rebuild_removes_stale_rows(self):
+        """Test users left without recipes lose their stats row"""
+        RecipeStats.objects.create(user=self.user, recipe_count=3)
+
+        call_command('rebuild_recipe_stats', user=[self.user.email],
+                     stdout=StringIO())
+
+        self.assertFalse(RecipeStats.objects.exists())
+
+    def test_rebuild_unknown_user(self):
+        """Test an unknown email is an error"""
+        with self.assertRaises(CommandError):
+            call_command('rebuild_recipe_stats', user=['nobody@domain.com'])
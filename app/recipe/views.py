@@ -1,27 +1,130 @@
 """
 Views for the Recipe API
 """
-from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
+import hashlib
+import io
+import json
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models.deletion import Collector
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import filters, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core import timing
+from core.authentication import CachedTokenAuthentication
 
+from . import cache, export, importer, stats
+from .filters import RecipeSearchFilter
 from .models import Recipe
-from .serializers import RecipeDetailSerializer, RecipeSerializer
+from .pagination import RecipeCursorPagination
+from .serializers import (
+    RecipeDetailSerializer,
+    RecipeSerializer,
+    RecipeStatsSerializer,
+    row_serializer,
+)
+
+
+def recipe_version(request):
+    """Return the user's response cache version for this request.
+
+    Read once and memoized on the request, so the ETag and the cached
+    body it validates always come from the same version.
+    """
+    if not hasattr(request, '_recipe_version'):
+        request._recipe_version = cache.get_version(request.user.pk)
+    return request._recipe_version
+
+
+def recipe_last_modified(request, pk=None):
+    """Return when a recipe last changed, or None for the list.
+
+    The list has no Last-Modified: the newest `updated_at` does not move
+    when a recipe is deleted, so it cannot tell the list changed. Its
+    ETag, which follows the cache version, covers every write.
+    """
+    if pk is None:
+        return None
+    if not hasattr(request, '_recipe_last_modified'):
+        try:
+            last_modified = (
+                Recipe.objects.filter(user=request.user, pk=pk)
+                .values_list('updated_at', flat=True)
+                .first()
+            )
+        except (TypeError, ValueError):
+            last_modified = None
+        request._recipe_last_modified = last_modified
+    return request._recipe_last_modified
+
+
+def recipe_etag(request, pk=None):
+    """Return a strong ETag for the recipe list or detail response.
+
+    Derived from the user's cache version, which every recipe write
+    bumps, rather than from the rows: the body is served from the cache
+    under that version, so a 304 never vouches for a different body.
+
+    None unless the cache is shared: a process-local version never sees
+    writes handled by other workers and never expires, so their 304s
+    would go on vouching for stale data. The detail then still answers
+    If-Modified-Since from its `updated_at`.
+    """
+    if not cache.is_shared():
+        return None
+    if pk is not None and recipe_last_modified(request, pk) is None:
+        return None
+    value = ':'.join([
+        str(request.user.pk),
+        str(recipe_version(request)),
+        request.accepted_renderer.format,
+        request.get_full_path(),
+    ])
+    return hashlib.sha1(value.encode()).hexdigest()
+
+
+recipe_condition = condition(
+    etag_func=recipe_etag,
+    last_modified_func=recipe_last_modified,
+)
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Views for manage recipe APIs"""
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    filter_backends = [RecipeSearchFilter, filters.OrderingFilter]
+    ordering_fields = ['id', 'title']
+    ordering = ['-id']
+    throttle_scope = 'recipes'
 
     def get_queryset(self):
         """Retrieve recipes for authenticated user.
             - Return all recipes owned by a user this
             prevent us to load recipes for other user.
         """
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = (
+            self.queryset
+            .filter(user=self.request.user)
+            .defer('search_vector')
+            .order_by('-id')
+        )
+        if self.action in ('update', 'partial_update', 'destroy'):
+            # update() and destroy() run in a transaction; lock the row
+            # so the stats see the values actually being replaced.
+            queryset = queryset.select_for_update()
+        return queryset
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
@@ -30,6 +133,366 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def get_requested_fields(self):
+        """Return the fields asked for with `?fields=`, or None for all.
+
+        Only list and retrieve honour the parameter. Unknown names are
+        rejected so typos don't silently produce empty objects. The
+        names are deduplicated and put in Meta.fields order, so every
+        spelling of one selection shares a compiled row serializer.
+        """
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = None
+            raw = self.request.query_params.get('fields')
+            if self.action in ('list', 'retrieve') and raw is not None:
+                fields = [name.strip() for name in raw.split(',')]
+                allowed = self.get_serializer_class().Meta.fields
+                unknown = [name for name in fields if name not in allowed]
+                if unknown or not any(fields):
+                    raise serializers.ValidationError({'fields': [
+                        f'Unknown field(s): {", ".join(unknown)}. '
+                        f'Expected some of: {", ".join(allowed)}.'
+                    ]})
+                self._requested_fields = [
+                    name for name in allowed if name in fields
+                ]
+        return self._requested_fields
+
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer, trimmed to `?fields=` if given"""
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        """Filter the queryset, loading only the `?fields=` columns.
+
+        The ordering columns are loaded too, since the pagination cursor
+        is built from them.
+        """
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_requested_fields()
+        if fields is not None:
+            columns = {field.name for field in Recipe._meta.concrete_fields}
+            ordering = [
+                name.lstrip('-') for name in queryset.query.order_by
+                if name.lstrip('-') in columns
+            ]
+            queryset = queryset.only(*fields, *ordering)
+        return queryset
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """Serve `handler` from the user's versioned response cache"""
+        key = cache.response_key(
+            request.user.pk,
+            request.build_absolute_uri(),
+            version=recipe_version(request),
+        )
+        data = cache.get_or_compute(
+            key,
+            lambda: handler(request, *args, **kwargs).data,
+        )
+        return Response(data)
+
+    def fast_list(self, request, *args, **kwargs):
+        """List recipes from `values_list()` rows instead of instances.
+
+        Produces the same page as the serializer-based list, but each row
+        goes through a precompiled row -> dict function. The ordering
+        columns ride along in the rows so the cursor can be built.
+        """
+        fields = self.get_requested_fields()
+        columns, to_dict = row_serializer(
+            self.get_serializer_class(),
+            tuple(fields) if fields is not None else None,
+        )
+        queryset = self.filter_queryset(self.get_queryset())
+        extra = list(self.ordering_fields)
+        if 'rank' in queryset.query.annotations:
+            extra.append('rank')
+        rows = queryset.values_list(
+            *columns,
+            *(name for name in extra if name not in columns),
+            named=True,
+        )
+        page = self.paginate_queryset(rows)
+        with timing.timer('serialize'):
+            data = [to_dict(row) for row in page]
+        return self.get_paginated_response(data)
+
+    @method_decorator(recipe_condition)
+    def list(self, request, *args, **kwargs):
+        """List the user's recipes, served from cache when possible"""
+        handler = super().list
+        if getattr(settings, 'RECIPE_FAST_LIST', True):
+            handler = self.fast_list
+        return self.cached_response(handler, request, *args, **kwargs)
+
+    @method_decorator(recipe_condition)
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, served from cache when possible"""
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
     def perform_create(self, serializer):
-        """Create a new recipe"""
-        serializer.save(user=self.request.user)
+        """Create a new recipe and count it in the user's stats"""
+        with transaction.atomic():
+            recipe = serializer.save(user=self.request.user)
+            stats.apply(
+                self.request.user.pk, added=stats.recipe_values([recipe]),
+            )
+
+    def update(self, request, *args, **kwargs):
+        """Update a recipe, holding its row lock until the stats are done"""
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        """Delete a recipe, holding its row lock until the stats are done"""
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        """Update a recipe and fold the change into the user's stats.
+
+        The instance was read under a row lock, so concurrent updates
+        cannot both remove the same old values. The stats are only
+        touched if the price or cook time changed.
+        """
+        old = stats.recipe_values([serializer.instance])
+        super().perform_update(serializer)
+        new = stats.recipe_values([serializer.instance])
+        if new != old:
+            stats.apply(self.request.user.pk, added=new, removed=old)
+
+    def perform_destroy(self, instance):
+        """Delete a recipe and take it out of the user's stats"""
+        deleted, _ = instance.delete()
+        if deleted:
+            stats.apply(
+                self.request.user.pk, removed=stats.recipe_values([instance]),
+            )
+
+    def get_bulk_data(self, request):
+        """Return the request body if it is a list of acceptable size"""
+        max_items = getattr(settings, 'RECIPE_BULK_MAX_ITEMS', 500)
+        data = request.data
+        if not isinstance(data, list):
+            raise serializers.ValidationError('Expected a list of items.')
+        if not data:
+            raise serializers.ValidationError('Expected at least one item.')
+        if len(data) > max_items:
+            raise serializers.ValidationError(
+                f'Expected at most {max_items} items, got {len(data)}.'
+            )
+        return data
+
+    def validate_bulk(self, serializer):
+        """Validate a many=True serializer, keying errors by item index"""
+        if not serializer.is_valid():
+            raise serializers.ValidationError({
+                str(index): errors
+                for index, errors in enumerate(serializer.errors)
+                if errors
+            })
+
+    @action(
+        detail=False, methods=['post'], url_path='bulk', url_name='bulk',
+    )
+    def bulk_create(self, request):
+        """Create a batch of recipes in one transaction"""
+        data = self.get_bulk_data(request)
+        serializer = self.get_serializer(data=data, many=True)
+        self.validate_bulk(serializer)
+
+        with transaction.atomic():
+            recipes = serializer.save(user=request.user)
+            stats.apply(request.user.pk, added=stats.recipe_values(recipes))
+        cache.bump_version(request.user.pk)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """Partially update a batch of recipes, matched by `id`"""
+        data = self.get_bulk_data(request)
+
+        errors = {}
+        ids = []
+        seen = set()
+        for index, item in enumerate(data):
+            recipe_id = item.get('id') if isinstance(item, dict) else None
+            if not isinstance(recipe_id, int) or isinstance(recipe_id, bool):
+                errors[str(index)] = {'id': ['A valid integer is required.']}
+            elif recipe_id in seen:
+                errors[str(index)] = {'id': ['Duplicate id in batch.']}
+            seen.add(recipe_id)
+            ids.append(recipe_id)
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        with transaction.atomic():
+            recipes = self.get_queryset().select_for_update().in_bulk(ids)
+            missing = {
+                str(index): {'id': ['Not found.']}
+                for index, recipe_id in enumerate(ids)
+                if recipe_id not in recipes
+            }
+            if missing:
+                raise serializers.ValidationError(missing)
+
+            instances = [recipes[recipe_id] for recipe_id in ids]
+            old = stats.recipe_values(instances)
+            serializer = self.get_serializer(
+                instances,
+                data=data,
+                many=True,
+                partial=True,
+            )
+            self.validate_bulk(serializer)
+            serializer.save()
+            changed = [
+                (before, after) for before, after
+                in zip(old, stats.recipe_values(instances))
+                if before != after
+            ]
+            stats.apply(
+                request.user.pk,
+                added=[after for _, after in changed],
+                removed=[before for before, _ in changed],
+            )
+        cache.bump_version(request.user.pk)
+
+        return Response(serializer.data)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request):
+        """Delete a batch of recipes, given as a list of ids"""
+        ids = self.get_bulk_data(request)
+        errors = {
+            str(index): ['A valid integer is required.']
+            for index, recipe_id in enumerate(ids)
+            if not isinstance(recipe_id, int) or isinstance(recipe_id, bool)
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        with transaction.atomic():
+            recipes = list(
+                self.get_queryset().filter(id__in=ids)
+                .select_for_update()
+                .only('user', 'price', 'times_minutes')
+            )
+            # Delete the locked instances rather than the queryset, which
+            # would read the rows again to send post_delete for each.
+            collector = Collector(using=router.db_for_write(Recipe))
+            collector.collect(recipes)
+            deleted, _ = collector.delete()
+            stats.apply(request.user.pk, removed=stats.recipe_values(recipes))
+
+        return Response({'deleted': deleted})
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'slug/(?P<slug>[-\w]+)',
+        url_name='slug',
+    )
+    def by_slug(self, request, slug):
+        """Retrieve a recipe by its slug.
+
+        Served by the (user_id, slug) unique index in a single query.
+        """
+        recipe = get_object_or_404(self.get_queryset(), slug=slug)
+        return Response(self.get_serializer(recipe).data)
+
+    @action(
+        detail=False, methods=['get'], url_path='stats', url_name='stats',
+    )
+    def statistics(self, request):
+        """Return the user's recipe count, prices and cook-time histogram.
+
+        Read from the user's RecipeStats row, a single primary key lookup
+        however many recipes there are.
+        """
+        return Response(
+            RecipeStatsSerializer(stats.get(request.user)).data
+        )
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """Stream every recipe of the user as NDJSON or CSV.
+
+        Rows are read as plain dicts through a server-side cursor, a
+        chunk at a time, so memory stays flat however large the library.
+        Use `?type=csv` for CSV; NDJSON is the default.
+        """
+        export_type = request.query_params.get('type', 'ndjson')
+        if export_type not in export.FORMATS:
+            raise serializers.ValidationError({
+                'type': [f'Expected one of: {", ".join(export.FORMATS)}.'],
+            })
+        render, content_type = export.FORMATS[export_type]
+
+        rows = (
+            self.get_queryset()
+            .order_by('id')
+            .values(*export.EXPORT_FIELDS)
+            .iterator(chunk_size=getattr(
+                settings, 'RECIPE_EXPORT_CHUNK_SIZE', 2000,
+            ))
+        )
+        response = StreamingHttpResponse(
+            render(rows), content_type=content_type,
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{export_type}"'
+        )
+        return response
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        url_name='import',
+        parser_classes=[MultiPartParser],
+    )
+    def import_recipes(self, request):
+        """Import an uploaded NDJSON or CSV file of recipes.
+
+        Takes a multipart `file` and an optional `type` (ndjson or csv,
+        inferred from the file name otherwise). Rows are loaded in chunks
+        with COPY; the response reports totals and the rejected rows.
+        """
+        upload = request.data.get('file')
+        if upload is None:
+            raise serializers.ValidationError({'file': ['No file uploaded.']})
+        fmt = request.data.get('type') or upload.name.rsplit('.', 1)[-1]
+        if fmt not in importer.FORMATS:
+            raise serializers.ValidationError({
+                'type': [f'Expected one of: {", ".join(importer.FORMATS)}.'],
+            })
+
+        if not importer.is_utf8(upload.file):
+            raise serializers.ValidationError({
+                'file': ['File is not valid UTF-8.'],
+            })
+
+        errors = io.StringIO()
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+        result = importer.import_recipes(
+            request.user, stream, fmt, errors=errors,
+        )
+
+        max_errors = getattr(settings, 'RECIPE_IMPORT_MAX_ERRORS', 100)
+        rejected = [
+            json.loads(line)
+            for line in errors.getvalue().splitlines()[:max_errors]
+        ]
+        return Response(
+            {**result.as_dict(), 'errors': rejected},
+            status=status.HTTP_201_CREATED if result.imported
+            else status.HTTP_400_BAD_REQUEST,
+        )